@@ -0,0 +1,145 @@
+"""
+Block-bootstrap confidence intervals for the forecast scores.
+
+Every unique RFW day carries a hit flag and every unique fire day a caught flag (match_flags), and both sum into
+per-block counts: RFW days, hits, fire days and caught fires, per block of time (a year, or a season of a year) and
+per group (zone or WFO). A resample draws blocks with replacement, which is a row of block weights, so all resamples
+are one weight matrix built with np.bincount, and their contingency tables are that matrix times the block counts.
+Drawing whole blocks keeps the day-to-day and zone-to-zone correlation within a block, and every group is resampled
+with the same draws.
+"""
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'utilities'))
+from date_manipulator import ordinal_to_ymd
+
+BLOCKS = ('year', 'season')
+GROUPS = ('wfo', 'zone')
+SCORES = ('BIAS', 'POD', 'FAR', 'CSI')
+
+# Groups whose resampled tables are held at once, bounding memory at about 32 bytes x replicates x GROUP_CHUNK
+GROUP_CHUNK = 256
+
+
+def block_codes(days, block='year'):
+    """
+    Block of every day ordinal: its year, or its meteorological season (DJF, MAM, JJA, SON) within a year, with
+    December counted in the next year's winter
+
+    Returns: np.ndarray of ints, comparable between calls with the same block
+    """
+    if block not in BLOCKS:
+        raise ValueError('Unknown bootstrap block %r, use one of %s' % (block, BLOCKS))
+    years, months, _ = ordinal_to_ymd(days)
+    if block == 'year':
+        return years
+    return (years + (months == 12)) * 4 + months % 12 // 3
+
+
+def zone_groups(store, by):
+    """
+    Group of every zone code of a ColumnarStore
+
+    Returns: (code per zone, group labels). For 'wfo', a zone goes to the office of its warnings, or of its fires when
+             it has no warnings.
+    """
+    if by == 'zone':
+        return np.arange(len(store.zones)), store.zones
+    if by != 'wfo':
+        raise ValueError('Unknown bootstrap group %r, use one of %s' % (by, GROUPS))
+    zone_wfo = np.full(len(store.zones), -1, dtype=np.int64)
+    zone_wfo[store.fire_zone] = store.fires['WFO'].recode(store.wfos)
+    zone_wfo[store.rfw_zone] = store.rfws['WFO'].recode(store.wfos)
+    return zone_wfo, store.wfos
+
+
+def block_counts(rfw_keys, fire_keys, rfw_hit, fire_hit, n_zones, block='year', zone_group=None, n_groups=1):
+    """
+    Per-block, per-group counts of RFW days, hits, fire days and caught fires
+
+    Parameters:
+        rfw_keys, fire_keys (np.ndarrays of int64): Unique event days from day_zone_keys.
+        rfw_hit, fire_hit (np.ndarrays of bool): Their flags from match_flags.
+        n_zones (int): The zone count the keys were encoded with.
+        block (str): 'year' or 'season'.
+        zone_group (np.ndarray of ints) (optional): Group code of every zone. Everything is one group when omitted.
+        n_groups (int): Number of group codes.
+
+    Returns: np.ndarray of int64, shape (blocks, n_groups, 4). Blocks without events are left out.
+    """
+    rfw_day, rfw_zone = np.divmod(rfw_keys, n_zones)
+    fire_day, fire_zone = np.divmod(fire_keys, n_zones)
+    blocks, block_idx = np.unique(block_codes(np.concatenate([rfw_day, fire_day]), block), return_inverse=True)
+    rfw_block, fire_block = block_idx[:len(rfw_keys)], block_idx[len(rfw_keys):]
+    if zone_group is None:
+        rfw_group, fire_group = np.zeros(len(rfw_keys), dtype=np.int64), np.zeros(len(fire_keys), dtype=np.int64)
+    else:
+        rfw_group, fire_group = zone_group[rfw_zone], zone_group[fire_zone]
+
+    cells = len(blocks) * n_groups
+    rfw_cell = rfw_block * n_groups + rfw_group
+    fire_cell = fire_block * n_groups + fire_group
+    counts = np.stack([np.bincount(rfw_cell, minlength=cells),
+                       np.bincount(rfw_cell, weights=rfw_hit, minlength=cells),
+                       np.bincount(fire_cell, minlength=cells),
+                       np.bincount(fire_cell, weights=fire_hit, minlength=cells)], axis=1)
+    return counts.astype(np.int64).reshape(len(blocks), n_groups, 4)
+
+
+def resample_weights(n_blocks, n_resamples, rng):
+    """(n_resamples, n_blocks) matrix of how many times each resample drew each block"""
+    draws = rng.integers(0, n_blocks, size=(n_resamples, n_blocks))
+    rows = np.arange(n_resamples)[:, None] * n_blocks
+    return np.bincount((rows + draws).ravel(), minlength=n_resamples * n_blocks).reshape(n_resamples, n_blocks)
+
+
+def table_scores(n_rfw, hits, n_fire, caught):
+    """
+    BIAS/POD/FAR/CSI (verification_funcs.contingency_scores) from RFW day, hit, fire day and caught fire counts
+    (arrays of any matching shape)
+    """
+    # verification_funcs imports this module, so it can only be imported once both are loaded
+    from verification_funcs import contingency_scores
+    scores = contingency_scores(hits, n_fire - caught, n_rfw - hits)
+    return {name: scores[name] for name in SCORES}
+
+
+def bootstrap_intervals(counts, n_resamples=1000, level=95, seed=None):
+    """
+    Percentile intervals of the scores of every group over block resamples
+
+    Parameters:
+        counts (np.ndarray): From block_counts, shape (blocks, groups, 4).
+        n_resamples (int): Number of resamples.
+        level (number): Interval coverage in percent.
+        seed (int or None): RNG seed, for reproducible intervals.
+
+    Returns: dict of score name -> np.ndarray of shape (groups, 2), the low and high ends. Resamples where a score
+             is undefined (e.g. POD without fires) are left out of its interval, which is NaN if it never is (or there
+             are no blocks at all).
+    """
+    n_blocks, n_groups, _ = counts.shape
+    rng = np.random.default_rng(seed)
+    weights = resample_weights(n_blocks, n_resamples, rng).astype(np.float64)
+    tails = [(100 - level) / 2, 100 - (100 - level) / 2]
+
+    intervals = {name: np.full((n_groups, 2), np.nan) for name in SCORES}
+    if not n_blocks:
+        return intervals
+    for start in range(0, n_groups, GROUP_CHUNK):
+        chunk = counts[:, start:start + GROUP_CHUNK].astype(np.float64)
+        # (resamples, groups in chunk, 4) contingency totals of every resample
+        totals = (weights @ chunk.reshape(n_blocks, -1)).reshape(n_resamples, -1, 4)
+        scores = table_scores(*np.moveaxis(totals, 2, 0))
+        for name, values in scores.items():
+            with np.errstate(invalid='ignore'):
+                values = np.where(np.isfinite(values), values, np.nan)
+            defined = np.isfinite(values).any(axis=0)
+            if defined.any():
+                low_high = np.full((values.shape[1], 2), np.nan)
+                low_high[defined] = np.nanpercentile(values[:, defined], tails, axis=0).T
+                intervals[name][start:start + GROUP_CHUNK] = low_high
+    return intervals
@@ -0,0 +1,206 @@
+"""
+Vectorized Monte-Carlo climatology for the RFW verification.
+
+Each replicate moves every unique RFW day by a random -15..15 day offset (never 0) and into a random year of the
+verification period, then scores the moved RFWs against the real fire days with the same same-day/next-day rule
+as the forecast. Replicates are drawn and scored in blocks of a (replicates x RFWs) matrix, each block with its own
+RNG stream spawned from one SeedSequence, so results depend only on the seed and the data. With workers > 1 the
+blocks are spread over a process pool that reads the RFW days and fire grid from shared memory; the block layout and
+streams do not change, so the counts are identical for any worker count.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'utilities'))
+from date_manipulator import ordinal_to_ymd, ymd_to_ordinal
+
+DAY_OFFSETS = np.array([i for i in range(-15, 16) if i != 0])  # Doesn't pick up 0
+DEFAULT_YEARS = (2006, 2015)
+
+# Upper bound on the cells of one block's (replicates x RFWs) matrix, about 8 MB per int64 matrix
+BLOCK_CELLS = 1 << 20
+
+
+class FireGrid:
+    """
+    A day x zone bitmap of fire days covering every day a climatology RFW can land on (plus the day after)
+
+    Parameters:
+        cells (np.ndarray of bool): The flattened bitmap, indexed by (day - first_day) * n_zones + zone.
+        first_day (int): Day ordinal of the first bitmap row.
+        n_zones (int): The zone count the keys were encoded with.
+        n_fires (int): Number of fire days set in the bitmap.
+    """
+
+    def __init__(self, cells, first_day, n_zones, n_fires):
+        self.cells = cells
+        self.first_day = first_day
+        self.n_zones = n_zones
+        self.n_fires = n_fires
+
+    @classmethod
+    def from_keys(cls, fire_keys, n_zones, years=DEFAULT_YEARS):
+        fire_day, fire_zone = np.divmod(fire_keys, n_zones)
+        first = int(ymd_to_ordinal(years[0], 1, 1))
+        last = int(ymd_to_ordinal(years[1], 12, 31)) + 1
+        if len(fire_day):
+            first, last = min(first, int(fire_day.min())), max(last, int(fire_day.max()))
+
+        cells = np.zeros((last - first + 1) * n_zones, dtype=bool)
+        cells[(fire_day - first) * n_zones + fire_zone] = True
+        return cls(cells, first, n_zones, len(fire_keys))
+
+    def index(self, days, zones):
+        return (days - self.first_day) * self.n_zones + zones
+
+
+def replicate_blocks(n_replicates, n_rfws):
+    """Splits n_replicates into (start, stop) blocks whose matrices stay under BLOCK_CELLS cells"""
+    per_block = max(1, BLOCK_CELLS // max(n_rfws, 1))
+    return [(start, min(start + per_block, n_replicates)) for start in range(0, n_replicates, per_block)]
+
+
+def draw_climo_days(rng, rfw_day, n_replicates, years=DEFAULT_YEARS):
+    """
+    Draws n_replicates random climatology days for every RFW day
+
+    Calendar work is done once on lookup tables (month/day of every reachable shifted day, and the ordinal of every
+    year/month/day), so the per-replicate work is integer draws and takes.
+
+    Returns: np.ndarray of int64 day ordinals, shape (n_replicates, len(rfw_day))
+    """
+    shape = (n_replicates, len(rfw_day))
+    if not len(rfw_day):
+        return np.zeros(shape, dtype=np.int64)
+
+    year_range = np.arange(years[0], years[1] + 1)
+    leap_idx = np.flatnonzero((year_range % 4 == 0) & ((year_range % 100 != 0) | (year_range % 400 == 0)))
+
+    # month_day indexes (month - 1) * 31 + (day - 1) for every day a shift can reach
+    first = int(rfw_day.min()) + int(DAY_OFFSETS.min())
+    _, months, days = ordinal_to_ymd(np.arange(first, int(rfw_day.max()) + int(DAY_OFFSETS.max()) + 1))
+    month_day = (months - 1) * 31 + days - 1
+    slots = np.arange(12 * 31)
+    ordinals = ymd_to_ordinal(year_range[:, None], slots // 31 + 1, slots % 31 + 1).astype(np.int64)
+
+    shifted = rfw_day - first + DAY_OFFSETS[rng.integers(0, len(DAY_OFFSETS), shape)]
+    climo_month_day = month_day[shifted]
+    year_pick = rng.integers(0, len(year_range), shape)
+    if len(leap_idx):
+        # A shifted Feb 29 can only move to a leap year
+        leap_day = climo_month_day == 31 + 28
+        year_pick = np.where(leap_day, leap_idx[rng.integers(0, len(leap_idx), shape)], year_pick)
+    return ordinals[year_pick, climo_month_day]
+
+
+def score_climo_days(climo_days, rfw_zone, grid):
+    """
+    Scores each row of a climatology day matrix against the fire grid
+
+    Returns: (HITS, MISSES, FALSE_ALARMS), each an np.ndarray with one count per row
+    """
+    if not climo_days.shape[1]:
+        zeros = np.zeros(len(climo_days), dtype=np.int64)
+        return zeros, zeros + grid.n_fires, zeros
+
+    cells = np.sort(grid.index(climo_days, rfw_zone), axis=1)
+    # Several RFWs can land on the same day/zone, which counts once
+    unique = np.ones(cells.shape, dtype=bool)
+    unique[:, 1:] = cells[:, 1:] != cells[:, :-1]
+
+    same_day = grid.cells[cells]
+    next_day = grid.cells[cells + grid.n_zones]
+    HITS = ((same_day | next_day) & unique).sum(axis=1)
+    FALSE_ALARMS = unique.sum(axis=1) - HITS
+
+    # Fire days caught on the RFW day or the day after, with -1 for no catch, then counted once each per row
+    caught = np.concatenate([np.where(same_day, cells, -1), np.where(next_day, cells + grid.n_zones, -1)], axis=1)
+    caught.sort(axis=1)
+    distinct = (caught[:, 1:] != caught[:, :-1]) & (caught[:, 1:] >= 0)
+    n_caught = distinct.sum(axis=1) + (caught[:, 0] >= 0)
+    MISSES = grid.n_fires - n_caught
+    return HITS, MISSES, FALSE_ALARMS
+
+
+def run_block(seed_seq, start, stop, rfw_day, rfw_zone, grid, years=DEFAULT_YEARS):
+    rng = np.random.default_rng(seed_seq)
+    climo_days = draw_climo_days(rng, rfw_day, stop - start, years)
+    return score_climo_days(climo_days, rfw_zone, grid)
+
+
+def share_array(array):
+    """Copies an array into a new shared memory block. Returns (block, spec), spec being what attach_array needs"""
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, array.dtype, buffer=block.buf)[...] = array
+    return block, (block.name, array.shape, array.dtype.str)
+
+
+def attach_array(spec):
+    """Maps a block made by share_array into this process. Returns (block, array); keep the block referenced"""
+    name, shape, dtype = spec
+    block = shared_memory.SharedMemory(name=name)
+    return block, np.ndarray(shape, np.dtype(dtype), buffer=block.buf)
+
+
+# Per-worker state set up by _init_worker: the shared blocks (kept open) and the arrays viewing them
+_worker_state = {}
+
+
+def _init_worker(rfw_day_spec, rfw_zone_spec, cells_spec, first_day, n_zones, n_fires, years):
+    blocks = []
+    arrays = []
+    for spec in (rfw_day_spec, rfw_zone_spec, cells_spec):
+        block, array = attach_array(spec)
+        blocks.append(block)
+        arrays.append(array)
+    _worker_state.update(blocks=blocks, rfw_day=arrays[0], rfw_zone=arrays[1], years=years,
+                         grid=FireGrid(arrays[2], first_day, n_zones, n_fires))
+
+
+def _run_worker_block(seed_seq, start, stop):
+    state = _worker_state
+    return run_block(seed_seq, start, stop, state['rfw_day'], state['rfw_zone'], state['grid'], state['years'])
+
+
+def climo_contingency(rfw_keys, fire_keys, n_zones, n_replicates=100, seed=None, years=DEFAULT_YEARS, workers=1):
+    """
+    Runs the climatology null model
+
+    Parameters:
+        rfw_keys, fire_keys (sorted unique np.ndarrays of int64): Event day/zone keys of the query.
+        n_zones (int): The zone count the keys were encoded with.
+        n_replicates (int): Number of random climatologies to score.
+        seed (int or None): Seed for the replicate RNG streams. None draws fresh entropy.
+        years (tuple of ints): First and last year RFWs can be moved to.
+        workers (int): Number of processes to spread the replicate blocks over. 1 runs them in this process.
+
+    Returns: (HITS, MISSES, FALSE_ALARMS), each an np.ndarray with one count per replicate
+    """
+    rfw_day, rfw_zone = np.divmod(rfw_keys, n_zones)
+    grid = FireGrid.from_keys(fire_keys, n_zones, years)
+    blocks = replicate_blocks(n_replicates, len(rfw_keys))
+    streams = np.random.SeedSequence(seed).spawn(len(blocks))
+
+    counts = np.zeros((3, n_replicates), dtype=np.int64)
+    if workers <= 1 or len(blocks) == 1:
+        for (start, stop), stream in zip(blocks, streams):
+            counts[:, start:stop] = run_block(stream, start, stop, rfw_day, rfw_zone, grid, years)
+        return counts[0], counts[1], counts[2]
+
+    shared = [share_array(array) for array in (rfw_day, rfw_zone, grid.cells)]
+    try:
+        initargs = tuple(spec for _, spec in shared) + (grid.first_day, n_zones, grid.n_fires, years)
+        with ProcessPoolExecutor(min(workers, len(blocks)), initializer=_init_worker, initargs=initargs) as pool:
+            futures = [pool.submit(_run_worker_block, stream, start, stop)
+                       for (start, stop), stream in zip(blocks, streams)]
+            for (start, stop), future in zip(blocks, futures):
+                counts[:, start:stop] = future.result()
+    finally:
+        for block, _ in shared:
+            block.close()
+            block.unlink()
+    return counts[0], counts[1], counts[2]
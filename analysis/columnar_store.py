@@ -0,0 +1,295 @@
+import json
+import os
+import sys
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'utilities'))
+from date_manipulator import duration_minutes, stamps_to_minutes, yyyymmdd_to_ordinal
+from percentile_index import ZoneSizeIndex
+
+
+class Categorical:
+    """
+    A string column stored as integer codes into a sorted array of unique categories
+
+    Parameters:
+        codes (np.ndarray of int32): One code per record, indexing into categories.
+        categories (np.ndarray of str): The unique values of the column, sorted.
+    """
+
+    def __init__(self, codes, categories):
+        self.codes = codes
+        self.categories = categories
+
+    @classmethod
+    def from_values(cls, values):
+        categories, codes = np.unique(np.asarray(values, dtype=str), return_inverse=True)
+        return cls(codes.astype(np.int32), categories)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def code_of(self, value):
+        """Returns the code for value, or -1 if the value never occurs in the column"""
+        idx = np.searchsorted(self.categories, value)
+        if idx < len(self.categories) and self.categories[idx] == value:
+            return int(idx)
+        return -1
+
+    def isin(self, values):
+        """Boolean mask of the records whose value is in values (a str or list of strs)"""
+        if isinstance(values, str):
+            values = [values]
+        wanted = np.isin(self.categories, np.asarray(values, dtype=str))
+        return wanted[self.codes]
+
+    def recode(self, categories):
+        """Returns the codes of this column expressed against a larger, sorted set of categories"""
+        return np.searchsorted(categories, self.categories).astype(np.int32)[self.codes]
+
+    def values(self):
+        return self.categories[self.codes]
+
+
+class Table:
+    """
+    A set of equal-length columns, one NumPy array (or Categorical) per field
+
+    Parameters:
+        columns (dict): Field name -> np.ndarray or Categorical.
+        text_fields (iterable of strs): Numeric columns that were strings in the source JSON (e.g. ISSUED), so
+                                        to_records can hand them back as strings.
+        generations (dict) (optional): Zone -> number of appends that have touched the zone's records.
+        source (dict) (optional): Fingerprint (size, mtime, hash) of the file the table was built from.
+    """
+
+    def __init__(self, columns, text_fields=(), generations=None, source=None):
+        self.columns = columns
+        self.text_fields = set(text_fields)
+        self.generations = generations or {}
+        self.source = source
+        lengths = set(len(col) for col in columns.values())
+        if len(lengths) > 1:
+            raise ValueError('Columns have differing lengths: %s' % sorted(lengths))
+
+    def __len__(self):
+        for col in self.columns.values():
+            return len(col)
+        return 0
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def __contains__(self, name):
+        return name in self.columns
+
+    def subset(self, mask):
+        """A new Table of the rows selected by mask (a boolean mask or row numbers)"""
+        columns = {}
+        for name, col in self.columns.items():
+            columns[name] = Categorical(col.codes[mask], col.categories) if isinstance(col, Categorical) else col[mask]
+        return Table(columns, self.text_fields, self.generations, self.source)
+
+    def to_records(self, mask=None):
+        """Expands the table (or the rows selected by mask) back into a list of dicts"""
+        fields = {}
+        for name, col in self.columns.items():
+            values = col.values() if isinstance(col, Categorical) else col
+            if mask is not None:
+                values = values[mask]
+            if name in self.text_fields:
+                values = values.astype(str)
+            fields[name] = values.tolist()
+        names = list(fields)
+        return [dict(zip(names, row)) for row in zip(*fields.values())]
+
+
+def concat_tables(tables):
+    """Stacks tables with the same fields, merging the categories of their Categorical columns"""
+    columns = {}
+    for name, col in tables[0].columns.items():
+        parts = [table[name] for table in tables]
+        if isinstance(col, Categorical):
+            categories = np.unique(np.concatenate([part.categories for part in parts]))
+            columns[name] = Categorical(np.concatenate([part.recode(categories) for part in parts]), categories)
+        else:
+            columns[name] = np.concatenate(parts)
+    return Table(columns, tables[0].text_fields, tables[0].generations, tables[0].source)
+
+
+# Field name -> column kind for each dataset. 'cat' columns become Categoricals, the rest NumPy dtypes.
+RFW_SCHEMA = {
+    'OBJECTID': np.int32,
+    'WFO': 'cat',
+    'NWS_UGC': 'cat',
+    'STATE': 'cat',
+    'STATUS': 'cat',
+    'RFW_DAYS': 'cat',
+    'FLAT_DATE': 'yyyymmdd',
+    'ISSUED': np.int64,
+    'EXPIRED': np.int64,
+    'INIT_ISS': np.int64,
+    'INIT_EXP': np.int64,
+    'DURATION_MIN': 'minutes',
+}
+
+FIRE_SCHEMA = {
+    'ID': 'id',
+    'WFO': 'cat',
+    'UGC_ZONE': 'cat',
+    'FORESTED': 'cat',
+    'DISC_DATE': 'yyyymmdd',
+    'DISC_TIME': 'hhmm',
+    'STAT_CAUSE': np.int16,
+    'SIZE_AC': np.float64,
+    'BI_PERC': np.float64,
+    'ERC_PERC': np.float64,
+    'FM100_PERC': np.float64,
+    'FM1000_PER': np.float64,
+}
+
+# Columns derived from other fields of the records: column name -> source field, or a tuple of them
+FIELD_SOURCES = {
+    'DISC_TIME': 'DISC_DATE',
+    'DURATION_MIN': ('ISSUED', 'EXPIRED'),
+}
+
+
+def source_fields(name):
+    """The record fields a schema column is built from"""
+    field = FIELD_SOURCES.get(name, name)
+    return field if isinstance(field, tuple) else (field,)
+
+
+def _float_or_nan(value):
+    return np.nan if value is None or value == '' else float(value)
+
+
+def _build_column(kind, values):
+    if kind == 'cat':
+        return Categorical.from_values(values)
+    if kind == 'yyyymmdd':
+        # Dates may come in as ints or strings, and fires carry a time after the date
+        return np.array([int(str(v)[:8]) for v in values], dtype=np.int32)
+    if kind == 'hhmm':
+        # HHMM from the time after the date, -1 for records that only carry a date
+        times = []
+        for v in values:
+            digits = ''.join(c for c in str(v) if c.isdigit())
+            times.append(int(digits[8:12]) if len(digits) >= 12 else -1)
+        return np.array(times, dtype=np.int16)
+    if kind == 'minutes':
+        # Warning length from (ISSUED, EXPIRED) pairs
+        if not len(values):
+            return np.zeros(0, dtype=np.int16)
+        issued, expired = np.array([(int(start), int(end)) for start, end in values], dtype=np.int64).T
+        return duration_minutes(issued, expired)
+    if kind == 'id':
+        ids = np.asarray(values)
+        return ids.astype(str) if ids.dtype == object else ids
+    if np.issubdtype(kind, np.floating):
+        return np.array([_float_or_nan(v) for v in values], dtype=kind)
+    return np.array([int(v) for v in values], dtype=kind)
+
+
+def table_from_records(records, schema):
+    """
+    Builds a columnar Table from a list of JSON records
+
+    Parameters:
+        records (list of dicts): Records as loaded from the RFW or fire JSON files.
+        schema (dict): RFW_SCHEMA or FIRE_SCHEMA. Fields missing from every record are skipped.
+
+    Returns: Table
+    """
+    columns = {}
+    text_fields = []
+    for name, kind in schema.items():
+        fields = source_fields(name)
+        if records and any(field not in records[0] for field in fields):
+            continue
+        if len(fields) == 1:
+            columns[name] = _build_column(kind, [record[fields[0]] for record in records])
+        else:
+            columns[name] = _build_column(kind, [tuple(record[field] for field in fields) for record in records])
+        if kind != 'cat' and fields == (name,) and isinstance(records[0][name], str):
+            text_fields.append(name)
+    return Table(columns, text_fields)
+
+
+def load_table(file_path, schema):
+    with open(file_path) as f:
+        records = json.load(f)
+    return table_from_records(records, schema)
+
+
+class ColumnarStore:
+    """
+    The RFW and fire tables side by side, with zones and WFOs coded against one shared vocabulary
+    so RFW and fire records can be compared code-to-code. Dates are converted once here to day ordinals
+    (rfw_day, fire_day) and ISSUED/EXPIRED to minutes since 1970 (rfw_issued, rfw_expired).
+
+    Parameters:
+        rfws (Table): Flattened RFW days (RFW_SCHEMA).
+        fires (Table): Fire records (FIRE_SCHEMA).
+        size_index (ZoneSizeIndex) (optional): Fire sizes sorted per zone, keyed on the fire table's own UGC_ZONE
+                                               codes. Built on first use when not given.
+    """
+
+    def __init__(self, rfws, fires, size_index=None):
+        self.rfws = rfws
+        self.fires = fires
+        self.size_index = size_index
+
+        self.zones = np.union1d(rfws['NWS_UGC'].categories, fires['UGC_ZONE'].categories)
+        self.wfos = np.union1d(rfws['WFO'].categories, fires['WFO'].categories)
+        self.rfw_zone = rfws['NWS_UGC'].recode(self.zones)
+        self.fire_zone = fires['UGC_ZONE'].recode(self.zones)
+
+        self.rfw_day = yyyymmdd_to_ordinal(rfws['FLAT_DATE'])
+        self.fire_day = yyyymmdd_to_ordinal(fires['DISC_DATE'])
+        self.rfw_issued = stamps_to_minutes(rfws['ISSUED'])
+        self.rfw_expired = stamps_to_minutes(rfws['EXPIRED'])
+        # Warning length in minutes, from the ingested column, or worked out here for stores built without it
+        if 'DURATION_MIN' in rfws:
+            self.rfw_duration = np.asarray(rfws['DURATION_MIN'])
+        else:
+            self.rfw_duration = duration_minutes(rfws['ISSUED'], rfws['EXPIRED'])
+        # Discovery time in minutes since 1970, -1 for fires recorded without a time of day
+        self.fire_minute = np.full(len(fires), -1, dtype=np.int64)
+        if 'DISC_TIME' in fires:
+            times = np.asarray(fires['DISC_TIME'], dtype=np.int64)
+            timed = times >= 0
+            self.fire_minute[timed] = self.fire_day[timed] * 1440 + times[timed] // 100 * 60 + times[timed] % 100
+
+        # Bumped for a zone whenever an append touches its warnings or fires, so anything computed from a zone's
+        # records can tell whether it is stale
+        self.zone_generations = np.zeros(len(self.zones), dtype=np.int64)
+        for generations in (rfws.generations, fires.generations):
+            if generations:
+                zones = np.array(list(generations), dtype=str)
+                in_store = np.isin(zones, self.zones)
+                np.add.at(self.zone_generations, np.searchsorted(self.zones, zones[in_store]),
+                          np.array(list(generations.values()), dtype=np.int64)[in_store])
+
+    def fire_size_index(self):
+        if self.size_index is None:
+            zones = self.fires['UGC_ZONE']
+            self.size_index = ZoneSizeIndex.build(zones.codes, self.fires['SIZE_AC'], len(zones.categories))
+        return self.size_index
+
+    def zone_size_thresholds(self, perc):
+        """The perc-th percentile fire size of every zone code over all fires, NaN for zones without fires"""
+        thresholds = np.full(len(self.zones), np.nan)
+        thresholds[np.searchsorted(self.zones, self.fires['UGC_ZONE'].categories)] = self.fire_size_index().thresholds(perc)
+        return thresholds
+
+    def zones_mask(self, zone):
+        """Boolean mask over the zone codes of the zone(s) given (a str or list of strs)"""
+        if isinstance(zone, str):
+            zone = [zone]
+        return np.isin(self.zones, np.asarray(zone, dtype=str))
+
+    @classmethod
+    def from_json(cls, rfw_file_path, fires_file_path):
+        return cls(load_table(rfw_file_path, RFW_SCHEMA), load_table(fires_file_path, FIRE_SCHEMA))
@@ -0,0 +1,251 @@
+"""
+Precomputed zone x day contingency counts, for answering date-window, zone and WFO queries without the records.
+
+Matching never crosses zones, and an RFW day's hit or a fire day's catch only depends on the other events of its zone
+on the day before or after. So matching the whole dataset once leaves per-(zone, day) counts that any window or zone
+list sums back to its contingency table. The counts are kept per fire class (every cause and forest cover filter
+combination, since those change which fires can hit a warning) as zone-major sorted cells with running totals, so a
+query is two searchsorted calls per zone and a difference of running totals.
+
+query_params selects RFW days in [start, end] and fires in [start, end + 1 day]. Every RFW day's neighbours are in
+the selection, but a fire on the start day caught only by a warning the day before, or on end + 1 caught only by a
+warning that day, is a miss in the query; the cube keeps those fires as their own counts to take back out.
+
+The cube is saved next to the fire cache (CUBE_FILE) with the dataset_version it was built from, and rebuilt when an
+append or a new source changes that version.
+"""
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'utilities'))
+from date_manipulator import yyyymmdd_to_ordinal
+from query_filters import FilterMasks
+from score_cache import dataset_version
+
+CUBE_FILE = 'CONTINGENCY_CUBE.npz'
+# Bumped when the saved layout changes, so older cube files are rebuilt
+CUBE_FORMAT = 1
+CUBE_COUNTS = ('RFW_DAYS', 'HITS', 'FIRE_DAYS', 'CAUGHT', 'CAUGHT_PREV_ONLY', 'CAUGHT_SAME_ONLY')
+
+# query_params arguments a cube can answer; any other filter needs the records
+CUBE_PARAMS = ('start_date', 'end_date', 'wfo', 'zone', 'cause', 'forestcover')
+CUBE_CAUSES = ('human', 'lightning')
+
+
+def class_label(cause=None, forestcover=None):
+    return '%s|%s' % (cause or '', forestcover or '')
+
+
+def fire_classes(store):
+    """(label, fire_mask) of every cause and forest cover filter combination, None masks meaning all fires"""
+    filters = FilterMasks(store)
+    causes = [(None, None)] + [(cause, filters.cause(cause)) for cause in CUBE_CAUSES]
+    covers = [(None, None)] + [(cover, filters.forestcover(cover)) for cover in store.fires['FORESTED'].categories]
+    classes = []
+    for cause, cause_mask in causes:
+        for cover, cover_mask in covers:
+            masks = [mask for mask in (cause_mask, cover_mask) if mask is not None]
+            classes.append((class_label(cause, cover), np.logical_and.reduce(masks) if masks else None))
+    return classes
+
+
+def _cell_counts(rfw_keys, fire_keys, n_zones):
+    """
+    Per-(day, zone) counts of one fire class
+
+    Returns: (sorted unique day-zone keys, np.ndarray of int64 shaped (keys, CUBE_COUNTS))
+    """
+    rfw_hit = (np.isin(rfw_keys, fire_keys, assume_unique=True) |
+               np.isin(rfw_keys + n_zones, fire_keys, assume_unique=True))
+    fire_same = np.isin(fire_keys, rfw_keys, assume_unique=True)
+    fire_prev = np.isin(fire_keys - n_zones, rfw_keys, assume_unique=True)
+
+    cells = np.union1d(rfw_keys, fire_keys)
+    rfw_cell, fire_cell = np.searchsorted(cells, rfw_keys), np.searchsorted(cells, fire_keys)
+    counts = np.zeros((len(cells), len(CUBE_COUNTS)), dtype=np.int64)
+    counts[rfw_cell, 0] = 1
+    counts[rfw_cell, 1] = rfw_hit
+    counts[fire_cell, 2] = 1
+    counts[fire_cell, 3] = fire_same | fire_prev
+    counts[fire_cell, 4] = fire_prev & ~fire_same
+    counts[fire_cell, 5] = fire_same & ~fire_prev
+    return cells, counts
+
+
+class ContingencyCube:
+    """
+    Running contingency counts over zone-major (zone, day) cells, one run of cells per fire class
+
+    Parameters:
+        version (str): dataset_version of the store it was built from.
+        zones, wfos (np.ndarrays of str): The store's zone and WFO vocabularies.
+        wfo_zones (np.ndarray of bool): (zones, wfos) table of the WFOs with records in each zone. WFO queries over
+                                        zones with more than one can't be split from the cube.
+        origin, span (int): Cell keys are zone * span + (day - origin).
+        labels (np.ndarray of str): Fire class labels, from class_label.
+        offsets (np.ndarray of int64): Cells of class i are keys[offsets[i]:offsets[i + 1]].
+        keys (np.ndarray of int64): Cell keys, sorted within each class.
+        totals (np.ndarray of int64): Running CUBE_COUNTS totals, shaped (cells + classes, CUBE_COUNTS), with a zero
+                                      row starting each class.
+    """
+
+    def __init__(self, version, zones, wfos, wfo_zones, origin, span, labels, offsets, keys, totals):
+        self.version = version
+        self.zones = zones
+        self.wfos = wfos
+        self.wfo_zones = wfo_zones
+        self.origin = int(origin)
+        self.span = int(span)
+        self.labels = labels
+        self.offsets = offsets
+        self.keys = keys
+        self.totals = totals
+
+    @classmethod
+    def build(cls, store):
+        n_zones = len(store.zones)
+        days = np.concatenate([store.rfw_day, store.fire_day])
+        origin = int(days.min()) if len(days) else 0
+        # Room for the day after the last event, which a window ending on it looks at
+        span = int(days.max()) - origin + 2 if len(days) else 1
+
+        wfo_zones = np.zeros((n_zones, len(store.wfos)), dtype=bool)
+        wfo_zones[store.rfw_zone, store.rfws['WFO'].recode(store.wfos)] = True
+        wfo_zones[store.fire_zone, store.fires['WFO'].recode(store.wfos)] = True
+
+        rfw_keys = np.unique(store.rfw_day.astype(np.int64) * n_zones + store.rfw_zone)
+        labels, offsets, all_keys, all_totals = [], [0], [], []
+        for label, fire_mask in fire_classes(store):
+            fire_day, fire_zone = store.fire_day, store.fire_zone
+            if fire_mask is not None:
+                fire_day, fire_zone = fire_day[fire_mask], fire_zone[fire_mask]
+            fire_keys = np.unique(fire_day.astype(np.int64) * n_zones + fire_zone)
+            cells, counts = _cell_counts(rfw_keys, fire_keys, n_zones)
+
+            day, zone = np.divmod(cells, n_zones)
+            keys = zone * span + (day - origin)
+            order = np.argsort(keys)
+            labels.append(label)
+            offsets.append(offsets[-1] + len(keys))
+            all_keys.append(keys[order])
+            all_totals.append(np.concatenate([np.zeros((1, len(CUBE_COUNTS)), dtype=np.int64),
+                                              counts[order].cumsum(axis=0)]))
+
+        return cls(dataset_version(store), store.zones, store.wfos, wfo_zones, origin, span, np.array(labels),
+                   np.array(offsets, dtype=np.int64), np.concatenate(all_keys).astype(np.int64),
+                   np.concatenate(all_totals))
+
+    def save(self, path):
+        np.savez(path, format=CUBE_FORMAT, version=np.array(self.version), zones=self.zones, wfos=self.wfos,
+                 wfo_zones=self.wfo_zones, origin=self.origin, span=self.span, labels=self.labels,
+                 offsets=self.offsets, keys=self.keys, totals=self.totals)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as saved:
+            return cls(str(saved['version']), saved['zones'], saved['wfos'], saved['wfo_zones'], int(saved['origin']),
+                       int(saved['span']), saved['labels'], saved['offsets'], saved['keys'], saved['totals'])
+
+    @staticmethod
+    def saved_version(path):
+        """dataset_version of a saved cube, None when it was written in another CUBE_FORMAT"""
+        with np.load(path) as saved:
+            if 'format' not in saved.files or int(saved['format']) != CUBE_FORMAT:
+                return None
+            return str(saved['version'])
+
+    def _fire_class(self, params):
+        """Index of the fire class a query's cause and forestcover arguments select, None if it has none"""
+        cause = params.get('cause')
+        cover = params.get('forestcover')
+        if isinstance(cover, (list, tuple)):
+            cover = cover[0] if len(cover) == 1 else None
+        # FilterMasks.cause leaves fires unfiltered for anything but 'human' and 'lightning'
+        label = class_label(cause if cause in CUBE_CAUSES else None, cover)
+        matches = np.flatnonzero(self.labels == label)
+        return int(matches[0]) if len(matches) else None
+
+    def query_zones(self, params):
+        """
+        Zone codes a query's zone and wfo arguments select, as score_cache.query_zones finds them
+
+        Raises ValueError for a WFO query over a zone where other WFOs have records too.
+        """
+        zones = np.ones(len(self.zones), dtype=bool)
+        if 'zone' in params:
+            zone = params['zone']
+            zones &= np.isin(self.zones, np.asarray([zone] if isinstance(zone, str) else zone, dtype=str))
+        if 'wfo' in params:
+            wfo = params['wfo']
+            wfos = np.isin(self.wfos, np.asarray([wfo] if isinstance(wfo, str) else wfo, dtype=str))
+            zones &= self.wfo_zones[:, wfos].any(axis=1)
+            if (self.wfo_zones[zones][:, ~wfos]).any():
+                raise ValueError('Zones shared between WFOs can only be split by WFO from the records')
+        return np.flatnonzero(zones)
+
+    def supports(self, params):
+        """Whether a query_params argument set can be answered from the cube"""
+        if any(name not in CUBE_PARAMS for name in params):
+            return False
+        if isinstance(params.get('forestcover'), (list, tuple)) and len(params['forestcover']) != 1:
+            return False
+        return self._fire_class(params) is not None
+
+    def _sums(self, index, zones, low, high):
+        """CUBE_COUNTS summed over days [low, high] (ordinals, clipped to the cube) of every zone code given"""
+        low, high = max(low, self.origin), min(high, self.origin + self.span - 1)
+        if low > high:
+            return np.zeros(len(CUBE_COUNTS), dtype=np.int64)
+        start, stop = self.offsets[index], self.offsets[index + 1]
+        keys = self.keys[start:stop]
+        first = np.searchsorted(keys, zones * self.span + (low - self.origin), 'left')
+        last = np.searchsorted(keys, zones * self.span + (high - self.origin), 'right')
+        # Running totals of class index start at row start + index
+        totals = self.totals[start + index:stop + index + 1]
+        return (totals[last] - totals[first]).sum(axis=0)
+
+    def counts(self, params):
+        """
+        Contingency counts of a query, as query_params and match_keys would find them
+
+        Parameters:
+            params (dict): query_params arguments, start_date and end_date included. Check supports first.
+
+        Returns: dict of N_RFW_DAYS, N_FIRE_DAYS, HITS, MISSES and FALSE_ALARMS
+        """
+        index = self._fire_class(params)
+        zones = self.query_zones(params)
+        start_day = int(yyyymmdd_to_ordinal(params['start_date']))
+        end_day = int(yyyymmdd_to_ordinal(params['end_date']))
+
+        rfws = self._sums(index, zones, start_day, end_day)
+        fires = self._sums(index, zones, start_day, end_day + 1)
+        caught = fires[3]
+        if start_day <= end_day + 1:
+            caught -= self._sums(index, zones, start_day, start_day)[4]
+            caught -= self._sums(index, zones, end_day + 1, end_day + 1)[5]
+        n_rfw, hits, n_fire = int(rfws[0]), int(rfws[1]), int(fires[2])
+        return {
+            'N_RFW_DAYS': n_rfw,
+            'N_FIRE_DAYS': n_fire,
+            'HITS': hits,
+            'MISSES': n_fire - int(caught),
+            'FALSE_ALARMS': n_rfw - hits,
+        }
+
+
+def load_cube(store, cache_dir=None):
+    """
+    Loads the cube saved in cache_dir when it matches the store's dataset_version, building (and, with a cache_dir,
+    saving) it otherwise. Stores loaded straight from JSON have no stable version, so their cube is not saved.
+    """
+    version = dataset_version(store)
+    path = os.path.join(cache_dir, CUBE_FILE) if cache_dir else None
+    if path and os.path.exists(path) and ContingencyCube.saved_version(path) == version:
+        return ContingencyCube.load(path)
+    cube = ContingencyCube.build(store)
+    if path and store.fires.source is not None and store.rfws.source is not None:
+        cube.save(path)
+    return cube
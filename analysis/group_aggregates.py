@@ -0,0 +1,211 @@
+"""
+Group-by aggregates of the fire and RFW tables.
+
+Every grouping key (year, month, cause, forest, wfo, zone for fires; year, month, wfo, zone, days for RFW days)
+becomes an integer code per record. The keys of a query are folded into one flat group code, so counts and value
+sums for every combination of them come out of a single np.bincount each. Percentiles reuse the ZoneSizeIndex sort
+with the flat group codes standing in for zones. An aggregate over several keys sums down to any subset of them, so
+one pass over the records can feed every panel of a figure.
+"""
+import numpy as np
+
+from percentile_index import ZoneSizeIndex
+
+# STAT_CAUSE 1 is lightning, 2 - 12 are human causes and 13 is missing/undefined. Anything else is grouped as
+# UNLISTED_CAUSE, so the fires still count towards the other keys; the cause figures leave that group out.
+UNLISTED_CAUSE = 'Other'
+CAUSE_LABELS = np.array(['Human', 'Lightning', 'Missing', UNLISTED_CAUSE])
+CAUSE_CODES = np.array([3, 1] + [0] * 11 + [2])
+FOREST_LABELS = np.array(['Forested', 'Non-Forested'])
+MONTH_LABELS = np.array(['%02i' % month for month in range(1, 13)])
+
+
+def _year(name, per_year):
+    # Dates are yyyymmdd or yyyymmddHHMM integers, so per_year is 10 ** 4 or 10 ** 8
+    def key(table):
+        years, codes = np.unique(table[name] // per_year, return_inverse=True)
+        return codes, years.astype(str)
+    return key
+
+
+def _month(name, per_month):
+    def key(table):
+        return table[name] // per_month % 100 - 1, MONTH_LABELS
+    return key
+
+
+def _cause(table):
+    causes = table['STAT_CAUSE'].astype(np.int64)
+    known = (causes >= 0) & (causes < len(CAUSE_CODES))
+    return np.where(known, CAUSE_CODES[np.where(known, causes, 0)], 3), CAUSE_LABELS
+
+
+def _forest(table):
+    forested = table['FORESTED']
+    return (forested.codes != forested.code_of('yes')).astype(np.int64), FOREST_LABELS
+
+
+def _categorical(name):
+    def key(table):
+        return table[name].codes, table[name].categories
+    return key
+
+
+# Grouping key -> function of a fire Table returning (code per fire, labels)
+GROUP_KEYS = {
+    'year': _year('DISC_DATE', 10 ** 4),
+    'month': _month('DISC_DATE', 10 ** 2),
+    'cause': _cause,
+    'forest': _forest,
+    'wfo': _categorical('WFO'),
+    'zone': _categorical('UGC_ZONE'),
+}
+
+# The same for a flattened RFW Table, dated by ISSUED like RFWs_visuals
+RFW_GROUP_KEYS = {
+    'year': _year('ISSUED', 10 ** 8),
+    'month': _month('ISSUED', 10 ** 6),
+    'wfo': _categorical('WFO'),
+    'zone': _categorical('NWS_UGC'),
+    'days': _categorical('RFW_DAYS'),
+}
+
+
+class GroupAggregate:
+    """
+    Counts, sums and percentiles of a value column over every combination of some grouping keys
+
+    Parameters:
+        by (tuple of str): Grouping keys, one array axis each.
+        labels (list of np.ndarray): Labels of each key, in axis order.
+        counts (np.ndarray of int64): Records per group, shaped by the label lengths.
+        sums (np.ndarray of float): Sum of the value column per group.
+        percentiles (dict) (optional): Percentile -> np.ndarray of the value column's percentile per group, NaN for
+            empty groups.
+    """
+
+    def __init__(self, by, labels, counts, sums, percentiles=None):
+        self.by = tuple(by)
+        self.labels = list(labels)
+        self.counts = counts
+        self.sums = sums
+        self.percentiles = percentiles or {}
+
+    @property
+    def means(self):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self.counts > 0, self.sums / self.counts, np.nan)
+
+    def stat(self, stat):
+        """'count', 'sum', 'mean', or a percentile passed to aggregate"""
+        if stat == 'count':
+            return self.counts
+        if stat == 'sum':
+            return self.sums
+        if stat == 'mean':
+            return self.means
+        if stat in self.percentiles:
+            return self.percentiles[stat]
+        raise ValueError('Unknown statistic %r, the percentiles computed are %s' % (stat, sorted(self.percentiles)))
+
+    def _axis(self, key):
+        if key not in self.by:
+            raise ValueError('Not grouped by %r, the keys are %s' % (key, self.by))
+        return self.by.index(key)
+
+    def marginal(self, *keys):
+        """
+        The aggregate over some of the keys only, in the order given. Percentiles can't be summed, so they're dropped.
+        """
+        axes = [self._axis(key) for key in keys]
+        others = tuple(axis for axis in range(len(self.by)) if axis not in axes)
+        order = np.argsort(np.argsort(axes))
+        counts = np.transpose(self.counts.sum(axis=others), order)
+        sums = np.transpose(self.sums.sum(axis=others), order)
+        return GroupAggregate(keys, [self.labels[axis] for axis in axes], counts, sums)
+
+    def select(self, **labels):
+        """The aggregate with some keys fixed to one label each, e.g. select(forest='Forested')"""
+        index = [slice(None)] * len(self.by)
+        for key, label in labels.items():
+            axis = self._axis(key)
+            matches = np.flatnonzero(self.labels[axis] == label)
+            if not len(matches):
+                raise ValueError('No %s %r' % (key, label))
+            index[axis] = int(matches[0])
+        index = tuple(index)
+        keep = [axis for axis in range(len(self.by)) if isinstance(index[axis], slice)]
+        return GroupAggregate([self.by[axis] for axis in keep], [self.labels[axis] for axis in keep],
+                              self.counts[index], self.sums[index],
+                              {perc: values[index] for perc, values in self.percentiles.items()})
+
+    def to_dict(self, stat='count'):
+        """
+        Returns: dict of label (a tuple of labels when grouped by several keys) -> statistic, for the groups with
+        records, in label order
+        """
+        values = self.stat(stat)
+        result = {}
+        for index in zip(*np.nonzero(self.counts)):
+            labels = tuple(self.labels[axis][i].item() for axis, i in enumerate(index))
+            result[labels[0] if len(labels) == 1 else labels] = values[index].item()
+        return result
+
+    def save(self, path):
+        arrays = {'counts': self.counts, 'sums': self.sums}
+        for axis, labels in enumerate(self.labels):
+            arrays['labels_%i' % axis] = labels
+        for perc, values in self.percentiles.items():
+            arrays['perc_%r' % perc] = values
+        np.savez(path, by=np.array(self.by, dtype=str), **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as saved:
+            by = saved['by'].tolist()
+            percentiles = {}
+            for name in saved.files:
+                if name.startswith('perc_'):
+                    perc = float(name[5:])
+                    percentiles[int(perc) if perc.is_integer() else perc] = saved[name]
+            return cls(by, [saved['labels_%i' % axis] for axis in range(len(by))], saved['counts'], saved['sums'],
+                       percentiles)
+
+
+def aggregate(table, by, value='SIZE_AC', mask=None, percentiles=(), group_keys=GROUP_KEYS):
+    """
+    Aggregates a value column over every combination of the grouping keys in one pass
+
+    Parameters:
+        table (Table): Fire table (FIRE_SCHEMA), or RFW table (RFW_SCHEMA) with RFW_GROUP_KEYS.
+        by (str or tuple of str): Keys of group_keys.
+        value (str): Numeric column to sum, average and take percentiles of. None to only count records.
+        mask (np.ndarray of bool) (optional): Only aggregate these records.
+        percentiles (tuple of numbers) (optional): Percentiles of the value column to compute per group.
+        group_keys (dict): GROUP_KEYS or RFW_GROUP_KEYS.
+
+    Returns: GroupAggregate
+    """
+    by = (by,) if isinstance(by, str) else tuple(by)
+    for key in by:
+        if key not in group_keys:
+            raise ValueError('Unknown grouping key %r, use one of %s' % (key, list(group_keys)))
+    keys = [group_keys[key](table) for key in by]
+    shape = tuple(len(labels) for _, labels in keys)
+    n_groups = int(np.prod(shape))
+
+    if keys:
+        flat = np.ravel_multi_index([codes for codes, _ in keys], shape)
+    else:
+        flat = np.zeros(len(table), dtype=np.int64)
+    values = np.ones(len(table)) if value is None else np.asarray(table[value], dtype=np.float64)
+    if mask is not None:
+        flat, values = flat[mask], values[mask]
+
+    counts = np.bincount(flat, minlength=n_groups).reshape(shape)
+    sums = np.bincount(flat, weights=values, minlength=n_groups).reshape(shape)
+    results = {}
+    if percentiles:
+        index = ZoneSizeIndex.build(flat, values, n_groups)
+        results = {perc: index.thresholds(perc).reshape(shape) for perc in percentiles}
+    return GroupAggregate(by, [labels for _, labels in keys], counts, sums, results)
@@ -0,0 +1,118 @@
+"""
+Hour-resolution matching of fires against the warnings in force when they were discovered.
+
+Instead of collapsing warnings to FLAT_DATE days, each warning product stays one [ISSUED, EXPIRED) interval per zone
+(the flattened days of a product share its interval, so they are deduplicated back to one). Minutes are encoded
+zone-major, zone * span + minute, so every zone's intervals sort into their own run, and the overlapping intervals of a
+zone are merged into a disjoint union. Point and interval lookups are then one searchsorted each. Memory grows with the
+number of warnings and fires, not with the hours the warnings cover.
+
+A warning is a hit when a fire is discovered inside it (widened by before/after minutes), a fire is caught when it
+falls inside any warning of its zone. Fires recorded without a time of day either count as covering their whole
+discovery day ('day') or are left out ('drop').
+"""
+import numpy as np
+
+UNTIMED_POLICIES = ('day', 'drop')
+DAY_MINUTES = 1440
+
+
+class IntervalIndex:
+    """
+    Disjoint [start, end) intervals over zone-major keys, for point and interval lookups by searchsorted
+
+    Parameters:
+        starts, ends (np.ndarrays of int64): Interval bounds as zone-major keys, in any order, overlapping or not.
+                                             Every interval must lie within its zone's run of keys.
+    """
+
+    def __init__(self, starts, ends):
+        order = np.argsort(starts, kind='stable')
+        starts, ends = starts[order], ends[order]
+        # A new run begins where an interval starts after everything before it has ended
+        reach = np.maximum.accumulate(ends) if len(ends) else ends
+        first = np.ones(len(starts), dtype=bool)
+        first[1:] = starts[1:] > reach[:-1]
+        run_starts = np.flatnonzero(first)
+        self.starts = starts[run_starts]
+        self.ends = np.maximum.reduceat(ends, run_starts) if len(ends) else ends
+
+    def __len__(self):
+        return len(self.starts)
+
+    def contains(self, keys):
+        """Boolean mask of the keys inside an interval"""
+        if not len(self.starts):
+            return np.zeros(len(keys), dtype=bool)
+        idx = np.searchsorted(self.starts, keys, 'right') - 1
+        return (idx >= 0) & (keys < self.ends[np.maximum(idx, 0)])
+
+    def overlaps(self, starts, ends):
+        """Boolean mask of the [start, end) intervals overlapping an interval of the index"""
+        if not len(self.starts):
+            return np.zeros(len(starts), dtype=bool)
+        idx = np.searchsorted(self.starts, ends, 'left') - 1
+        return (idx >= 0) & (self.ends[np.maximum(idx, 0)] > starts)
+
+
+def _count_in(sorted_keys, lows, highs):
+    """Number of sorted_keys in [low, high) for every pair"""
+    return np.searchsorted(sorted_keys, highs, 'left') - np.searchsorted(sorted_keys, lows, 'left')
+
+
+def hourly_contingency(warn_zone, warn_start, warn_end, fire_zone, fire_day, fire_minute, before=0, after=0,
+                       untimed='day'):
+    """
+    Contingency counts of warning intervals against fire discovery times
+
+    Parameters:
+        warn_zone, warn_start, warn_end (np.ndarrays): Zone code and [start, end) minutes since 1970 of every warning
+                                                       record. Records repeating a (zone, start, end) count once.
+        fire_zone, fire_day, fire_minute (np.ndarrays): Zone code, day ordinal and discovery minute (-1 when
+                                                        untimed) of every fire record.
+        before, after (int): Minutes before issuance and after expiry a fire may be discovered in to still count.
+        untimed (str): 'day' to match fires without a time over their whole discovery day, 'drop' to leave them out.
+
+    Returns: dict of N_WARNINGS, N_FIRES, N_UNTIMED_FIRES, HITS, MISSES and FALSE_ALARMS. Fires are counted once per
+             zone and minute (per zone and day when untimed).
+    """
+    if untimed not in UNTIMED_POLICIES:
+        raise ValueError('Unknown untimed policy %r, use one of %s' % (untimed, UNTIMED_POLICIES))
+    warnings = np.unique(np.stack([warn_zone, warn_start, np.maximum(warn_end, warn_start)], axis=1).astype(np.int64),
+                         axis=0).reshape(-1, 3)
+    timed = fire_minute >= 0
+    points = np.unique(np.stack([fire_zone[timed], fire_minute[timed]], axis=1).astype(np.int64), axis=0).reshape(-1, 2)
+    days = np.zeros((0, 2), dtype=np.int64)
+    if untimed == 'day':
+        days = np.unique(np.stack([fire_zone[~timed], fire_day[~timed] * DAY_MINUTES], axis=1).astype(np.int64),
+                         axis=0).reshape(-1, 2)
+
+    # Zone-major keys, with room for the widened warnings and whole days at both ends of every zone's run
+    minutes = np.concatenate([warnings[:, 1], warnings[:, 2], points[:, 1], days[:, 1]])
+    pad = before + after + DAY_MINUTES
+    origin = int(minutes.min()) - pad if len(minutes) else 0
+    span = int(minutes.max()) - origin + pad + 1 if len(minutes) else 1
+
+    def keys(zones, minute):
+        return zones * span + (minute - origin)
+
+    lows = keys(warnings[:, 0], warnings[:, 1] - before)
+    highs = keys(warnings[:, 0], warnings[:, 2] + after)
+    point_keys = np.sort(keys(points[:, 0], points[:, 1]))
+    day_keys = np.sort(keys(days[:, 0], days[:, 1]))
+
+    # A warning is hit by a discovery inside it or by an untimed fire day overlapping it
+    hit = (_count_in(point_keys, lows, highs) > 0) | (_count_in(day_keys, lows - DAY_MINUTES + 1, highs) > 0)
+    index = IntervalIndex(lows, highs)
+    caught = int(index.contains(point_keys).sum()) + int(index.overlaps(day_keys, day_keys + DAY_MINUTES).sum())
+
+    HITS = int(hit.sum())
+    n_fires = len(point_keys) + len(day_keys)
+    return {
+        'N_WARNINGS': len(warnings),
+        'N_FIRES': n_fires,
+        'N_UNTIMED_FIRES': len(day_keys),
+        'HITS': HITS,
+        'MISSES': n_fires - caught,
+        'FALSE_ALARMS': len(warnings) - HITS,
+    }
@@ -0,0 +1,134 @@
+"""
+Per-zone fire size percentile index.
+
+Fire sizes are sorted once per zone (a single lexsort on zone code and size), so the size at any percentile of any zone
+is read straight off the sorted segment in O(1), and picking the fires at or above their zone's percentile is one
+vectorized comparison. The index can be saved next to the fire data so it isn't rebuilt on every run.
+"""
+import numpy as np
+
+
+class ZoneSizeIndex:
+    """
+    Fire sizes sorted within each zone
+
+    Parameters:
+        sorted_sizes (np.ndarray of float): Sizes ordered by zone code, then size.
+        offsets (np.ndarray of int64): Zone z's sizes are sorted_sizes[offsets[z]:offsets[z + 1]].
+    """
+
+    def __init__(self, sorted_sizes, offsets):
+        self.sorted_sizes = sorted_sizes
+        self.offsets = offsets
+
+    @classmethod
+    def build(cls, zone_codes, sizes, n_zones, mask=None):
+        """
+        Parameters:
+            zone_codes (np.ndarray of ints): Zone code of every fire, in [0, n_zones).
+            sizes (np.ndarray of float): SIZE_AC of every fire.
+            n_zones (int): Number of zone codes.
+            mask (np.ndarray of bool) (optional): Only index these fires.
+        """
+        if mask is not None:
+            zone_codes, sizes = zone_codes[mask], sizes[mask]
+        order = np.lexsort((sizes, zone_codes))
+        offsets = np.zeros(n_zones + 1, dtype=np.int64)
+        np.cumsum(np.bincount(zone_codes, minlength=n_zones), out=offsets[1:])
+        return cls(np.asarray(sizes, dtype=np.float64)[order], offsets)
+
+    @property
+    def n_zones(self):
+        return len(self.offsets) - 1
+
+    def counts(self):
+        return np.diff(self.offsets)
+
+    def _percentiles(self, starts, counts, perc):
+        """Interpolates the perc-th percentile of non-empty sorted segments the same way np.percentile does"""
+        virtual = (counts - 1) * np.true_divide(perc, 100)
+        below = np.floor(virtual)
+        above = np.minimum(below + 1, counts - 1)
+        gamma = virtual - below
+        low = self.sorted_sizes[starts + below.astype(np.int64)]
+        high = self.sorted_sizes[starts + above.astype(np.int64)]
+        # np.percentile's lerp: interpolate from whichever end is nearer
+        diff = high - low
+        return np.where(gamma >= 0.5, high - diff * (1 - gamma), low + diff * gamma)
+
+    def thresholds(self, perc):
+        """
+        The perc-th percentile size of every zone
+
+        Returns: np.ndarray of float, one value per zone code, NaN for zones without fires
+        """
+        counts = self.counts()
+        has_fires = counts > 0
+        thresholds = np.full(self.n_zones, np.nan)
+        thresholds[has_fires] = self._percentiles(self.offsets[:-1][has_fires], counts[has_fires], perc)
+        return thresholds
+
+    def threshold(self, zone_code, perc):
+        """The perc-th percentile size of one zone, NaN if it has no fires"""
+        start, stop = self.offsets[zone_code], self.offsets[zone_code + 1]
+        if start == stop:
+            return np.nan
+        return float(self._percentiles(np.array([start]), np.array([stop - start]), perc)[0])
+
+    def large_mask(self, zone_codes, sizes, perc):
+        """Boolean mask of the fires whose size is at or above their zone's perc-th percentile"""
+        with np.errstate(invalid='ignore'):
+            return sizes >= self.thresholds(perc)[zone_codes]
+
+    def recode(self, old_to_new, n_zones):
+        """
+        The same index against a larger, sorted zone vocabulary (e.g. after an append brought in new zones)
+
+        Parameters:
+            old_to_new (np.ndarray of ints): New code of every current zone code, increasing.
+            n_zones (int): Number of new zone codes.
+        """
+        counts = np.zeros(n_zones, dtype=np.int64)
+        counts[old_to_new] = self.counts()
+        offsets = np.zeros(n_zones + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        return ZoneSizeIndex(self.sorted_sizes, offsets)
+
+    def updated(self, removed_zones, removed_sizes, added_zones, added_sizes):
+        """
+        A new index with some fires taken out and others put in, re-sorting only the zones they belong to
+
+        Parameters:
+            removed_zones, removed_sizes (np.ndarrays): Zone codes and sizes of fires to drop, which must be indexed.
+            added_zones, added_sizes (np.ndarrays): Zone codes and sizes of fires to add.
+        """
+        removed_sizes = np.asarray(removed_sizes, dtype=np.float64)
+        added_sizes = np.asarray(added_sizes, dtype=np.float64)
+        counts = self.counts()
+        pieces = []
+        copied_to = 0
+        for zone in np.union1d(removed_zones, added_zones).tolist():
+            start, stop = self.offsets[zone], self.offsets[zone + 1]
+            segment = self.sorted_sizes[start:stop]
+            gone = np.sort(removed_sizes[removed_zones == zone])
+            if len(gone):
+                # One position per removed fire, stepping past earlier copies of the same size
+                repeat = np.arange(len(gone)) - np.searchsorted(gone, gone)
+                segment = np.delete(segment, np.searchsorted(segment, gone) + repeat)
+            segment = np.sort(np.concatenate([segment, added_sizes[added_zones == zone]]))
+            pieces += [self.sorted_sizes[copied_to:start], segment]
+            copied_to = stop
+            counts[zone] = len(segment)
+        pieces.append(self.sorted_sizes[copied_to:])
+
+        offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        return ZoneSizeIndex(np.concatenate(pieces), offsets)
+
+    def save(self, path):
+        np.savez(path, sorted_sizes=self.sorted_sizes, offsets=self.offsets)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as saved:
+            return cls(saved['sorted_sizes'], saved['offsets'])
@@ -0,0 +1,243 @@
+import os
+import sys
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'utilities'))
+from date_manipulator import yyyymmdd_to_ordinal
+from percentile_index import ZoneSizeIndex
+
+HUMAN_CAUSES = (2, 12)  # STAT_CAUSE codes 2 through 12
+LIGHTNING_CAUSE = 1
+
+NFDRS_INDICES = ('BI_PERC', 'ERC_PERC', 'FM100_PERC', 'FM1000_PER')
+NFDRS_OPERATORS = {
+    '<': np.less,
+    '<=': np.less_equal,
+    '==': np.equal,
+    '!=': np.not_equal,
+    '>=': np.greater_equal,
+    '>': np.greater,
+}
+
+# Warning length buckets in hours, each (edge, next edge]. The first edge is -1 so zero-length warnings fall in the
+# first bucket; the duration argument names a bucket by its upper edge (6, 12, 18 or 24).
+DURATION_EDGES = (-1, 6, 12, 18, 24, np.inf)
+
+
+def freeze(value):
+    """Makes a query_params argument hashable so it can key the mask memo"""
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+def duration_bounds(duration):
+    """
+    (exclusive low, inclusive high) hours of a duration argument: the upper edge of a DURATION_EDGES bucket, or a
+    (low, high) pair with high None for open-ended. None for anything else.
+    """
+    if isinstance(duration, (list, tuple)):
+        low, high = duration
+        return float(low), np.inf if high is None else float(high)
+    edges = list(DURATION_EDGES)
+    if duration in edges[1:]:
+        upper = edges.index(duration)
+        return edges[upper - 1], edges[upper]
+    return None
+
+
+def duration_label(low, high):
+    return '%g+' % low if np.isinf(high) else '%g-%g' % (max(low, 0), high)
+
+
+def nfdrs_conditions(nfdrs_param):
+    """
+    Normalizes an nfdrs_param argument to a tuple of (index, operator, threshold) conditions
+
+    Parameters:
+        nfdrs_param (list): One [index, operator, threshold] condition, or a list of them that must all hold.
+
+    Raises ValueError for an index outside NFDRS_INDICES or an operator outside NFDRS_OPERATORS.
+    """
+    if len(nfdrs_param) and isinstance(nfdrs_param[0], str):
+        nfdrs_param = [nfdrs_param]
+    conditions = []
+    for condition in nfdrs_param:
+        if len(condition) != 3:
+            raise ValueError('NFDRS conditions are [index, operator, threshold], got %r' % (condition,))
+        fd_index, fd_operator, fd_threshold = condition
+        if fd_index not in NFDRS_INDICES:
+            raise ValueError('Unknown NFDRS index %r, use one of %s' % (fd_index, NFDRS_INDICES))
+        if fd_operator not in NFDRS_OPERATORS:
+            raise ValueError('Unknown NFDRS operator %r, use one of %s' % (fd_operator, list(NFDRS_OPERATORS)))
+        conditions.append((fd_index, fd_operator, float(fd_threshold)))
+    return tuple(conditions)
+
+
+class FilterMasks:
+    """
+    Builds the boolean masks VerifySkill.query_params combines, one filter at a time against the full dataset.
+
+    With memoize=True every mask is kept, keyed on the filter and its argument, so a batch of queries that share
+    filter values (a sweep over a parameter grid) computes each of them only once. Memoized masks are shared
+    between calls and must not be modified in place.
+
+    Parameters:
+        store (ColumnarStore): The loaded dataset.
+        memoize (bool): Keep masks between calls.
+    """
+
+    def __init__(self, store, memoize=False):
+        self.store = store
+        self.memoize = memoize
+        self._memo = {}
+
+    def _cached(self, key, build):
+        if not self.memoize:
+            return build()
+        if key not in self._memo:
+            self._memo[key] = build()
+        return self._memo[key]
+
+    def wfo(self, wfo):
+        """(rfw_mask, fire_mask) of the records issued by / reported to the WFO(s)"""
+        return self._cached(('wfo', freeze(wfo)), lambda: (self.store.rfws['WFO'].isin(wfo),
+                                                           self.store.fires['WFO'].isin(wfo)))
+
+    def zone_thresholds(self, perc_size, wfo=None):
+        """
+        Per-zone fire size percentiles, computed over the fires of the WFO(s) given (all fires if wfo is None)
+
+        Returns: np.ndarray of float, one threshold per zone code, NaN for zones without fires
+        """
+        def build():
+            thresholds = self.store.zone_size_thresholds(perc_size)
+            if wfo is None:
+                return thresholds
+
+            # Zones whose fires all belong to the WFO(s) keep their precomputed percentile, zones shared with other
+            # WFOs are recomputed over their in-WFO fires only
+            zone_codes = self.store.fire_zone
+            wfo_fires = self.wfo(wfo)[1]
+            n_zones = len(self.store.zones)
+            in_wfo = np.bincount(zone_codes[wfo_fires], minlength=n_zones)
+            shared = (in_wfo > 0) & (in_wfo < np.bincount(zone_codes, minlength=n_zones))
+            thresholds[in_wfo == 0] = np.nan
+            if shared.any():
+                index = ZoneSizeIndex.build(zone_codes, self.store.fires['SIZE_AC'], n_zones, wfo_fires & shared[zone_codes])
+                thresholds[shared] = index.thresholds(perc_size)[shared]
+            return thresholds
+
+        return self._cached(('zone_thresholds', perc_size, freeze(wfo)), build)
+
+    def large_fires(self, perc_size, wfo=None):
+        """fire_mask of the fires at or above their zone's perc_size percentile size"""
+        def build():
+            thresholds = self.zone_thresholds(perc_size, wfo)
+            with np.errstate(invalid='ignore'):
+                large = self.store.fires['SIZE_AC'] >= thresholds[self.store.fire_zone]
+            if wfo is not None:
+                large &= self.wfo(wfo)[1]
+            return large
+
+        return self._cached(('large_fires', perc_size, freeze(wfo)), build)
+
+    def dates(self, start_date, end_date):
+        """(rfw_mask, fire_mask) of RFW days in [start_date, end_date] and fires in [start_date, end_date + 1 day]"""
+        def build():
+            start_day, end_day = yyyymmdd_to_ordinal(start_date), yyyymmdd_to_ordinal(end_date)
+            return ((self.store.rfw_day >= start_day) & (self.store.rfw_day <= end_day),
+                    (self.store.fire_day >= start_day) & (self.store.fire_day <= end_day + 1))
+
+        return self._cached(('dates', start_date, end_date), build)
+
+    def zone(self, zone):
+        """(rfw_mask, fire_mask) of the records in the fire weather zone(s)"""
+        return self._cached(('zone', freeze(zone)), lambda: (self.store.rfws['NWS_UGC'].isin(zone),
+                                                             self.store.fires['UGC_ZONE'].isin(zone)))
+
+    def forestcover(self, forestcover):
+        return self._cached(('forestcover', forestcover), lambda: self.store.fires['FORESTED'].isin(forestcover))
+
+    def cause(self, cause):
+        """fire_mask for 'human' or 'lightning' ignitions, or None (no filtering) for anything else"""
+        def build():
+            causes = self.store.fires['STAT_CAUSE']
+            if cause == 'lightning':
+                return causes == LIGHTNING_CAUSE
+            if cause == 'human':
+                return (causes >= HUMAN_CAUSES[0]) & (causes <= HUMAN_CAUSES[1])
+            return None
+
+        return self._cached(('cause', cause), build)
+
+    def nfdrs_condition(self, fd_index, fd_operator, fd_threshold):
+        """fire_mask for one NFDRS condition. Fires without a value for the index never match, not even with '!='."""
+        def build():
+            values = np.asarray(self.store.fires[fd_index])
+            return NFDRS_OPERATORS[fd_operator](values, fd_threshold) & ~np.isnan(values)
+
+        return self._cached(('nfdrs', fd_index, fd_operator, fd_threshold), build)
+
+    def nfdrs(self, nfdrs_param):
+        """fire_mask of the fires meeting every condition of an nfdrs_param argument (see nfdrs_conditions)"""
+        masks = [self.nfdrs_condition(*condition) for condition in nfdrs_conditions(nfdrs_param)]
+        return np.logical_and.reduce(masks) if masks else np.ones(len(self.store.fires), dtype=bool)
+
+    def duration_codes(self, edges=DURATION_EDGES):
+        """
+        Bucket of every RFW record's length among (edges[i], edges[i + 1]] hours: -1 at or below the first edge,
+        len(edges) - 1 above the last
+        """
+        def build():
+            return np.digitize(self.store.rfw_duration, np.asarray(edges, dtype=np.float64) * 60, right=True) - 1
+
+        return self._cached(('duration_codes', tuple(edges)), build)
+
+    def duration(self, duration):
+        """rfw_mask of the warnings whose length falls in the duration bucket (see duration_bounds)"""
+        def build():
+            bounds = duration_bounds(duration)
+            if bounds is None:
+                return np.zeros(len(self.store.rfw_duration), dtype=bool)
+            return self.duration_codes(bounds) == 0
+
+        return self._cached(('duration', freeze(duration)), build)
+
+    def select(self, start_date, end_date, **kwargs):
+        """
+        Combines the filters for one set of query_params arguments
+
+        Returns: (rfw_mask, fire_mask), freshly allocated so callers may keep or modify them
+        """
+        rfw_mask, fire_mask = (mask.copy() for mask in self.dates(start_date, end_date))
+
+        if 'wfo' in kwargs:
+            wfo_rfws, wfo_fires = self.wfo(kwargs['wfo'])
+            rfw_mask &= wfo_rfws
+            fire_mask &= wfo_fires
+
+        # Percentiles come from every fire of the WFO(s), before the date and other filters shrink the set
+        if 'perc_size' in kwargs:
+            fire_mask &= self.large_fires(kwargs['perc_size'], kwargs.get('wfo'))
+
+        if 'zone' in kwargs:
+            zone_rfws, zone_fires = self.zone(kwargs['zone'])
+            rfw_mask &= zone_rfws
+            fire_mask &= zone_fires
+
+        if 'forestcover' in kwargs:
+            fire_mask &= self.forestcover(kwargs['forestcover'])
+
+        if 'cause' in kwargs:
+            cause_mask = self.cause(kwargs['cause'])
+            if cause_mask is not None:
+                fire_mask &= cause_mask
+
+        if 'nfdrs_param' in kwargs:
+            fire_mask &= self.nfdrs(kwargs['nfdrs_param'])
+
+        if 'duration' in kwargs:
+            rfw_mask &= self.duration(kwargs['duration'])
+
+        return rfw_mask, fire_mask
@@ -0,0 +1,302 @@
+"""
+Command-line entry point for batch verification runs.
+
+Every query of a job file runs in one process against one loaded dataset, so the interpreter start, imports and
+data load are paid once per batch instead of once per query. Results are written to a CSV, JSON or Parquet file
+(picked from the output extension, or --format); VerifySkill's console output is dropped.
+
+Job files are JSON, either a list of query specs or {"defaults": {...}, "queries": [...]}. A spec holds
+query_params arguments (start_date, end_date, wfo, zone, perc_size, ...) and optionally a name, n_replicates and
+seed. Sweep grids are JSON too, in either form VerifySkill.sweep accepts.
+
+A spec selecting no fires or RFWs gets NaN scores. A spec that fails, for example with an unknown NFDRS index, gets
+an ERROR column instead, and the rest of the batch is still written.
+
+Usage:
+    python analysis/redflag_verify.py run jobs.json -o forecast.csv
+    python analysis/redflag_verify.py climo jobs.json -o skill.json --seed 1
+    python analysis/redflag_verify.py sweep 20060101 20151231 grid.json -o sweep.csv --climo
+    python analysis/redflag_verify.py bench jobs.json -o timings.csv --repeat 5
+    python analysis/redflag_verify.py windows jobs.json -o curve.csv --max-width 7 --lead-buckets 0 1 2+
+    python analysis/redflag_verify.py nfdrs jobs.json ERC_PERC -o erc.csv --operator '>=' --thresholds 0 100 5
+    python analysis/redflag_verify.py durations jobs.json -o durations.csv --edges -1 6 12 24 inf
+"""
+import argparse
+import contextlib
+import csv
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from query_filters import DURATION_EDGES, NFDRS_INDICES
+from score_cache import ScoreCache, jsonable
+from threshold_sweep import SWEEP_OPERATORS
+from verification_funcs import VerifySkill, cell_label, skill_scores
+from window_match import WINDOW_SHAPES, parse_bucket, window_pairs
+
+# Spec keys that are settings of the run rather than query_params arguments
+RUN_KEYS = ('name', 'n_replicates', 'seed')
+
+
+def read_jobs(path):
+    """Loads a job file into a list of specs, each with the file's defaults filled in"""
+    with open(path) as f:
+        jobs = json.load(f)
+    defaults = {}
+    if isinstance(jobs, dict):
+        defaults, jobs = jobs.get('defaults', {}), jobs['queries']
+    specs = []
+    for i, spec in enumerate(jobs):
+        spec = dict(defaults, **spec)
+        spec.setdefault('name', str(i))
+        for name in ('start_date', 'end_date'):
+            if name not in spec:
+                raise ValueError('Query %s has no %s' % (spec['name'], name))
+        specs.append(spec)
+    return specs
+
+
+def query_args(spec):
+    return {name: value for name, value in spec.items() if name not in RUN_KEYS}
+
+
+def spec_row(spec):
+    """The name and query arguments of a spec as output columns"""
+    row = {'name': spec['name']}
+    for name, value in query_args(spec).items():
+        row[name] = cell_label(value) if isinstance(value, (list, tuple)) else value
+    return row
+
+
+def spec_rows(verify, specs, score):
+    """
+    Selects every spec and scores it with score(query, spec), which returns its rows. A spec that can't be selected or
+    scored (an unknown NFDRS index, a malformed argument) gets one row holding its ERROR instead, so the rest of the
+    batch is still written. Specs selecting no fires or RFWs are scored as usual, with NaN scores.
+
+    Returns: list of dicts, the spec_row columns followed by each row's own
+    """
+    rows = []
+    for spec in specs:
+        args = query_args(spec)
+        try:
+            query = verify.query_params(args.pop('start_date'), args.pop('end_date'), **args)
+            spec_output = score(query, spec)
+        except (KeyError, TypeError, ValueError) as err:
+            rows.append(dict(spec_row(spec), ERROR='%s: %s' % (type(err).__name__, err)))
+            continue
+        rows.extend(dict(spec_row(spec), **row) for row in spec_output)
+    return rows
+
+
+def score_jobs(verify, specs, climo, n_replicates, seed, workers, bootstrap=None):
+    """
+    Scores every spec, with the climatology and skill scores too when climo is True
+
+    Parameters:
+        bootstrap (dict) (optional): bootstrap_skill_scores arguments (n_resamples, block, level) to add interval
+                                     columns BIAS_LOW, BIAS_HIGH, ... CSI_HIGH.
+
+    Returns: list of dicts, one row per spec. Climatology columns are named as in VerifySkill.sweep.
+    """
+    def score(query, spec):
+        forecast = query.forecast_skill_scores()
+        row = dict(forecast)
+        if bootstrap:
+            intervals = query.bootstrap_skill_scores(seed=spec.get('seed', seed), **bootstrap)
+            for name in ('BIAS', 'POD', 'FAR', 'CSI'):
+                row[name + '_LOW'], row[name + '_HIGH'] = intervals[name + '_CI']
+        if climo:
+            climo_dict = query.climo_skill_scores(forecast, spec.get('n_replicates', n_replicates),
+                                                  spec.get('seed', seed), workers)
+            for name in ('BIAS', 'POD', 'FAR', 'CSI'):
+                row['CLIMO_' + name] = climo_dict[name]
+            row['SIG_TEST'] = climo_dict['SIG_TEST']
+            row.update(skill_scores(forecast, climo_dict))
+        return [row]
+
+    return spec_rows(verify, specs, score)
+
+
+def bench_jobs(verify, specs, repeat, n_replicates, seed, workers):
+    """
+    Times each stage of every spec, best and median over repeat runs. verify should have its score cache and
+    query memo turned off, so every run does the full computation. The selection spec_rows makes to check the spec
+    comes before the timed runs.
+
+    Returns: list of dicts with name, stage, BEST_S and MEDIAN_S columns
+    """
+    def score(query, spec):
+        args = query_args(spec)
+        start_date, end_date = args.pop('start_date'), args.pop('end_date')
+        timings = {'query_params': [], 'forecast': [], 'climo': []}
+        for _ in range(repeat):
+            started = time.perf_counter()
+            query = verify.query_params(start_date, end_date, **args)
+            timings['query_params'].append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            forecast = query.forecast_skill_scores()
+            timings['forecast'].append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            query.climo_skill_scores(forecast, spec.get('n_replicates', n_replicates), spec.get('seed', seed), workers)
+            timings['climo'].append(time.perf_counter() - started)
+
+        return [{'stage': stage, 'BEST_S': min(seconds), 'MEDIAN_S': float(np.median(seconds))}
+                for stage, seconds in timings.items()]
+
+    return spec_rows(verify, specs, score)
+
+
+def window_rows(verify, specs, windows, lead_buckets, lead_reference):
+    """Scores every spec over the windows (and lead buckets): one row per spec, bucket and window"""
+    return spec_rows(verify, specs,
+                     lambda query, spec: sweep_rows(query.window_scores(windows, lead_buckets, lead_reference)))
+
+
+def nfdrs_rows(verify, specs, fd_index, fd_operator, thresholds):
+    """Scores every spec over the NFDRS thresholds: one row per spec and threshold"""
+    return spec_rows(verify, specs,
+                     lambda query, spec: sweep_rows(query.nfdrs_sweep(fd_index, fd_operator, thresholds)))
+
+
+def duration_rows(verify, specs, edges):
+    """Scores every spec per warning length bucket: one row per spec and bucket"""
+    return spec_rows(verify, specs, lambda query, spec: sweep_rows(query.duration_scores(edges)))
+
+
+def sweep_rows(table):
+    """The structured array from VerifySkill.sweep as a list of dicts"""
+    return [{name: table[name][i].item() for name in table.dtype.names} for i in range(len(table))]
+
+
+def write_rows(rows, path, fmt=None):
+    """
+    Writes result rows to path as CSV, JSON or Parquet
+
+    Parameters:
+        rows (list of dicts): Output rows. Columns are the union of their keys, in first-seen order.
+        path (str): Output file.
+        fmt (str) (optional): 'csv', 'json' or 'parquet'. Taken from the extension of path when omitted.
+    """
+    fmt = (fmt or os.path.splitext(path)[1].lstrip('.') or 'csv').lower()
+    names = []
+    for row in rows:
+        names.extend(name for name in row if name not in names)
+
+    if fmt == 'csv':
+        with open(path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, names, restval='')
+            writer.writeheader()
+            writer.writerows(rows)
+    elif fmt == 'json':
+        with open(path, 'w') as f:
+            json.dump([jsonable(row) for row in rows], f, indent=2)
+    elif fmt == 'parquet':
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise SystemExit('Parquet output needs pyarrow (pip install pyarrow)')
+        pyarrow.parquet.write_table(pyarrow.Table.from_pylist([{name: row.get(name) for name in names} for row in rows]), path)
+    else:
+        raise SystemExit('Unknown output format %r, use csv, json or parquet' % fmt)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Batch RFW verification against one loaded dataset')
+    parser.add_argument('--rfw', default='data/RFWs_Northwest.json', help='Flattened RFW JSON or column directory')
+    parser.add_argument('--fires', default='data/Fires_Northwest.json', help='Fire JSON or column directory')
+    parser.add_argument('--no-cache', action='store_true', help='Read the JSON files without the binary column cache')
+    parser.add_argument('--score-cache', help='SQLite file of cached scores shared between runs')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    def add_command(name, help_text, jobs=True):
+        sub = subparsers.add_parser(name, help=help_text)
+        if jobs:
+            sub.add_argument('jobs', help='JSON job file of query specs')
+        sub.add_argument('-o', '--output', required=True, help='Result file (.csv, .json or .parquet)')
+        sub.add_argument('--format', choices=['csv', 'json', 'parquet'], help='Override the output extension')
+        sub.add_argument('--n-replicates', type=int, default=100, help='Climatology replicates (default 100)')
+        sub.add_argument('--seed', type=int, default=None, help='Climatology seed, for reproducible results')
+        sub.add_argument('--workers', type=int, default=1, help='Processes per climatology (default 1)')
+        return sub
+
+    for name, help_text in (('run', 'Forecast scores for every query of a job file'),
+                            ('climo', 'Forecast, climatology and skill scores for every query of a job file')):
+        sub = add_command(name, help_text)
+        sub.add_argument('--bootstrap', type=int, metavar='N', help='Add intervals from N block-bootstrap resamples')
+        sub.add_argument('--block', choices=['year', 'season'], default='year', help='Bootstrap block (default year)')
+        sub.add_argument('--level', type=float, default=95, help='Interval coverage in percent (default 95)')
+    sweep = add_command('sweep', 'Scores over a grid of query arguments (VerifySkill.sweep)', jobs=False)
+    sweep.add_argument('start_date', type=int)
+    sweep.add_argument('end_date', type=int)
+    sweep.add_argument('grid', help='JSON grid: {argument: [values]} or a list of argument dicts')
+    sweep.add_argument('--climo', action='store_true', help='Add climatology and skill scores to every cell')
+    bench = add_command('bench', 'Time query_params, forecast and climatology for every query of a job file')
+    bench.add_argument('--repeat', type=int, default=3, help='Runs per query (default 3)')
+    windows = add_command('windows', 'POD/FAR/CSI against the matching window width for every query of a job file')
+    windows.add_argument('--max-width', type=int, default=7, help='Widest window in days (default 7)')
+    windows.add_argument('--shape', choices=list(WINDOW_SHAPES), default='after',
+                         help='Fires within the width after, before or either side of the RFW day (default after)')
+    windows.add_argument('--lead-buckets', nargs='+', help="Lead days to score separately, e.g. 0 1 2-3 4+")
+    windows.add_argument('--lead-reference', choices=['INIT_ISS', 'ISSUED'], default='INIT_ISS',
+                         help='Issue time lead days are counted from (default INIT_ISS)')
+    nfdrs = add_command('nfdrs', 'POD/FAR/CSI against an NFDRS threshold for every query of a job file')
+    nfdrs.add_argument('index', choices=list(NFDRS_INDICES))
+    nfdrs.add_argument('--operator', choices=list(SWEEP_OPERATORS), default='>=',
+                       help='Keep fires with index <operator> threshold (default >=)')
+    nfdrs.add_argument('--thresholds', type=float, nargs=3, default=(0, 100, 1), metavar=('FIRST', 'LAST', 'STEP'),
+                       help='Threshold range, inclusive (default 0 100 1)')
+    durations = add_command('durations', 'POD/FAR/CSI per warning length bucket for every query of a job file')
+    durations.add_argument('--edges', type=float, nargs='+', default=list(DURATION_EDGES),
+                           help='Bucket edges in hours, each bucket (edge, next edge]; inf for open-ended '
+                                '(default -1 6 12 18 24 inf)')
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        if args.command == 'bench':
+            score_cache = False
+        else:
+            score_cache = ScoreCache(path=args.score_cache) if args.score_cache else None
+        verify = VerifySkill(args.rfw, args.fires, not args.no_cache, score_cache)
+        if args.command == 'bench':
+            verify.query_memo = 0
+        load_seconds = time.perf_counter() - started
+
+        if args.command == 'sweep':
+            with open(args.grid) as f:
+                grid = json.load(f)
+            rows = sweep_rows(verify.sweep(args.start_date, args.end_date, grid, args.climo, args.n_replicates,
+                                           args.seed, args.workers))
+        elif args.command == 'windows':
+            lead_buckets = [parse_bucket(bucket) for bucket in args.lead_buckets] if args.lead_buckets else None
+            rows = window_rows(verify, read_jobs(args.jobs), window_pairs(range(args.max_width + 1), args.shape),
+                               lead_buckets, args.lead_reference)
+        elif args.command == 'nfdrs':
+            first, last, step = args.thresholds
+            rows = nfdrs_rows(verify, read_jobs(args.jobs), args.index, args.operator,
+                              np.arange(first, last + step / 2, step))
+        elif args.command == 'durations':
+            rows = duration_rows(verify, read_jobs(args.jobs), args.edges)
+        elif args.command == 'bench':
+            rows = [{'name': '', 'stage': 'load', 'BEST_S': load_seconds, 'MEDIAN_S': load_seconds}]
+            rows += bench_jobs(verify, read_jobs(args.jobs), args.repeat, args.n_replicates, args.seed, args.workers)
+        else:
+            bootstrap = None
+            if args.bootstrap:
+                bootstrap = {'n_resamples': args.bootstrap, 'block': args.block, 'level': args.level}
+            rows = score_jobs(verify, read_jobs(args.jobs), args.command == 'climo', args.n_replicates, args.seed,
+                              args.workers, bootstrap)
+
+    write_rows(rows, args.output, args.format)
+    print('%i rows written to %s in %.2f s' % (len(rows), args.output, time.perf_counter() - started), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+"""
+Cache of skill-score results, in front of QueryResult.forecast_skill_scores and climo_skill_scores.
+
+Entries are keyed on the canonical query parameters, the version of the data the query can see and, for the
+climatology, the replicate count and seed. The version hashes the source files the store was built from and the
+append generations of the zones the query covers, so appending records to one zone (store_append.py) only retires
+the results that involve it. Results are kept in an in-process LRU and, optionally, in a size-bounded SQLite file
+shared between processes and runs.
+"""
+import collections
+import hashlib
+import json
+import math
+import sqlite3
+import time
+
+import numpy as np
+
+# Arguments that name a set of values, so their order and a str versus a one-item list don't matter
+SET_PARAMS = ('wfo', 'zone')
+
+
+def canonical_params(params):
+    """A string that is the same for any two query_params argument sets selecting the same records"""
+    canonical = {}
+    for name, value in params.items():
+        if name in SET_PARAMS:
+            value = sorted(set([value] if isinstance(value, str) else value))
+        elif isinstance(value, tuple):
+            value = list(value)
+        canonical[name] = value
+    return json.dumps(canonical, sort_keys=True, default=str)
+
+
+def jsonable(value):
+    """
+    Scores as strict JSON: NaN (e.g. POD with no fires) and infinity (BIAS with warnings but no fires) become null,
+    since json.dumps would write them as NaN and Infinity, which JSON parsers other than Python's reject
+    """
+    if isinstance(value, dict):
+        return {key: jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [jsonable(item) for item in value]
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def query_zones(store, params):
+    """Boolean mask over the zone codes whose records a query with these arguments can select"""
+    zones = np.ones(len(store.zones), dtype=bool)
+    if 'zone' in params:
+        zones &= store.zones_mask(params['zone'])
+    if 'wfo' in params:
+        in_wfo = np.zeros(len(store.zones), dtype=bool)
+        in_wfo[store.rfw_zone[store.rfws['WFO'].isin(params['wfo'])]] = True
+        in_wfo[store.fire_zone[store.fires['WFO'].isin(params['wfo'])]] = True
+        zones &= in_wfo
+    return zones
+
+
+def dataset_version(store, zones=None):
+    """
+    Hash of the data behind a ColumnarStore, limited to the zones given (a boolean mask over the zone codes)
+
+    Tables loaded straight from JSON carry no source fingerprint, so their results only match within this process.
+    """
+    sha1 = hashlib.sha1()
+    for table in (store.rfws, store.fires):
+        if table.source is None:
+            sha1.update(('unversioned %i' % id(table)).encode())
+        else:
+            sha1.update(json.dumps([table.source.get('size'), table.source.get('sha1')]).encode())
+
+    generations = store.zone_generations if zones is None else np.where(zones, store.zone_generations, 0)
+    touched = np.flatnonzero(generations)
+    sha1.update(json.dumps(dict(zip(store.zones[touched].tolist(), generations[touched].tolist()))).encode())
+    return sha1.hexdigest()
+
+
+class ScoreCache:
+    """
+    Two-tier store of score dictionaries
+
+    Parameters:
+        max_entries (int): Results kept in memory. The least recently used go first.
+        path (str) (optional): SQLite file for a second tier that outlives the process.
+        max_bytes (int): Size bound of the SQLite tier. The least recently used results go first.
+    """
+
+    def __init__(self, max_entries=1024, path=None, max_bytes=64 << 20):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.memory = collections.OrderedDict()
+        self.db = None
+        if path is not None:
+            self.db = sqlite3.connect(path)
+            self.db.execute('CREATE TABLE IF NOT EXISTS scores '
+                            '(key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, used REAL NOT NULL)')
+            self.db.execute('CREATE INDEX IF NOT EXISTS scores_used ON scores (used)')
+            self.db.commit()
+
+    @staticmethod
+    def key(kind, params, version, **settings):
+        """
+        Parameters:
+            kind (str): 'forecast' or 'climo'.
+            params (dict): The query_params arguments, start_date and end_date included.
+            version (str): dataset_version of the data the query covers.
+            settings: Anything else the result depends on (replicate count, seed, ...).
+        """
+        text = json.dumps([kind, canonical_params(params), version, settings], sort_keys=True, default=str)
+        return hashlib.sha1(text.encode()).hexdigest()
+
+    def _remember(self, key, value):
+        self.memory[key] = value
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    def get(self, key):
+        """The cached result for key (a fresh copy, so it can be modified), or None"""
+        value = self.memory.get(key)
+        if value is not None:
+            self.memory.move_to_end(key)
+            return dict(value)
+        if self.db is None:
+            return None
+
+        row = self.db.execute('SELECT value FROM scores WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        self.db.execute('UPDATE scores SET used = ? WHERE key = ?', (time.time(), key))
+        self.db.commit()
+        value = json.loads(row[0])
+        self._remember(key, value)
+        return dict(value)
+
+    def put(self, key, value):
+        value = dict(value)
+        self._remember(key, value)
+        if self.db is None:
+            return
+
+        text = json.dumps(value)
+        self.db.execute('INSERT OR REPLACE INTO scores VALUES (?, ?, ?, ?)', (key, text, len(text), time.time()))
+        total = self.db.execute('SELECT SUM(size) FROM scores').fetchone()[0]
+        if total > self.max_bytes:
+            excess = total - self.max_bytes
+            stale = []
+            for old_key, size in self.db.execute('SELECT key, size FROM scores ORDER BY used'):
+                if excess <= 0:
+                    break
+                stale.append((old_key,))
+                excess -= size
+            self.db.executemany('DELETE FROM scores WHERE key = ?', stale)
+        self.db.commit()
+
+    def clear(self):
+        self.memory.clear()
+        if self.db is not None:
+            self.db.execute('DELETE FROM scores')
+            self.db.commit()
@@ -0,0 +1,233 @@
+"""
+Incremental appends to a column directory (a flattened RFW directory from date_manipulator.py, or a fire cache).
+
+New records go into a segment next to the existing columns instead of rewriting them. A record whose key (WFO,
+NWS_UGC and ISSUED for warnings, ID for fires) is already in the store replaces it: the old rows are added to the
+directory's tombstones and dropped on load. Every zone an append touches has its generation bumped, so results
+computed from that zone's records can be recognised as stale while those of other zones stay valid, and the fire
+size index is re-sorted for the touched zones only.
+
+Each part of the store (the base columns and every segment) keeps the range of its numeric key fields (ISSUED, ID)
+in its meta.json, so
+an append only searches the parts that could hold one of its keys, through their memory-mapped columns: new
+warnings issued after everything in the store, or fires with new IDs, never read the archive.
+
+Usage:
+    python analysis/store_append.py rfws data/RFWs_Northwest data/RedFlags_new_week.json
+    python analysis/store_append.py fires data/.cache/Fires_Northwest data/Fires_new_week.json
+    python analysis/store_append.py compact data/RFWs_Northwest
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'utilities'))
+from columnar_store import Categorical, FIELD_SOURCES, FIRE_SCHEMA, load_table
+from date_manipulator import flatten_table, iter_rfw_chunks
+from percentile_index import ZoneSizeIndex
+from store_cache import read_columns, read_meta, read_table, read_tombstones, segment_dir, write_meta, write_table
+
+RFW_KEY = ('WFO', 'NWS_UGC', 'ISSUED')
+FIRE_KEY = ('ID',)
+
+
+def _values(col, rows=None):
+    """The values of a column (or of some of its rows) as a list"""
+    if isinstance(col, Categorical):
+        codes = col.codes if rows is None else col.codes[rows]
+        return col.categories[codes].tolist()
+    return (np.asarray(col) if rows is None else col[rows]).tolist()
+
+
+def replaced_rows(current, new, key_fields, live):
+    """
+    Row numbers of the live rows of current with the same key as a row of new
+
+    Each key field first narrows the candidates with a vectorized membership test, so only the few rows that could
+    match have their keys compared exactly.
+    """
+    candidates = live.copy()
+    for field in key_fields:
+        old_col, new_col = current[field], new[field]
+        if isinstance(old_col, Categorical):
+            candidates &= old_col.isin(np.unique(new_col.values()))
+        else:
+            candidates &= np.isin(old_col, new_col)
+    rows = np.flatnonzero(candidates)
+
+    new_keys = set(zip(*(_values(new[field]) for field in key_fields)))
+    old_keys = zip(*(_values(current[field], rows) for field in key_fields))
+    return rows[np.array([key in new_keys for key in old_keys], dtype=bool)]
+
+
+def field_bounds(table, fields):
+    """
+    [min, max] of every numeric field of a part of a store (None when it is empty), plus its row count under
+    'rows'. Categorical fields are left out; every part holds most zones and offices.
+    """
+    bounds = {'rows': len(table)}
+    for field in fields:
+        if not isinstance(table[field], Categorical):
+            col = np.asarray(table[field])
+            bounds[field] = [np.min(col).item(), np.max(col).item()] if len(col) else None
+    return bounds
+
+
+def within_bounds(col, bound):
+    """Mask of the values of a numeric column that a part with this field bound could hold"""
+    if bound is None:
+        return np.zeros(len(col), dtype=bool)
+    col = np.asarray(col)
+    return (col >= bound[0]) & (col <= bound[1])
+
+
+def store_parts(store_dir, meta, fields):
+    """
+    (directory, meta, first row) of the base columns and of every segment, in row order. Each part's meta gets the
+    field_bounds of fields, computed on first use for parts written before they were kept; those of segments are
+    saved straight away, the base's with the store meta.
+    """
+    parts = []
+    first = 0
+    categorical = [name for name, info in meta['columns'].items() if info['kind'] == 'cat']
+    paths = [store_dir] + [segment_dir(store_dir, name) for name in meta.get('segments', [])]
+    for path in paths:
+        part_meta = meta if path == store_dir else read_meta(path)
+        bounds = part_meta.get('bounds') or {}
+        if 'rows' not in bounds or any(field not in bounds and field not in categorical for field in fields):
+            part_meta['bounds'] = field_bounds(read_columns(path, part_meta), fields)
+            if path != store_dir:
+                write_meta(path, part_meta)
+        parts.append((path, part_meta, first))
+        first += part_meta['bounds']['rows']
+    return parts
+
+
+def upsert(store_dir, new, key_fields, zone_field, size_field=None):
+    """
+    Appends a Table of new records to a column directory, replacing the records that share their key
+
+    Parameters:
+        store_dir (str): Column directory written by store_cache.write_table.
+        new (Table): Records to add, with the same fields as the store.
+        key_fields (tuple of strs): Fields identifying a record (RFW_KEY or FIRE_KEY).
+        zone_field (str): Zone column whose generations are bumped ('NWS_UGC' or 'UGC_ZONE').
+        size_field (str) (optional): Size column of the SIZE_INDEX.npz to update, if the store has one.
+
+    Returns: (rows_added, rows_replaced)
+    """
+    meta = read_meta(store_dir)
+    if meta is None:
+        raise ValueError('%s is not a column directory' % store_dir)
+    for name in set(new.columns) - set(meta['columns']):
+        # Stores built before a derived column joined the schema keep their fields
+        if name in FIELD_SOURCES:
+            del new.columns[name]
+    if set(new.columns) != set(meta['columns']):
+        raise ValueError('New records have fields %s, the store has %s' % (sorted(new.columns), sorted(meta['columns'])))
+
+    fields = tuple(key_fields) + (('OBJECTID',) if 'OBJECTID' in new else ())
+    parts = store_parts(store_dir, meta, fields)
+    tombstones = read_tombstones(store_dir, meta)
+
+    # Search only the parts whose bounds admit some of the new keys, for those keys
+    replaced, old_zones, old_sizes = [], [], []
+    for path, part_meta, first in parts:
+        candidates = np.ones(len(new), dtype=bool)
+        for field in key_fields:
+            if field in part_meta['bounds']:
+                candidates &= within_bounds(new[field], part_meta['bounds'][field])
+        if not candidates.any():
+            continue
+        part = read_columns(path, part_meta)
+        live = np.ones(len(part), dtype=bool)
+        live[tombstones[(tombstones >= first) & (tombstones < first + len(part))] - first] = False
+        rows = replaced_rows(part, new.subset(candidates), key_fields, live)
+        replaced.append(rows + first)
+        old_zones += _values(part[zone_field], rows)
+        if size_field is not None:
+            old_sizes.append(np.asarray(part[size_field][rows], dtype=np.float64))
+    replaced = np.concatenate(replaced) if replaced else np.zeros(0, dtype=np.int64)
+
+    if 'OBJECTID' in new:
+        maxima = [part_meta['bounds']['OBJECTID'][1] for _, part_meta, _ in parts if part_meta['bounds']['OBJECTID']]
+        first_id = max(maxima) + 1 if maxima else 0
+        new.columns['OBJECTID'] = np.arange(first_id, first_id + len(new), dtype=np.int32)
+
+    segments = meta.get('segments', [])
+    name = '%06i' % len(segments)
+    write_table(new, segment_dir(store_dir, name))
+    new_meta = read_meta(segment_dir(store_dir, name))
+    new_meta['bounds'] = field_bounds(new, fields)
+    write_meta(segment_dir(store_dir, name), new_meta)
+
+    # The zone vocabulary of the stacked table, as concat_tables merges it
+    old_categories = np.unique(np.concatenate([np.asarray(part_meta['columns'][zone_field]['categories'], dtype=str)
+                                               for _, part_meta, _ in parts]))
+    zones = np.union1d(old_categories, new[zone_field].categories)
+    if size_field is not None and os.path.exists(os.path.join(store_dir, 'SIZE_INDEX.npz')):
+        index_path = os.path.join(store_dir, 'SIZE_INDEX.npz')
+        index = ZoneSizeIndex.load(index_path)
+        if len(zones) != index.n_zones:
+            index = index.recode(np.searchsorted(zones, old_categories), len(zones))
+        index = index.updated(np.searchsorted(zones, np.asarray(old_zones, dtype=str)),
+                              np.concatenate(old_sizes) if old_sizes else np.zeros(0),
+                              new[zone_field].recode(zones), new[size_field])
+        index.save(os.path.join(store_dir, 'SIZE_INDEX.tmp.npz'))
+        os.replace(os.path.join(store_dir, 'SIZE_INDEX.tmp.npz'), index_path)
+
+    generations = dict(meta.get('generations') or {})
+    for zone in set(old_zones) | set(np.unique(new[zone_field].values()).tolist()):
+        generations[zone] = generations.get(zone, 0) + 1
+
+    old_tombstones = meta.get('tombstones')
+    if len(replaced):
+        meta['tombstones'] = 'TOMBSTONES_%s.npy' % name
+        np.save(os.path.join(store_dir, meta['tombstones']), np.union1d(tombstones, replaced))
+    meta['segments'] = segments + [name]
+    meta['generations'] = generations
+    write_meta(store_dir, meta)
+    if old_tombstones and old_tombstones != meta['tombstones']:
+        os.remove(os.path.join(store_dir, old_tombstones))
+    return len(new), len(replaced)
+
+
+def append_rfws(store_dir, in_path, workers=1):
+    """Flattens the reduced warnings in in_path (rfw_reducer.py output) and upserts them into store_dir"""
+    return upsert(store_dir, flatten_table(iter_rfw_chunks(in_path), workers), RFW_KEY, 'NWS_UGC')
+
+
+def append_fires(store_dir, in_path):
+    """Upserts the fire records of a JSON file into a fire column directory"""
+    return upsert(store_dir, load_table(in_path, FIRE_SCHEMA), FIRE_KEY, 'UGC_ZONE', 'SIZE_AC')
+
+
+def compact(store_dir):
+    """Rewrites a store's segments and tombstones into plain (memory-mappable) columns, keeping its generations"""
+    meta = read_meta(store_dir)
+    table = read_table(store_dir, meta, mmap_mode=None)
+    index_path = os.path.join(store_dir, 'SIZE_INDEX.npz')
+    index = ZoneSizeIndex.load(index_path) if os.path.exists(index_path) else None
+    write_table(table, store_dir, meta['source'])
+    if index is not None:
+        index.save(index_path)
+    return len(table)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Append new warnings or fires to a column directory')
+    parser.add_argument('kind', choices=['rfws', 'fires', 'compact'])
+    parser.add_argument('store_dir', help='Column directory, e.g. data/RFWs_Northwest')
+    parser.add_argument('in_path', nargs='?', help='Reduced RFW JSON or fire JSON with the new records')
+    args = parser.parse_args()
+
+    if args.kind == 'compact':
+        print('%s: %i records compacted' % (args.store_dir, compact(args.store_dir)))
+    else:
+        if not args.in_path:
+            parser.error('in_path is required for ' + args.kind)
+        append = append_rfws if args.kind == 'rfws' else append_fires
+        added, replaced = append(args.store_dir, args.in_path)
+        print('%s: %i records added, %i replaced' % (args.store_dir, added, replaced))
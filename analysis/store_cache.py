@@ -0,0 +1,270 @@
+"""
+Binary cache for the RFW and fire JSON files.
+
+Each source file gets a cache directory (data/.cache/<file stem>/ by default) holding one .npy file per column and a
+meta.json sidecar with the string dictionaries of the categorical columns and the size/mtime/hash of the source it
+was built from. Columns are memory-mapped on load, so processes reading the same cache share its pages.
+
+A directory can also carry appended segments (segments/<n>/, each laid out the same way) and a tombstone file of the
+row numbers they replaced; see store_append.py. The first load after an append writes the stacked columns to
+merged/, so that it and every later load memory-map them like a plain directory's.
+
+The contingency cube (contingency_cube.py) is saved next to the fire cache as well.
+
+Usage:
+    python analysis/store_cache.py data/RFWs_Northwest.json data/Fires_Northwest.json
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+
+from columnar_store import (Categorical, ColumnarStore, Table, FIELD_SOURCES, FIRE_SCHEMA, RFW_SCHEMA, concat_tables,
+                            load_table, source_fields)
+from percentile_index import ZoneSizeIndex
+
+CACHE_FORMAT = 1
+MERGED_DIR = 'merged'
+
+
+def default_cache_dir(source_path):
+    folder, name = os.path.split(os.path.abspath(source_path))
+    return os.path.join(folder, '.cache', os.path.splitext(name)[0])
+
+
+def file_fingerprint(source_path, with_hash=True):
+    """Size, mtime and (optionally) SHA-1 of a source file"""
+    stat = os.stat(source_path)
+    fingerprint = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    if with_hash:
+        sha1 = hashlib.sha1()
+        with open(source_path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                sha1.update(block)
+        fingerprint['sha1'] = sha1.hexdigest()
+    return fingerprint
+
+
+def write_table(table, cache_dir, source=None):
+    """
+    Writes a Table to cache_dir as .npy columns plus meta.json
+
+    The directory is written under a temporary name and swapped in at the end, so readers never see a half-written
+    cache.
+    """
+    tmp_dir = cache_dir + '.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    columns = {}
+    for name, col in table.columns.items():
+        if isinstance(col, Categorical):
+            np.save(os.path.join(tmp_dir, name + '.npy'), col.codes)
+            columns[name] = {'kind': 'cat', 'categories': col.categories.tolist()}
+        else:
+            np.save(os.path.join(tmp_dir, name + '.npy'), np.asarray(col))
+            columns[name] = {'kind': 'array'}
+
+    meta = {
+        'format': CACHE_FORMAT,
+        'source': source,
+        'columns': columns,
+        'text_fields': sorted(table.text_fields),
+        'generations': table.generations,
+    }
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+        json.dump(meta, f)
+
+    old_dir = cache_dir + '.old'
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(cache_dir):
+        os.rename(cache_dir, old_dir)
+    os.rename(tmp_dir, cache_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def read_meta(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, 'meta.json')) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get('format') != CACHE_FORMAT:
+        return None
+    return meta
+
+
+def write_meta(cache_dir, meta):
+    """Replaces meta.json in one step"""
+    path = os.path.join(cache_dir, 'meta.json')
+    with open(path + '.tmp', 'w') as f:
+        json.dump(meta, f)
+    os.replace(path + '.tmp', path)
+
+
+def segment_dir(cache_dir, name):
+    return os.path.join(cache_dir, 'segments', name)
+
+
+def read_columns(cache_dir, meta, mmap_mode='r'):
+    """The columns of one directory, without the segments appended to it"""
+    columns = {}
+    for name, info in meta['columns'].items():
+        values = np.load(os.path.join(cache_dir, name + '.npy'), mmap_mode=mmap_mode)
+        if info['kind'] == 'cat':
+            columns[name] = Categorical(values, np.array(info['categories'], dtype=str))
+        else:
+            columns[name] = values
+    return Table(columns, meta['text_fields'])
+
+
+def read_tombstones(cache_dir, meta):
+    """Row numbers (across the base columns and segments, in order) deleted by later appends"""
+    if not meta.get('tombstones'):
+        return np.zeros(0, dtype=np.int64)
+    return np.load(os.path.join(cache_dir, meta['tombstones']))
+
+
+def _stacked_table(cache_dir, meta, mmap_mode, drop_deleted):
+    """The base columns with every segment stacked after them, in memory"""
+    table = read_columns(cache_dir, meta, mmap_mode)
+    if meta.get('segments'):
+        segments = [segment_dir(cache_dir, name) for name in meta['segments']]
+        table = concat_tables([table] + [read_columns(path, read_meta(path), mmap_mode) for path in segments])
+    tombstones = read_tombstones(cache_dir, meta)
+    if drop_deleted and len(tombstones):
+        keep = np.ones(len(table), dtype=bool)
+        keep[tombstones] = False
+        table = table.subset(keep)
+    return table
+
+
+def _merged_table(cache_dir, meta, mmap_mode):
+    """
+    The stacked table of a directory with segments, memory-mapped from merged/. That is rewritten whenever the
+    segments or tombstones differ from those it was merged from, i.e. on the first load after an append.
+    """
+    merged_dir = os.path.join(cache_dir, MERGED_DIR)
+    merged_from = {'segments': meta['segments'], 'tombstones': meta.get('tombstones')}
+    merged_meta = read_meta(merged_dir)
+    if merged_meta is None or merged_meta.get('source') != merged_from:
+        table = _stacked_table(cache_dir, meta, None, True)
+        try:
+            write_table(table, merged_dir, merged_from)
+        except OSError:
+            # A read-only directory, or another process merging at the same time
+            return table
+        merged_meta = read_meta(merged_dir)
+    return read_columns(merged_dir, merged_meta, mmap_mode)
+
+
+def read_table(cache_dir, meta=None, mmap_mode='r', drop_deleted=True):
+    """
+    Loads a cached Table, memory-mapping its columns unless mmap_mode is None
+
+    Appended segments are stacked after the base columns and, with drop_deleted, the rows they replaced are
+    dropped. Memory-mapped loads read the stacked columns from merged/, written on the first load after an
+    append; compacting the directory (store_append.compact) folds the segments into the base columns for good.
+    """
+    meta = meta or read_meta(cache_dir)
+    if meta.get('segments') and drop_deleted and mmap_mode is not None:
+        table = _merged_table(cache_dir, meta, mmap_mode)
+    else:
+        table = _stacked_table(cache_dir, meta, mmap_mode, drop_deleted)
+    table.generations = meta.get('generations') or {}
+    table.source = meta.get('source')
+    return table
+
+
+def _cache_is_fresh(meta, source_path, schema):
+    """Cheap size/mtime check first, falling back to the content hash when only the mtime moved"""
+    # Caches written before a derived column (e.g. DISC_TIME) joined the schema are rebuilt to pick it up
+    for name in FIELD_SOURCES:
+        if (name in schema and name not in meta['columns'] and
+                all(field in meta['columns'] for field in source_fields(name))):
+            return False
+    source = meta.get('source') or {}
+    current = file_fingerprint(source_path, with_hash=False)
+    if current['size'] != source.get('size'):
+        return False
+    if current['mtime_ns'] == source.get('mtime_ns'):
+        return True
+    return file_fingerprint(source_path)['sha1'] == source.get('sha1')
+
+
+def load_cached_table(source_path, schema, cache_dir=None):
+    """
+    Loads a JSON dataset through its binary cache, building or rebuilding the cache when the source has changed.
+    Rebuilding starts over from the source, dropping anything appended to the cache since.
+
+    Parameters:
+        source_path (str): Path to the RFW or fire JSON file, or a column directory written by write_table (e.g. by
+                           date_manipulator.py), which is read as is.
+        schema (dict): RFW_SCHEMA or FIRE_SCHEMA.
+        cache_dir (str) (optional): Where the cache lives. Defaults to a .cache folder next to the source.
+
+    Returns: Table
+    """
+    if os.path.isdir(source_path):
+        return read_table(source_path)
+
+    cache_dir = cache_dir or default_cache_dir(source_path)
+    meta = read_meta(cache_dir)
+    if meta is not None and _cache_is_fresh(meta, source_path, schema):
+        if meta['source']['mtime_ns'] != os.stat(source_path).st_mtime_ns:
+            # Same content under a new mtime (e.g. a fresh checkout), so only refresh the stamp
+            meta['source'] = file_fingerprint(source_path)
+            write_meta(cache_dir, meta)
+        return read_table(cache_dir, meta)
+
+    source = file_fingerprint(source_path)
+    write_table(load_table(source_path, schema), cache_dir, source)
+    return read_table(cache_dir)
+
+
+def load_size_index(fires_file_path, fires, cache_dir=None):
+    """
+    Loads the per-zone fire size index saved in the fire cache, building and saving it when missing. A rebuilt
+    cache directory starts without one, so the index can never be older than the columns it was built from.
+    """
+    if cache_dir is None:
+        cache_dir = fires_file_path if os.path.isdir(fires_file_path) else default_cache_dir(fires_file_path)
+    path = os.path.join(cache_dir, 'SIZE_INDEX.npz')
+    if os.path.exists(path):
+        return ZoneSizeIndex.load(path)
+    zones = fires['UGC_ZONE']
+    index = ZoneSizeIndex.build(np.asarray(zones.codes), np.asarray(fires['SIZE_AC']), len(zones.categories))
+    index.save(path)
+    return index
+
+
+def load_store(rfw_file_path, fires_file_path, use_cache=True):
+    """Loads a ColumnarStore, through the binary cache unless use_cache is False"""
+    if not use_cache:
+        return ColumnarStore.from_json(rfw_file_path, fires_file_path)
+    fires = load_cached_table(fires_file_path, FIRE_SCHEMA)
+    return ColumnarStore(load_cached_table(rfw_file_path, RFW_SCHEMA), fires, load_size_index(fires_file_path, fires))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Convert RFW and fire JSON files to the binary column cache')
+    parser.add_argument('rfw_file', help='Flattened RFW JSON, e.g. data/RFWs_Northwest.json')
+    parser.add_argument('fires_file', nargs='?', help='Fire JSON, e.g. data/Fires_Northwest.json')
+    args = parser.parse_args()
+
+    for path, schema in ((args.rfw_file, RFW_SCHEMA), (args.fires_file, FIRE_SCHEMA)):
+        if path:
+            table = load_cached_table(path, schema)
+            if schema is FIRE_SCHEMA:
+                load_size_index(path, table)
+            print('%s: %i records cached in %s' % (path, len(table), default_cache_dir(path)))
+
+    if args.fires_file:
+        # Imported here, as the cube builds on the filters and score versions, which build on this module's tables
+        from contingency_cube import CUBE_FILE, load_cube
+        cube_dir = default_cache_dir(args.fires_file)
+        cube = load_cube(load_store(args.rfw_file, args.fires_file), cube_dir)
+        print('Contingency cube of %i cells saved as %s' % (len(cube.keys), os.path.join(cube_dir, CUBE_FILE)))
@@ -0,0 +1,60 @@
+"""
+Contingency counts for every threshold of one NFDRS condition in a single pass.
+
+With a condition like ERC_PERC >= t, a fire day (a zone and day with fires) is in the selection for every t up to the
+highest ERC of its fires: its level. Whether a fire day is caught depends only on the RFW days, so it doesn't change
+with t. An RFW day is hit for every t up to the higher level of the fire days on it and the day after. Sorting the
+levels once, the fire days, misses and hits at any threshold are counts of levels at or above it, which searchsorted
+gives for all thresholds at once. '<' and '<=' are the same with the values and thresholds negated.
+"""
+import numpy as np
+
+# Operators a threshold sweep can run over, with the operator each becomes on negated values
+SWEEP_OPERATORS = {'>=': '>=', '>': '>', '<=': '>=', '<': '>'}
+
+
+def _at_or_above(sorted_levels, thresholds, strict):
+    """Number of sorted_levels >= (or, with strict, >) every threshold"""
+    return len(sorted_levels) - np.searchsorted(sorted_levels, thresholds, 'right' if strict else 'left')
+
+
+def threshold_contingency(rfw_keys, fire_keys, fire_caught, fire_day_keys, fire_values, operator, thresholds, n_zones):
+    """
+    Contingency counts of a selection for every threshold of a condition on its fires
+
+    Parameters:
+        rfw_keys (np.ndarray of int64): Unique RFW days of the selection, from day_zone_keys.
+        fire_keys (np.ndarray of int64): Unique fire days of the selection without the condition.
+        fire_caught (np.ndarray of bool): Their caught flags, from match_flags.
+        fire_day_keys (np.ndarray of int64): Day-zone key of every selected fire record.
+        fire_values (np.ndarray of float): The NFDRS index of every selected fire record. NaNs never match.
+        operator (str): One of SWEEP_OPERATORS; fires are kept when value <operator> threshold.
+        thresholds (sequence of numbers): Thresholds to count for.
+        n_zones (int): The zone count the keys were encoded with.
+
+    Returns: (N_FIRE_DAYS, HITS, MISSES, FALSE_ALARMS), np.ndarrays of int64 aligned with thresholds
+    """
+    if operator not in SWEEP_OPERATORS:
+        raise ValueError('Threshold sweeps run over %s, not %r' % (list(SWEEP_OPERATORS), operator))
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    values = np.asarray(fire_values, dtype=np.float64)
+    if operator in ('<', '<='):
+        values, thresholds = -values, -thresholds
+    strict = SWEEP_OPERATORS[operator] == '>'
+
+    # Level of every fire day: the highest value among its fires
+    levels = np.full(len(fire_keys), -np.inf)
+    np.maximum.at(levels, np.searchsorted(fire_keys, fire_day_keys), np.where(np.isnan(values), -np.inf, values))
+
+    # Level of every RFW day: the higher of the fire days on it and the day after
+    rfw_levels = np.full(len(rfw_keys), -np.inf)
+    if len(fire_keys):
+        for shift in (0, n_zones):
+            idx = np.minimum(np.searchsorted(fire_keys, rfw_keys + shift), len(fire_keys) - 1)
+            found = fire_keys[idx] == rfw_keys + shift
+            rfw_levels[found] = np.maximum(rfw_levels[found], levels[idx[found]])
+
+    N_FIRE_DAYS = _at_or_above(np.sort(levels), thresholds, strict)
+    MISSES = _at_or_above(np.sort(levels[~fire_caught]), thresholds, strict)
+    HITS = _at_or_above(np.sort(rfw_levels), thresholds, strict)
+    return N_FIRE_DAYS, HITS, MISSES, len(rfw_keys) - HITS
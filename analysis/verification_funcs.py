@@ -1,301 +1,225 @@
-from datetime import datetime, timedelta
+import collections
+import itertools
 import numpy as np
-import random
-import json
-import statistics as stat
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'utilities'))
+from bootstrap import SCORES, block_counts, bootstrap_intervals, zone_groups
+from climatology import climo_contingency
+from contingency_cube import load_cube
+from interval_match import hourly_contingency
+from query_filters import DURATION_EDGES, FilterMasks, duration_label, freeze, nfdrs_conditions
+from score_cache import ScoreCache, canonical_params, dataset_version, query_zones
+from store_cache import default_cache_dir, load_store
+from threshold_sweep import threshold_contingency
+from window_match import WindowMatcher, bucket_label, lead_bucket_mask, lead_days, window_pairs
+
+# Selections VerifySkill keeps for repeated query_params calls
+QUERY_MEMO = 16
+
+
+def contingency_scores(HITS, MISSES, FALSE_ALARMS):
+    """
+    Builds the BIAS/POD/FAR/CSI dictionary for a 2x2 contingency table. Counts may be numbers or arrays; a score
+    with nothing to divide by (POD without fire days, FAR without warnings) is NaN, or inf for BIAS with false alarms.
+    """
+    hits = np.asarray(HITS, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scores = {
+            'BIAS': (hits + FALSE_ALARMS) / (hits + MISSES),
+            'POD': hits / (hits + MISSES),
+            'FAR': FALSE_ALARMS / (hits + FALSE_ALARMS),
+            'CSI': hits / (hits + MISSES + FALSE_ALARMS)
+        }
+    return dict({'HITS': HITS, 'MISSES': MISSES, 'FALSE_ALARMS': FALSE_ALARMS}, **_plain(scores))
+
+
+def skill_scores(forecast_dict, climo_dict):
+    """Skill of the forecast scores against the climatology medians, NaN (or inf) where a median leaves no room"""
+    forecast = {name: np.asarray(forecast_dict[name], dtype=np.float64) for name in ('BIAS', 'POD', 'FAR', 'CSI')}
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scores = {
+            'BIAS_SS': (forecast['BIAS'] - climo_dict['BIAS']) / (1 - climo_dict['BIAS']),
+            'POD_SS': (forecast['POD'] - climo_dict['POD']) / (1 - climo_dict['POD']),
+            'FAR_SS': (forecast['FAR'] - climo_dict['FAR']) / (0 - climo_dict['FAR']),
+            'CSI_SS': (forecast['CSI'] - climo_dict['CSI']) / (1 - climo_dict['CSI']),
+        }
+    return _plain(scores)
 
 
-class VerifySkill:
+def _plain(scores):
+    """Single scores as Python floats, arrays as they are"""
+    return {name: float(value) if np.ndim(value) == 0 else value for name, value in scores.items()}
 
-    def __init__(self, rfw_file_path, fires_file_path):
-        self.rfw_file_path = rfw_file_path
-        self.fires_file_path = fires_file_path
 
-        with open(rfw_file_path) as e:
-            self.rfws = json.load(e)
+def day_zone_keys(days, zones, n_zones):
+    """
+    Encodes (day ordinal, zone code) pairs as sorted, unique int64 keys day * n_zones + zone, so shifting an event by
+    one day is adding n_zones to its key
+    """
+    return np.unique(np.asarray(days, dtype=np.int64) * n_zones + zones)
 
-        with open(fires_file_path) as f:
-            self.fires = json.load(f)
 
-    def query_params(self, start_date, end_date, **kwargs):
-        """
-        Reduces size of RFWS json and Fires json based on user arguments
+def match_flags(rfw_keys, fire_keys, n_zones):
+    """
+    Flags the RFW days hit by a fire in the same zone on the RFW day or the day after, and the fire days caught by an
+    RFW in the same zone on the fire day or the day before
 
-        Parameters:
-            Positional:
-            start_date (int) (required): A date in format YYYYMMDD signifying the beginning of the search period. Records occurring before this date will be omitted.
-            end_date (int) (required): A date in format YYYYMMDD signifying the end of the search period. Records occurring after this date will be omitted.
-            
-            Keyword:
-            wfo (str or list of strs) (optional): The weather forecast office(s) you would like to calculate skill for. Omit for all northwest WFOs.
-            zone (str or list of strs) (optional): The fire weather zone(s) you would like to calculate skill for. Omit for all northwest FWZs.
-            forest_cover (str) (optional): Set to 'yes' to only include forested fires. Set to 'no' for non-forested fires. Omit to show both types in results.
-            cause (str) (optional): Specify "human" to find human-caused fires. Specify "lightning" for lightning-caused fires. Omit to both causes in results. 
-            nfdrs_param (list of strs) (optional): Specify an NFDRS parameter (BI_PERC, FM100_PERC, ERC_PERC, FM1000_PER), an operation (<=, ==, >=) and some threshold
-                                                   value to see fires that have matching fire danger parameters.
-            duration (int): Specify either 6, 12, 18, or 24 to see only matching RFWs with event durations between these ranges. 
-            perc_size (int): The percentile value for which returned fires should be above. 
+    Returns: (rfw_hit, fire_hit), boolean arrays aligned with rfw_keys and fire_keys
+    """
+    rfw_hit = np.isin(rfw_keys, fire_keys, assume_unique=True) | np.isin(rfw_keys + n_zones, fire_keys, assume_unique=True)
+    fire_hit = np.isin(fire_keys, rfw_keys, assume_unique=True) | np.isin(fire_keys - n_zones, rfw_keys, assume_unique=True)
+    return rfw_hit, fire_hit
 
-        Returns: None, although it prepares self.rfws and self.fires for other methods.
-        """
 
-        start_rfw_len = len(self.rfws)
-        start_fires_len = len(self.fires)
-
-        # Reduce datasets to WFOs specified
-        if 'wfo' in kwargs:
-            if type(kwargs['wfo']) is list:
-                self.rfws = [rfw for rfw in self.rfws if rfw['WFO'] in kwargs['wfo']]
-                self.fires = [fire for fire in self.fires if fire['WFO'] in kwargs['wfo']]
-            else: 
-                self.rfws = [rfw for rfw in self.rfws if rfw['WFO'] == kwargs['wfo']]
-                self.fires = [fire for fire in self.fires if fire['WFO'] == kwargs['wfo']]
-
-        # First get percentile sizes so we don't calculate based off a smol dataset
-        if 'perc_size' in kwargs:
-            zone_sizes = {}
-            for fire in self.fires:
-                if fire['UGC_ZONE'] in zone_sizes:
-                    zone_sizes[fire['UGC_ZONE']].append(fire['SIZE_AC'])
-                else:
-                    zone_sizes[fire['UGC_ZONE']] = [fire['SIZE_AC']]
-
-            perc_list = []
-            med_list = []
-            for k, v in zone_sizes.items():
-                m = np.array(v)
-                p = np.percentile(m, kwargs['perc_size'])
-                perc_list.append({k: p})
-
-            print(str(kwargs['perc_size']) + 'th percentile fire sizes for the zones requested are:', perc_list)
-            size_list = []
-            for zone in perc_list:
-                size_list.append(list(zone.values())[0])
-            print(size_list)
-            # print(sum(size_list)/len(size_list))
-
-
-            fires_dummy = []
-            size_dummy = []
-            for fire in self.fires:
-                for zone in perc_list:
-                    if fire['UGC_ZONE'] in zone:
-                        if fire['SIZE_AC'] >= zone[fire['UGC_ZONE']]:
-                            fires_dummy.append(fire)
-                            size_dummy.append(fire['SIZE_AC'])
-            print(np.mean(size_dummy))
-
-            self.fires = fires_dummy
-
-        # Reduce dataset sizes bigly by limiting to user start/end dates
-        self.rfws = [rfw for rfw in self.rfws if datetime.strptime(str(start_date), '%Y%m%d') <=
-                    datetime.strptime(rfw['FLAT_DATE'], '%Y%m%d') <= datetime.strptime(str(end_date), '%Y%m%d')]
-        self.fires = [fire for fire in self.fires if datetime.strptime(str(start_date), '%Y%m%d') <=
-                    datetime.strptime(str(fire['DISC_DATE'])[:8], '%Y%m%d') <= datetime.strptime(str(end_date), '%Y%m%d') + timedelta(days=1)]
-        
-        # Reduce datasets to FWZs specified
-        if 'zone' in kwargs:
-            if type(kwargs['zone']) is list:
-                self.rfws = [rfw for rfw in self.rfws if rfw['NWS_UGC'] in kwargs['zone']]
-                self.fires = [fire for fire in self.fires if fire['UGC_ZONE'] in kwargs['zone']]
-            else: 
-                self.rfws = [rfw for rfw in self.rfws if rfw['NWS_UGC'] == kwargs['zone']]
-                self.fires = [fire for fire in self.fires if fire['UGC_ZONE'] == kwargs['zone']]
-
-        # Reduce fires dataset to forest type specified
-        if 'forestcover' in kwargs:
-            self.fires = [fire for fire in self.fires if fire['FORESTED'] == kwargs['forestcover']]
-
-        # Reduce fires dataset to ignition cause type specified
-        if 'cause' in kwargs:
-            if kwargs['cause'] == 'lightning':
-                ltng_codes = ['1']
-                self.fires = [fire for fire in self.fires if str(fire['STAT_CAUSE']) in ltng_codes]
-
-            if kwargs['cause'] == 'human':
-                human_codes = ['2', '3', '4', '5', '6', '7', '8', '9', '10', '11', '12']
-                self.fires = [fire for fire in self.fires if str(fire['STAT_CAUSE']) in human_codes]
-
-        if 'nfdrs_param' in kwargs:
-            fd_index, fd_operator, fd_threshold = kwargs['nfdrs_param'][0], kwargs['nfdrs_param'][1], kwargs['nfdrs_param'][2]
-            if fd_operator == '<':
-                self.fires = [fire for fire in self.fires if fire[fd_index] < fd_threshold]
-            elif fd_operator == '==':
-                self.fires = [fire for fire in self.fires if fire[fd_index] == fd_threshold]
-            elif fd_operator == '>=':
-                self.fires = [fire for fire in self.fires if fire[fd_index] >= fd_threshold]
-
-        if 'duration' in kwargs:
-            rfws_dummy = []
-            for rfw in self.rfws:
-                start = rfw['ISSUED']
-                end = rfw['EXPIRED']
-                start_datetime = datetime.strptime(start, "%Y%m%d%H%M")
-                end_datetime = datetime.strptime(end, "%Y%m%d%H%M")
-                hours = (end_datetime - start_datetime).seconds / 3600
-                if kwargs['duration'] == 6:
-                    if 0 <= hours <= 6:
-                        rfws_dummy.append(rfw)
-                elif kwargs['duration'] == 12:
-                    if 6 < hours <= 12:
-                        rfws_dummy.append(rfw)
-                elif kwargs['duration'] == 18:
-                    if 12 < hours <= 18:
-                        rfws_dummy.append(rfw)
-                elif kwargs['duration'] == 24:
-                    if 18 < hours <= 24:
-                        rfws_dummy.append(rfw)
-            self.rfws = rfws_dummy
-        print("Number of fires before reduced to days only is {}".format(len(self.fires)))
-        # Unique fire days and rfw days only!
-        self.fire_days = set([(str(fire['DISC_DATE'])[:8], fire['UGC_ZONE']) for fire in self.fires])
-        self.rfw_days = set([(rfw['FLAT_DATE'], rfw['NWS_UGC']) for rfw in self.rfws])
-        fin_rfw_len = len(self.rfw_days)
-        fin_fires_len = len(self.fire_days)
+def match_keys(rfw_keys, fire_keys, n_zones):
+    """
+    Matches RFW days to fire days in the same zone on the RFW day or the day after
 
-        print('\nELIMINATE MULTIPLE FIRES/RFWS FOR SAME DAY/ZONE:')
-        print('RFWs reduced from %i to %i' % (start_rfw_len, fin_rfw_len))
-        print('Fires reduced from %i to %i' % (start_fires_len, fin_fires_len))
+    Parameters:
+        rfw_keys, fire_keys (sorted unique np.ndarrays of int64): Event days from day_zone_keys.
+        n_zones (int): The zone count the keys were encoded with.
 
-        return
+    Returns: (HITS, MISSES, FALSE_ALARMS)
+    """
+    rfw_hit, fire_hit = match_flags(rfw_keys, fire_keys, n_zones)
+
+    HITS = int(rfw_hit.sum())  # this is hits for first day and second
+    MISSES = len(fire_keys) - int(fire_hit.sum())  # and exact misses
+    FALSE_ALARMS = len(rfw_keys) - HITS  # and exact false alarms
+    return HITS, MISSES, FALSE_ALARMS
 
-    def forecast_skill_scores(self):
 
-        exact_matches = self.rfw_days.intersection(self.fire_days)
-        # increment RFW by 1 day
-        day_2_rfws = set()
-        for rfw in self.rfw_days:
-            day_2_rfws.add(((datetime.strptime(rfw[0], '%Y%m%d') + timedelta(days=1)).strftime('%Y%m%d'), rfw[1])) 
-        
-        day_2_matches = day_2_rfws.intersection(self.fire_days)
+SWEEP_COUNTS = ('N_RFW_DAYS', 'N_FIRE_DAYS', 'HITS', 'MISSES', 'FALSE_ALARMS')
+SWEEP_SCORES = ('BIAS', 'POD', 'FAR', 'CSI')
+SWEEP_CLIMO = ('CLIMO_BIAS', 'CLIMO_POD', 'CLIMO_FAR', 'CLIMO_CSI', 'SIG_TEST', 'BIAS_SS', 'POD_SS', 'FAR_SS', 'CSI_SS')
 
-        day2matches_corr = set()
-        for d2match in day_2_matches:
-            day2matches_corr.add(((datetime.strptime(d2match[0], '%Y%m%d') - timedelta(days=1)).strftime('%Y%m%d'), d2match[1]))
+# Fire on the RFW day up to a week after it
+DEFAULT_WINDOWS = window_pairs(range(8))
 
-        rfw_matches = exact_matches | day2matches_corr
-        fire_matches = exact_matches | day_2_matches
 
-        for match in rfw_matches:
-            self.rfw_days.remove(match)
+def grid_cells(grid):
+    """
+    Expands a sweep grid into a list of query_params keyword dicts
 
-        for match in fire_matches:
-            self.fire_days.remove(match)
+    Parameters:
+        grid (dict or list of dicts): Either {argument: [values]}, swept as a cartesian product with None meaning
+                                      "leave the filter off", or an explicit list of keyword dicts.
+    """
+    if not isinstance(grid, dict):
+        return [dict(cell) for cell in grid]
+    names = list(grid)
+    cells = []
+    for values in itertools.product(*(grid[name] for name in names)):
+        cells.append({name: value for name, value in zip(names, values) if value is not None})
+    return cells
 
-        # print("\n\nFirst day matches: " + str(len(rfw_matches)))
-        # print("New set sizes: RFW_DAYS = " + str(len(self.rfw_days)) + ", FIRE_DAYS = " + str(len(self.fire_days)))
 
-        HITS = len(rfw_matches)  # this is hits for first day and second
-        MISSES = len(self.fire_days) # and exact misses
-        FALSE_ALARMS = len(self.rfw_days) # and exact false alarms
+def cell_label(value):
+    if value is None:
+        return ''
+    if isinstance(value, (list, tuple)):
+        return ','.join(str(v) for v in value)
+    return str(value)
+
+
+class QueryResult:
+    """
+    An immutable selection of RFW and fire records made by VerifySkill.query_params.
+
+    The selection is held as read-only boolean masks over the loaded ColumnarStore, so the base dataset is never
+    copied or modified and any number of results can be scored from one VerifySkill.
+
+    Parameters:
+        store (ColumnarStore): The dataset the masks index into.
+        rfw_mask (np.ndarray of bool): Selected RFW records.
+        fire_mask (np.ndarray of bool): Selected fire records.
+        params (dict): The query_params arguments that produced this selection.
+        cache (ScoreCache) (optional): Where scores of this selection are looked up and saved.
+    """
+
+    __slots__ = ('store', 'rfw_mask', 'fire_mask', 'params', 'n_zones', 'fire_keys', 'rfw_keys', 'cache', 'version')
+
+    def __init__(self, store, rfw_mask, fire_mask, params, cache=None):
+        n_zones = len(store.zones)
+        # Unique fire days and rfw days only!
+        fire_keys = day_zone_keys(store.fire_day[fire_mask], store.fire_zone[fire_mask], n_zones)
+        rfw_keys = day_zone_keys(store.rfw_day[rfw_mask], store.rfw_zone[rfw_mask], n_zones)
+        for array in (rfw_mask, fire_mask, fire_keys, rfw_keys):
+            array.flags.writeable = False
+        # Only the zones the query can reach go into the version, so appends elsewhere keep its scores valid
+        version = dataset_version(store, query_zones(store, params)) if cache is not None else None
+
+        for name, value in (('store', store), ('rfw_mask', rfw_mask), ('fire_mask', fire_mask), ('params', dict(params)),
+                            ('n_zones', n_zones), ('fire_keys', fire_keys), ('rfw_keys', rfw_keys), ('cache', cache),
+                            ('version', version)):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('QueryResult is immutable')
+
+    def _cache_key(self, kind, **settings):
+        if self.cache is None:
+            return None
+        return self.cache.key(kind, self.params, self.version, **settings)
+
+    def forecast_skill_scores(self):
+        key = self._cache_key('forecast')
+        FORECAST_DICT = self.cache.get(key) if key is not None else None
+        if FORECAST_DICT is None:
+            FORECAST_DICT = contingency_scores(*match_keys(self.rfw_keys, self.fire_keys, self.n_zones))
+            if key is not None:
+                self.cache.put(key, FORECAST_DICT)
 
         print("\nFORECAST - BASIC SKILL METRICS")
-        print("HITS: %i, MISSES: %i, FALSE ALARMS: %i" % (HITS, MISSES, FALSE_ALARMS))
-        BIAS = (HITS + FALSE_ALARMS) / (HITS + MISSES)
-        POD = HITS / (HITS + MISSES)
-        FAR = FALSE_ALARMS / (HITS + FALSE_ALARMS)
-        CSI = HITS / (HITS + MISSES + FALSE_ALARMS)
-
-
-        self.FORECAST_DICT = {
-            'HITS': HITS,
-            'MISSES': MISSES,
-            'FALSE_ALARMS': FALSE_ALARMS,
-            'BIAS': BIAS,
-            'POD': POD,
-            'FAR': FAR,
-            'CSI': CSI
-        }
-        
-        print("POD: %f, FAR: %f, CSI: %f" % (POD, FAR, CSI))
+        print("HITS: %i, MISSES: %i, FALSE ALARMS: %i" % (FORECAST_DICT['HITS'], FORECAST_DICT['MISSES'],
+                                                        FORECAST_DICT['FALSE_ALARMS']))
+        print("POD: %f, FAR: %f, CSI: %f" % (FORECAST_DICT['POD'], FORECAST_DICT['FAR'], FORECAST_DICT['CSI']))
 
-        return self.FORECAST_DICT
+        return FORECAST_DICT
+
+    def climo_skill_scores(self, forecast_dict, n_replicates=100, seed=None, workers=1):
+        """
+        Scores random climatologies of this selection's RFWs against its fires
+
+        Parameters:
+            forecast_dict (dict): Output of forecast_skill_scores, used for the significance count.
+            n_replicates (int): Number of random climatologies to score.
+            seed (int or None): RNG seed, for reproducible results.
+            workers (int): Processes to spread the replicates over. Results for a given seed don't depend on it.
+
+        Returns: dict of the median BIAS/POD/FAR/CSI over the replicates, and SIG_TEST, the number of replicates
+                 the forecast POD beats. Cached only when seeded, since unseeded runs are meant to differ.
+        """
+        key = None
+        if seed is not None:
+            key = self._cache_key('climo', n_replicates=n_replicates, seed=seed, pod=forecast_dict['POD'])
+        median_dict = self.cache.get(key) if key is not None else None
+        if median_dict is None:
+            median_dict = self._climo_medians(forecast_dict, n_replicates, seed, workers)
+            if key is not None:
+                self.cache.put(key, median_dict)
+
+        print("\nCLIMO - BASIC SKILL METRICS")
+        print("POD: %f, FAR: %f, CSI: %f, SIG_NUM: %i" % (median_dict['POD'], median_dict['FAR'], median_dict['CSI'],
+                                                         median_dict['SIG_TEST']))
+        return median_dict
+
+    def _climo_medians(self, forecast_dict, n_replicates, seed, workers):
+        HITS, MISSES, FALSE_ALARMS = climo_contingency(self.rfw_keys, self.fire_keys, self.n_zones, n_replicates, seed,
+                                                           workers=workers)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            climo_scores = contingency_scores(HITS, MISSES, FALSE_ALARMS)
+            sig_scores = (forecast_dict['POD'] - climo_scores['POD']) / (1 - climo_scores['POD'])
 
-    def climo_skill_scores(self, forecast_dict):
-        climo_score_list = []
-        for i in range(100):
-            # Recreate rfw_days and fire_days since we messed with em previously
-            # Unique fire days and rfw days only!
-            fire_days = set([(str(fire['DISC_DATE'])[:8], fire['UGC_ZONE']) for fire in self.fires])
-            rfw_days = set([(rfw['FLAT_DATE'], rfw['NWS_UGC']) for rfw in self.rfws])
-
-            # print('CLIMO_METHOD')
-            # print(len(fire_days), len(rfw_days))
-            
-            day_range = [i for i in range(-15, 16) if i != 0]  # Doesn't pick up 0
-            year_range = [i for i in range(2006, 2016)]
-
-            climo_rfws = set()
-            for rfw in rfw_days: 
-                delta_days = random.choice(day_range)
-                random_year = random.choice(year_range)
-                rfwday = (datetime.strptime(rfw[0], '%Y%m%d') + timedelta(days=delta_days))
-                if rfwday.strftime('%Y%m%d')[4:] == '0229':
-                    leap_years = [2008, 2012]
-                    random_year = random.choice(leap_years)
-                rfwday = rfwday.replace(year=random_year).strftime('%Y%m%d')
-                climo_rfws.add((rfwday, rfw[1]))
-            exact_matches = climo_rfws.intersection(fire_days)
-
-            # increment RFW by 1 day
-            day_2_rfws = set()
-            for rfw in climo_rfws:
-                day_2_rfws.add(((datetime.strptime(rfw[0], '%Y%m%d') + timedelta(days=1)).strftime('%Y%m%d'), rfw[1])) 
-            
-            day_2_matches = day_2_rfws.intersection(fire_days)
-
-            day2matches_corr = set()
-            for d2match in day_2_matches:
-                day2matches_corr.add(((datetime.strptime(d2match[0], '%Y%m%d') - timedelta(days=1)).strftime('%Y%m%d'), d2match[1]))
-
-            rfw_matches = exact_matches | day2matches_corr
-            fire_matches = exact_matches | day_2_matches
-            for match in rfw_matches:
-                climo_rfws.remove(match)
-
-            for match in fire_matches:
-                fire_days.remove(match)
-
-
-            HITS = len(rfw_matches) # this is hits for first day and second
-            MISSES = len(fire_days) # and exact misses
-            FALSE_ALARMS = len(climo_rfws) # and exact false alarms
-
-            BIAS = (HITS + FALSE_ALARMS) / (HITS + MISSES)
-            POD = HITS / (HITS + MISSES)
-            FAR = FALSE_ALARMS / (HITS + FALSE_ALARMS)
-            CSI = HITS / (HITS + MISSES + FALSE_ALARMS)
-
-            CLIMO_DICT = {
-                'HITS': HITS,
-                'MISSES': MISSES,
-                'FALSE_ALARMS': FALSE_ALARMS,
-                'BIAS': BIAS,
-                'POD': POD,
-                'FAR': FAR,
-                'CSI': CSI
-            }
-            # print(CLIMO_DICT)
-            climo_score_list.append(CLIMO_DICT)
-            # print("\nCLIMO - BASIC SKILL METRICS")
-            # print("HITS: %i, MISSES: %i, FALSE ALARMS: %i" % (HITS, MISSES, FALSE_ALARMS))
-            # print("BIAS: %f, POD: %f, FAR: %f, CSI: %f" % (BIAS, POD, FAR, CSI))
-
-        bias_list, csi_list, pod_list, far_list, sig_list = [], [], [], [], []
-        for result in climo_score_list:
-            bias_list.append(result['BIAS'])
-            pod_list.append(result['POD'])
-            far_list.append(result['FAR'])
-            csi_list.append(result['CSI'])
-
-            sig_list.append((forecast_dict['POD'] - result['POD'])  / (1 - result['POD']))
-        bias_med = stat.median(sorted(bias_list))
-        pod_med = stat.median(sorted(pod_list))
-        far_med = stat.median(sorted(far_list))
-        csi_med = stat.median(sorted(csi_list))
-        sig_count = len([score for score in sig_list if score > 0])
-
-        median_dict = {
+        bias_med = float(np.median(climo_scores['BIAS']))
+        pod_med = float(np.median(climo_scores['POD']))
+        far_med = float(np.median(climo_scores['FAR']))
+        csi_med = float(np.median(climo_scores['CSI']))
+        sig_count = int((sig_scores > 0).sum())
+
+        return {
                 'BIAS': bias_med,
                 'POD': pod_med,
                 'FAR': far_med,
@@ -303,24 +227,488 @@ class VerifySkill:
                 'SIG_TEST': sig_count
         }
 
-        print("\nCLIMO - BASIC SKILL METRICS")
-        print("POD: %f, FAR: %f, CSI: %f, SIG_NUM: %i" % (pod_med, far_med, csi_med, sig_count))
-        return median_dict
+    def bootstrap_skill_scores(self, n_resamples=1000, block='year', level=95, seed=None, by=None):
+        """
+        The forecast scores with block-bootstrap percentile intervals
 
+        Parameters:
+            n_resamples (int): Number of block resamples.
+            block (str): Resample whole 'year's or whole 'season's (DJF, MAM, JJA, SON of a year).
+            level (number): Interval coverage in percent.
+            seed (int or None): RNG seed, for reproducible intervals. Cached only when seeded.
+            by (str) (optional): 'wfo' or 'zone' for an interval per office or zone, all from the same resamples.
+
+        Returns: FORECAST_DICT plus BIAS_CI, POD_CI, FAR_CI and CSI_CI ([low, high]) and N_BLOCKS. With by, a dict of
+                 group label -> such a dict, for the groups with RFW or fire days.
+        """
+        key = None
+        if seed is not None:
+            key = self._cache_key('bootstrap', n_resamples=n_resamples, block=block, level=level, seed=seed, by=by)
+        BOOTSTRAP_DICT = self.cache.get(key) if key is not None else None
+        if BOOTSTRAP_DICT is None:
+            zone_group, labels = zone_groups(self.store, by) if by is not None else (None, np.array(['']))
+            rfw_hit, fire_hit = match_flags(self.rfw_keys, self.fire_keys, self.n_zones)
+            counts = block_counts(self.rfw_keys, self.fire_keys, rfw_hit, fire_hit, self.n_zones, block, zone_group,
+                                  len(labels))
+            intervals = bootstrap_intervals(counts, n_resamples, level, seed)
+
+            n_rfw, hits, n_fire, caught = np.moveaxis(counts.sum(axis=0), 1, 0)
+            BOOTSTRAP_DICT = {}
+            for group in np.flatnonzero((n_rfw > 0) | (n_fire > 0)):
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    group_dict = contingency_scores(int(hits[group]), int(n_fire[group] - caught[group]),
+                                                    int(n_rfw[group] - hits[group]))
+                for name in SCORES:
+                    group_dict[name + '_CI'] = intervals[name][group].tolist()
+                group_dict['N_BLOCKS'] = int((counts[:, group].sum(axis=1) > 0).sum())
+                BOOTSTRAP_DICT[str(labels[group])] = group_dict
+            if by is None and '' not in BOOTSTRAP_DICT:
+                # Nothing selected: NaN scores and intervals
+                BOOTSTRAP_DICT = contingency_scores(0, 0, 0)
+                for name in SCORES:
+                    BOOTSTRAP_DICT[name + '_CI'] = [float('nan'), float('nan')]
+                BOOTSTRAP_DICT['N_BLOCKS'] = 0
+            elif by is None:
+                BOOTSTRAP_DICT = BOOTSTRAP_DICT['']
+            if key is not None:
+                self.cache.put(key, BOOTSTRAP_DICT)
+
+        if by is None:
+            print("\nFORECAST - %i%% BOOTSTRAP INTERVALS (%i %s BLOCKS)" % (level, BOOTSTRAP_DICT['N_BLOCKS'],
+                                                                          block.upper()))
+            print("POD: %f [%f, %f], FAR: %f [%f, %f], CSI: %f [%f, %f]" % tuple(
+                value for name in ('POD', 'FAR', 'CSI')
+                for value in [BOOTSTRAP_DICT[name]] + list(BOOTSTRAP_DICT[name + '_CI'])))
+        return BOOTSTRAP_DICT
+
+    def hourly_skill_scores(self, before_hours=0, after_hours=0, untimed='day'):
+        """
+        Scores the selection at hour resolution: warnings as [ISSUED, EXPIRED) intervals per zone against fire
+        discovery times, instead of RFW days against fire days
 
-    def gen_skill_scores(self):
+        Parameters:
+            before_hours, after_hours (number): Hours before issuance and after expiry a fire may be discovered in
+                                                and still count for the warning.
+            untimed (str): 'day' matches fires recorded without a time of day over their whole discovery day,
+                           'drop' leaves them out.
 
-        self.FORECAST_DICT = self.forecast_skill_scores()
-        self.CLIMO_DICT = self.climo_skill_scores(self.FORECAST_DICT)
+        Returns: dict of HITS (warnings with a fire), MISSES (fires outside every warning), FALSE_ALARMS, the
+                 BIAS/POD/FAR/CSI scores, and N_WARNINGS, N_FIRES, N_UNTIMED_FIRES
+        """
+        key = self._cache_key('hourly', before_hours=before_hours, after_hours=after_hours, untimed=untimed)
+        HOURLY_DICT = self.cache.get(key) if key is not None else None
+        if HOURLY_DICT is None:
+            store = self.store
+            counts = hourly_contingency(store.rfw_zone[self.rfw_mask], store.rfw_issued[self.rfw_mask],
+                                        store.rfw_expired[self.rfw_mask], store.fire_zone[self.fire_mask],
+                                        store.fire_day[self.fire_mask], store.fire_minute[self.fire_mask],
+                                        int(round(before_hours * 60)), int(round(after_hours * 60)), untimed)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                HOURLY_DICT = dict(contingency_scores(np.float64(counts['HITS']), counts['MISSES'],
+                                                      counts['FALSE_ALARMS']), **counts)
+            HOURLY_DICT = {name: value.item() if isinstance(value, np.generic) else value
+                           for name, value in HOURLY_DICT.items()}
+            if key is not None:
+                self.cache.put(key, HOURLY_DICT)
+
+        print("\nHOURLY - BASIC SKILL METRICS")
+        print("WARNINGS: %i, FIRES: %i (%i without a time)" % (HOURLY_DICT['N_WARNINGS'], HOURLY_DICT['N_FIRES'],
+                                                              HOURLY_DICT['N_UNTIMED_FIRES']))
+        print("HITS: %i, MISSES: %i, FALSE ALARMS: %i" % (HOURLY_DICT['HITS'], HOURLY_DICT['MISSES'],
+                                                        HOURLY_DICT['FALSE_ALARMS']))
+        print("POD: %f, FAR: %f, CSI: %f" % (HOURLY_DICT['POD'], HOURLY_DICT['FAR'], HOURLY_DICT['CSI']))
+        return HOURLY_DICT
+
+    def window_scores(self, windows=DEFAULT_WINDOWS, lead_buckets=None, lead_reference='INIT_ISS'):
+        """
+        Scores this selection for many matching windows at once, optionally per lead-time bucket
 
-        self.SKILL_DICT = {
-            'BIAS_SS': (self.FORECAST_DICT['BIAS'] - self.CLIMO_DICT['BIAS']) / (1 - self.CLIMO_DICT['BIAS']),
-            'POD_SS': (self.FORECAST_DICT['POD'] - self.CLIMO_DICT['POD']) / (1 - self.CLIMO_DICT['POD']),
-            'FAR_SS': (self.FORECAST_DICT['FAR'] - self.CLIMO_DICT['FAR']) / (0 - self.CLIMO_DICT['FAR']),
-            'CSI_SS': (self.FORECAST_DICT['CSI'] - self.CLIMO_DICT['CSI']) / (1 - self.CLIMO_DICT['CSI']),
-        }
+        Parameters:
+            windows (list of (before, after) pairs): Days before and after the RFW day a fire may fall on to count as
+                                                     a hit. forecast_skill_scores uses (0, 1). See window_pairs for
+                                                     curves over the window width.
+            lead_buckets (list) (optional): Lead days to score separately, each an int or an inclusive (low, high)
+                                            with high None for open-ended. RFW days are kept in a bucket when one of
+                                            their warnings was issued that many days ahead.
+            lead_reference (str): Lead time from 'INIT_ISS' (the first product of the event) or 'ISSUED'.
+
+        Returns: np.ndarray (structured), one row per bucket and window, with LEAD_DAYS ('' without buckets),
+                 WINDOW_BEFORE, WINDOW_AFTER, N_RFW_DAYS, N_FIRE_DAYS, HITS, MISSES, FALSE_ALARMS, BIAS, POD, FAR, CSI
+        """
+        windows = np.array(windows, dtype=np.int64).reshape(-1, 2)
+        max_window = int(windows.max(initial=0))
+        buckets = [None] if lead_buckets is None else list(lead_buckets)
+        leads = lead_days(self.store, lead_reference) if lead_buckets is not None else None
+
+        fields = [('LEAD_DAYS', 'U16'), ('WINDOW_BEFORE', np.int64), ('WINDOW_AFTER', np.int64)]
+        fields += [(name, np.int64) for name in SWEEP_COUNTS] + [(name, np.float64) for name in SWEEP_SCORES]
+        table = np.zeros(len(buckets) * len(windows), dtype=fields)
+
+        print("\nWINDOW SKILL METRICS")
+        for i, bucket in enumerate(buckets):
+            rfw_keys = self.rfw_keys
+            if bucket is not None:
+                mask = self.rfw_mask & lead_bucket_mask(leads, bucket)
+                rfw_keys = day_zone_keys(self.store.rfw_day[mask], self.store.rfw_zone[mask], self.n_zones)
+            matcher = WindowMatcher(rfw_keys, self.fire_keys, self.n_zones, max_window)
+            HITS, MISSES, FALSE_ALARMS = matcher.contingency(windows[:, 0], windows[:, 1])
+
+            rows = table[i * len(windows):(i + 1) * len(windows)]
+            rows['LEAD_DAYS'] = '' if bucket is None else bucket_label(bucket)
+            rows['WINDOW_BEFORE'], rows['WINDOW_AFTER'] = windows[:, 0], windows[:, 1]
+            rows['N_RFW_DAYS'], rows['N_FIRE_DAYS'] = matcher.n_rfw_days, matcher.n_fire_days
+            rows['HITS'], rows['MISSES'], rows['FALSE_ALARMS'] = HITS, MISSES, FALSE_ALARMS
+            with np.errstate(divide='ignore', invalid='ignore'):
+                scores = contingency_scores(HITS.astype(float), MISSES, FALSE_ALARMS)
+            for name in SWEEP_SCORES:
+                rows[name] = scores[name]
+
+        for row in table:
+            print("LEAD: %s, WINDOW: -%i/+%i days, POD: %f, FAR: %f, CSI: %f" % (
+                row['LEAD_DAYS'] or 'all', row['WINDOW_BEFORE'], row['WINDOW_AFTER'], row['POD'], row['FAR'],
+                row['CSI']))
+        return table
+
+    def nfdrs_sweep(self, fd_index, fd_operator='>=', thresholds=range(101)):
+        """
+        Scores this selection with one more NFDRS condition, for every threshold of it at once
+
+        Parameters:
+            fd_index (str): BI_PERC, ERC_PERC, FM100_PERC or FM1000_PER.
+            fd_operator (str): '>=', '>', '<=' or '<'; fires are kept when their index <operator> threshold.
+            thresholds (sequence of numbers): Thresholds to score. Defaults to every percentile 0 - 100.
+
+        Returns: np.ndarray (structured), one row per threshold, with THRESHOLD, N_RFW_DAYS, N_FIRE_DAYS, HITS, MISSES,
+                 FALSE_ALARMS, BIAS, POD, FAR, CSI
+        """
+        nfdrs_conditions([fd_index, fd_operator, 0])
+        thresholds = np.asarray(list(thresholds), dtype=np.float64)
+        fire_day_keys = (self.store.fire_day[self.fire_mask].astype(np.int64) * self.n_zones +
+                         self.store.fire_zone[self.fire_mask])
+        fire_caught = match_flags(self.rfw_keys, self.fire_keys, self.n_zones)[1]
+        N_FIRE_DAYS, HITS, MISSES, FALSE_ALARMS = threshold_contingency(
+            self.rfw_keys, self.fire_keys, fire_caught, fire_day_keys, self.store.fires[fd_index][self.fire_mask],
+            fd_operator, thresholds, self.n_zones)
+
+        fields = [('THRESHOLD', np.float64)] + [(name, np.int64) for name in SWEEP_COUNTS]
+        fields += [(name, np.float64) for name in SWEEP_SCORES]
+        table = np.zeros(len(thresholds), dtype=fields)
+        table['THRESHOLD'], table['N_RFW_DAYS'], table['N_FIRE_DAYS'] = thresholds, len(self.rfw_keys), N_FIRE_DAYS
+        table['HITS'], table['MISSES'], table['FALSE_ALARMS'] = HITS, MISSES, FALSE_ALARMS
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scores = contingency_scores(HITS.astype(float), MISSES, FALSE_ALARMS)
+        for name in SWEEP_SCORES:
+            table[name] = scores[name]
+
+        print("\nNFDRS THRESHOLD SKILL METRICS")
+        for row in table:
+            print("%s %s %g, POD: %f, FAR: %f, CSI: %f" % (fd_index, fd_operator, row['THRESHOLD'], row['POD'],
+                                                           row['FAR'], row['CSI']))
+        return table
+
+    def duration_scores(self, edges=DURATION_EDGES):
+        """
+        Scores this selection per warning length bucket in one grouped pass, as if queried with each duration
+
+        An RFW day is in a bucket when one of its warnings is, and keeps its hit flag there, since the fires don't
+        depend on the duration. A fire day is caught in a bucket by that bucket's RFW days on it or the day before.
+
+        Parameters:
+            edges (sequence of numbers): Bucket edges in hours, each bucket (edge, next edge]. np.inf closes an
+                                         open-ended last bucket.
+
+        Returns: np.ndarray (structured), one row per bucket, with DURATION (e.g. '6-12' or '24+' hours),
+                 N_RFW_DAYS, N_FIRE_DAYS, HITS, MISSES, FALSE_ALARMS, BIAS, POD, FAR, CSI
+        """
+        n_buckets = len(edges) - 1
+        codes = FilterMasks(self.store).duration_codes(tuple(edges))[self.rfw_mask]
+        keys = self.store.rfw_day[self.rfw_mask].astype(np.int64) * self.n_zones + self.store.rfw_zone[self.rfw_mask]
+        in_bucket = (codes >= 0) & (codes < n_buckets)
+
+        # Unique (bucket, RFW day) pairs
+        key_span = int(self.rfw_keys.max()) + 1 if len(self.rfw_keys) else 1
+        pairs = np.unique(codes[in_bucket] * key_span + keys[in_bucket])
+        bucket, rfw_key = np.divmod(pairs, key_span)
+        rfw_hit, _ = match_flags(self.rfw_keys, self.fire_keys, self.n_zones)
+        N_RFW_DAYS = np.bincount(bucket, minlength=n_buckets)
+        HITS = np.bincount(bucket, weights=rfw_hit[np.searchsorted(self.rfw_keys, rfw_key)],
+                           minlength=n_buckets).astype(np.int64)
+
+        # Unique (bucket, fire day) pairs of the fire days caught on the RFW day or the day after it
+        n_fire = len(self.fire_keys)
+        caught = []
+        if n_fire:
+            for shift in (0, self.n_zones):
+                idx = np.minimum(np.searchsorted(self.fire_keys, rfw_key + shift), n_fire - 1)
+                found = self.fire_keys[idx] == rfw_key + shift
+                caught.append(bucket[found] * n_fire + idx[found])
+        caught_bucket = np.unique(np.concatenate(caught)) // n_fire if caught else np.zeros(0, dtype=np.int64)
+        MISSES = n_fire - np.bincount(caught_bucket, minlength=n_buckets)
+
+        fields = [('DURATION', 'U16')] + [(name, np.int64) for name in SWEEP_COUNTS]
+        fields += [(name, np.float64) for name in SWEEP_SCORES]
+        table = np.zeros(n_buckets, dtype=fields)
+        table['DURATION'] = [duration_label(edges[i], edges[i + 1]) for i in range(n_buckets)]
+        table['N_RFW_DAYS'], table['N_FIRE_DAYS'] = N_RFW_DAYS, n_fire
+        table['HITS'], table['MISSES'], table['FALSE_ALARMS'] = HITS, MISSES, N_RFW_DAYS - HITS
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scores = contingency_scores(HITS.astype(float), MISSES, N_RFW_DAYS - HITS)
+        for name in SWEEP_SCORES:
+            table[name] = scores[name]
+
+        print("\nDURATION SKILL METRICS")
+        for row in table:
+            print("DURATION: %s h, POD: %f, FAR: %f, CSI: %f" % (row['DURATION'], row['POD'], row['FAR'], row['CSI']))
+        return table
+
+    def gen_skill_scores(self, n_replicates=100, seed=None, workers=1):
+        """Returns (FORECAST_DICT, CLIMO_DICT, SKILL_DICT) for this selection"""
+        FORECAST_DICT = self.forecast_skill_scores()
+        CLIMO_DICT = self.climo_skill_scores(FORECAST_DICT, n_replicates, seed, workers)
+
+        SKILL_DICT = skill_scores(FORECAST_DICT, CLIMO_DICT)
 
         print("\nSKILL SCORES AGAINST RANDOM CLIMATOLOGY")
-        print("POD_SS: %f, FAR_SS: %f, CSI_SS: %f" % (self.SKILL_DICT['POD_SS'], self.SKILL_DICT['FAR_SS'], self.SKILL_DICT['CSI_SS']))
+        print("POD_SS: %f, FAR_SS: %f, CSI_SS: %f" % (SKILL_DICT['POD_SS'], SKILL_DICT['FAR_SS'], SKILL_DICT['CSI_SS']))
+
+        return FORECAST_DICT, CLIMO_DICT, SKILL_DICT
+
+
+class VerifySkill:
+    """
+    Parameters:
+        rfw_file_path, fires_file_path (str): Flattened RFW and fire data (JSON files or column directories).
+        use_cache (bool): Load through the binary column cache, which also keeps the contingency cube.
+        score_cache (ScoreCache or False) (optional): Where scores are cached. Defaults to an in-process LRU;
+                                                      False turns caching off.
+    """
+
+    def __init__(self, rfw_file_path, fires_file_path, use_cache=True, score_cache=None):
+        self.rfw_file_path = rfw_file_path
+        self.fires_file_path = fires_file_path
+        self.use_cache = use_cache
+
+        # Goes through the binary column cache next to each file, building it on first use
+        self.store = load_store(rfw_file_path, fires_file_path, use_cache)
+        self.score_cache = ScoreCache() if score_cache is None else (score_cache or None)
+        self.query = None
+        self.query_memo = QUERY_MEMO
+        self._queries = collections.OrderedDict()
+        self.cube = None
+
+    def contingency_cube(self):
+        """The ContingencyCube of the loaded dataset, loaded from or saved to the fire cache on first use"""
+        if self.cube is None:
+            cache_dir = None
+            if self.use_cache:
+                cache_dir = self.fires_file_path
+                if not os.path.isdir(cache_dir):
+                    cache_dir = default_cache_dir(cache_dir)
+            self.cube = load_cube(self.store, cache_dir)
+        return self.cube
+
+    def cube_skill_scores(self, start_date, end_date, **kwargs):
+        """
+        Forecast scores of a query summed from the contingency cube, without selecting any records. Takes the
+        query_params arguments; those the cube can't answer (nfdrs_param, duration, perc_size, or a WFO sharing
+        zones with another) go through query_params and forecast_skill_scores instead.
+
+        Returns: FORECAST_DICT, with N_RFW_DAYS and N_FIRE_DAYS as well when it came from the cube
+        """
+        params = dict(kwargs, start_date=start_date, end_date=end_date)
+        cube = self.contingency_cube()
+        counts = self._cube_counts(cube, params)
+        if counts is None:
+            return self.forecast_skill_scores(self.query_params(start_date, end_date, **kwargs))
+        scores = contingency_scores(counts['HITS'], counts['MISSES'], counts['FALSE_ALARMS'])
+        self.FORECAST_DICT = dict(scores, **counts)
+        return self.FORECAST_DICT
+
+    def _cube_counts(self, cube, params):
+        """The cube's counts for a query, or None when it needs the records"""
+        if not cube.supports(params):
+            return None
+        try:
+            return cube.counts(params)
+        except ValueError:
+            return None
+
+    def query_params(self, start_date, end_date, **kwargs):
+        """
+        Selects the RFWs and fires matching the user arguments without modifying the loaded dataset
+
+        Parameters:
+            Positional:
+            start_date (int) (required): A date in format YYYYMMDD signifying the beginning of the search period. Records occurring before this date will be omitted.
+            end_date (int) (required): A date in format YYYYMMDD signifying the end of the search period. Records occurring after this date will be omitted.
+
+            Keyword:
+            wfo (str or list of strs) (optional): The weather forecast office(s) you would like to calculate skill for. Omit for all northwest WFOs.
+            zone (str or list of strs) (optional): The fire weather zone(s) you would like to calculate skill for. Omit for all northwest FWZs.
+            forest_cover (str) (optional): Set to 'yes' to only include forested fires. Set to 'no' for non-forested fires. Omit to show both types in results.
+            cause (str) (optional): Specify "human" to find human-caused fires. Specify "lightning" for lightning-caused fires. Omit to both causes in results.
+            nfdrs_param (list) (optional): Specify an NFDRS parameter (BI_PERC, FM100_PERC, ERC_PERC, FM1000_PER), an operation (<, <=, ==, !=, >=, >) and some threshold
+                                           value to see fires that have matching fire danger parameters, e.g. ['ERC_PERC', '>=', 90]. A list of
+                                           such conditions keeps the fires meeting all of them. Fires missing the parameter never match.
+            duration (int): Specify either 6, 12, 18, or 24 to see only matching RFWs with event durations between these ranges, or a (low, high) pair of hours
+                            (high None for no upper limit) for RFWs lasting more than low and up to high hours.
+            perc_size (int): The percentile value for which returned fires should be above.
+
+        Returns: QueryResult, which is also kept as self.query for the score methods below. The last query_memo
+                 selections are kept, so repeating a query reuses its QueryResult (and its cached scores).
+        """
+
+        rfws, fires = self.store.rfws, self.store.fires
+        params = dict(kwargs, start_date=start_date, end_date=end_date)
+        memo_key = canonical_params(params)
+        if memo_key in self._queries:
+            self._queries.move_to_end(memo_key)
+            self.query = self._queries[memo_key]
+        else:
+            filters = FilterMasks(self.store)
+            rfw_mask, fire_mask = filters.select(start_date, end_date, **kwargs)
+
+            if 'perc_size' in kwargs:
+                thresholds = filters.zone_thresholds(kwargs['perc_size'], kwargs.get('wfo'))
+                perc_list = [{str(self.store.zones[code]): thresholds[code]} for code in np.flatnonzero(~np.isnan(thresholds))]
+                print(str(kwargs['perc_size']) + 'th percentile fire sizes for the zones requested are:', perc_list)
+                print([list(zone.values())[0] for zone in perc_list])
+                print(np.mean(fires['SIZE_AC'][filters.large_fires(kwargs['perc_size'], kwargs.get('wfo'))]))
+
+            print("Number of fires before reduced to days only is {}".format(int(fire_mask.sum())))
+            self.query = QueryResult(self.store, rfw_mask, fire_mask, params, self.score_cache)
+            self._queries[memo_key] = self.query
+            while len(self._queries) > self.query_memo:
+                self._queries.popitem(last=False)
+
+        print('\nELIMINATE MULTIPLE FIRES/RFWS FOR SAME DAY/ZONE:')
+        print('RFWs reduced from %i to %i' % (len(rfws), len(self.query.rfw_keys)))
+        print('Fires reduced from %i to %i' % (len(fires), len(self.query.fire_keys)))
+
+        return self.query
+
+    def _current_query(self, query):
+        if query is not None:
+            return query
+        if self.query is None:
+            raise ValueError('Call query_params before calculating skill scores')
+        return self.query
+
+    def forecast_skill_scores(self, query=None):
+        self.FORECAST_DICT = self._current_query(query).forecast_skill_scores()
+        return self.FORECAST_DICT
+
+    def climo_skill_scores(self, forecast_dict, query=None, n_replicates=100, seed=None, workers=1):
+        return self._current_query(query).climo_skill_scores(forecast_dict, n_replicates, seed, workers)
+
+    def bootstrap_skill_scores(self, query=None, n_resamples=1000, block='year', level=95, seed=None, by=None):
+        return self._current_query(query).bootstrap_skill_scores(n_resamples, block, level, seed, by)
+
+    def hourly_skill_scores(self, query=None, before_hours=0, after_hours=0, untimed='day'):
+        return self._current_query(query).hourly_skill_scores(before_hours, after_hours, untimed)
+
+    def window_scores(self, query=None, windows=DEFAULT_WINDOWS, lead_buckets=None, lead_reference='INIT_ISS'):
+        return self._current_query(query).window_scores(windows, lead_buckets, lead_reference)
+
+    def duration_scores(self, query=None, edges=DURATION_EDGES):
+        return self._current_query(query).duration_scores(edges)
+
+    def nfdrs_sweep(self, fd_index, query=None, fd_operator='>=', thresholds=range(101)):
+        return self._current_query(query).nfdrs_sweep(fd_index, fd_operator, thresholds)
+
+    def gen_skill_scores(self, query=None, n_replicates=100, seed=None, workers=1):
+        scores = self._current_query(query).gen_skill_scores(n_replicates, seed, workers)
+        self.FORECAST_DICT, self.CLIMO_DICT, self.SKILL_DICT = scores
 
         return
+
+    def sweep(self, start_date, end_date, grid, climo=False, n_replicates=100, seed=None, workers=1):
+        """
+        Scores every combination of query_params arguments in a grid against the loaded dataset
+
+        Work is shared across the grid: cells the contingency cube can answer (dates, wfo, zone, cause and
+        forestcover only) are summed from it, each other filter mask and per-zone size percentile is computed once,
+        and cells that differ only in their zone are matched once without the zone filter and then summed per zone,
+        since matching never crosses zones.
+
+        Parameters:
+            start_date, end_date (int): YYYYMMDD bounds, as in query_params.
+            grid (dict or list of dicts): Either {argument: [values]} (cartesian product; a None value leaves the
+                                          filter off) or a list of query_params keyword dicts.
+            climo (bool): Also run the climatology for every cell and add its medians and skill scores.
+            n_replicates, seed, workers: Climatology settings, as in climo_skill_scores.
+
+        Returns: np.ndarray (structured), one row per cell, with a column per grid argument followed by
+                 N_RFW_DAYS, N_FIRE_DAYS, HITS, MISSES, FALSE_ALARMS, BIAS, POD, FAR, CSI and, with climo=True,
+                 CLIMO_BIAS, CLIMO_POD, CLIMO_FAR, CLIMO_CSI, SIG_TEST, BIAS_SS, POD_SS, FAR_SS, CSI_SS.
+        """
+        cells = grid_cells(grid)
+        names = list(grid) if isinstance(grid, dict) else []
+        for cell in cells:
+            names.extend(name for name in cell if name not in names)
+        n_zones = len(self.store.zones)
+        filters = FilterMasks(self.store, memoize=True)
+
+        counts = np.zeros((len(cells), len(SWEEP_COUNTS)), dtype=np.int64)
+        cube = self.contingency_cube()
+        # Group the cells the cube can't answer on everything but the zone
+        groups = {}
+        for i, cell in enumerate(cells):
+            cube_counts = self._cube_counts(cube, dict(cell, start_date=start_date, end_date=end_date))
+            if cube_counts is not None:
+                counts[i] = [cube_counts[name] for name in SWEEP_COUNTS]
+                continue
+            key = tuple(sorted((name, freeze(value)) for name, value in cell.items() if name != 'zone'))
+            groups.setdefault(key, []).append(i)
+
+        for indices in groups.values():
+            group_kwargs = {name: value for name, value in cells[indices[0]].items() if name != 'zone'}
+            rfw_mask, fire_mask = filters.select(start_date, end_date, **group_kwargs)
+            rfw_keys = day_zone_keys(self.store.rfw_day[rfw_mask], self.store.rfw_zone[rfw_mask], n_zones)
+            fire_keys = day_zone_keys(self.store.fire_day[fire_mask], self.store.fire_zone[fire_mask], n_zones)
+            rfw_hit, fire_hit = match_flags(rfw_keys, fire_keys, n_zones)
+
+            # Per-zone RFW days, fire days, hits and caught fires
+            rfw_zone, fire_zone = rfw_keys % n_zones, fire_keys % n_zones
+            per_zone = np.stack([np.bincount(rfw_zone, minlength=n_zones),
+                                 np.bincount(fire_zone, minlength=n_zones),
+                                 np.bincount(rfw_zone[rfw_hit], minlength=n_zones),
+                                 np.bincount(fire_zone[fire_hit], minlength=n_zones)])
+
+            for i in indices:
+                if 'zone' in cells[i]:
+                    n_rfw, n_fire, hits, caught = per_zone[:, self.store.zones_mask(cells[i]['zone'])].sum(axis=1)
+                else:
+                    n_rfw, n_fire, hits, caught = per_zone.sum(axis=1)
+                counts[i] = (n_rfw, n_fire, hits, n_fire - caught, n_rfw - hits)
+
+        fields = [(name, 'U%i' % max(1, max(len(cell_label(cell.get(name))) for cell in cells))) for name in names]
+        fields += [(name, np.int64) for name in SWEEP_COUNTS] + [(name, np.float64) for name in SWEEP_SCORES]
+        if climo:
+            fields += [(name, np.int64 if name == 'SIG_TEST' else np.float64) for name in SWEEP_CLIMO]
+        table = np.zeros(len(cells), dtype=fields)
+
+        for name in names:
+            table[name] = [cell_label(cell.get(name)) for cell in cells]
+        for j, name in enumerate(SWEEP_COUNTS):
+            table[name] = counts[:, j]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scores = contingency_scores(counts[:, 2].astype(float), counts[:, 3], counts[:, 4])
+        for name in SWEEP_SCORES:
+            table[name] = scores[name]
+
+        if climo:
+            for i, cell in enumerate(cells):
+                rfw_mask, fire_mask = filters.select(start_date, end_date, **cell)
+                query = QueryResult(self.store, rfw_mask, fire_mask, dict(cell, start_date=start_date, end_date=end_date),
+                                    self.score_cache)
+                forecast = {name: table[name][i] for name in SWEEP_SCORES}
+                CLIMO_DICT = query.climo_skill_scores(forecast, n_replicates, seed, workers)
+                for name in ('BIAS', 'POD', 'FAR', 'CSI'):
+                    table['CLIMO_' + name][i] = CLIMO_DICT[name]
+                table['SIG_TEST'][i] = CLIMO_DICT['SIG_TEST']
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    for name, value in skill_scores(forecast, CLIMO_DICT).items():
+                        table[name][i] = value
+
+        return table
@@ -0,0 +1,257 @@
+"""
+Local HTTP service for verification queries against a warm dataset.
+
+The RFW and fire data are loaded once: the main process builds (or checks) the binary column cache at startup and
+each scoring process memory-maps it, so the pages are shared and every request runs against data already in
+memory. The event loop only parses requests and serves repeats from its result cache; filtering and scoring run
+in a process pool so concurrent requests don't block it.
+
+Endpoints (GET with query-string arguments, or POST with a JSON object):
+    /forecast   forecast contingency scores
+    /climo      forecast scores plus climatology medians
+    /skill      forecast, climatology and skill scores
+    /health     liveness check
+
+Arguments are those of VerifySkill.query_params (start_date and end_date required; wfo and zone take repeated or
+comma-separated values; nfdrs_param is INDEX,OPERATOR,THRESHOLD, repeated for conditions that must all hold;
+duration is a bucket's upper edge in hours or a LOW,HIGH pair, HIGH left empty for open-ended) plus n_replicates and
+seed for the climatology.
+
+Usage:
+    python analysis/verify_service.py data/RFWs_Northwest.json data/Fires_Northwest.json --port 8080
+    curl 'localhost:8080/skill?start_date=20060101&end_date=20151231&wfo=PDT&seed=1'
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+from query_filters import nfdrs_conditions
+from score_cache import ScoreCache, jsonable
+from store_cache import load_store
+from verification_funcs import VerifySkill, skill_scores
+
+KINDS = ('forecast', 'climo', 'skill')
+INT_PARAMS = ('start_date', 'end_date', 'perc_size', 'n_replicates', 'seed')
+LIST_PARAMS = ('wfo', 'zone')
+QUERY_PARAMS = ('start_date', 'end_date', 'wfo', 'zone', 'forestcover', 'cause', 'nfdrs_param', 'duration', 'perc_size')
+STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 500: 'Internal Server Error'}
+
+_verifier = None
+
+
+def _init_worker(rfw_file_path, fires_file_path, score_cache_path):
+    global _verifier
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        score_cache = ScoreCache(path=score_cache_path) if score_cache_path else None
+        _verifier = VerifySkill(rfw_file_path, fires_file_path, score_cache=score_cache)
+
+
+def _score(kind, params, n_replicates, seed):
+    """Runs one request in a scoring process, with VerifySkill's console output dropped"""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        query = _verifier.query_params(**params)
+        result = {'forecast': query.forecast_skill_scores()}
+        if kind in ('climo', 'skill'):
+            result['climo'] = query.climo_skill_scores(result['forecast'], n_replicates, seed)
+        if kind == 'skill':
+            result['skill'] = skill_scores(result['forecast'], result['climo'])
+    return result
+
+
+def parse_params(fields, query_string=False):
+    """
+    Converts request arguments (query-string lists or a JSON object) to query_params keywords
+
+    Parameters:
+        fields (dict): Arguments by name, from a JSON object or parse_qs.
+        query_string (bool): fields came from parse_qs, which lists every value; the last of a repeated
+                             single-valued argument is used. A JSON list for one of those is an error, except
+                             a duration's (low, high) pair.
+
+    Raises ValueError (or TypeError, for values of the wrong JSON type) for unknown, missing or malformed arguments.
+
+    Returns: (params, n_replicates, seed)
+    """
+    params = {}
+    for name, value in fields.items():
+        if isinstance(value, list) and name not in LIST_PARAMS + ('nfdrs_param',):
+            if query_string:
+                value = value[-1]
+            elif name != 'duration':
+                raise ValueError('%s takes a single value' % name)
+        if name in LIST_PARAMS:
+            values = value if isinstance(value, list) else [value]
+            value = [part for item in values for part in str(item).split(',') if part]
+        elif name == 'nfdrs_param':
+            # One INDEX,OPERATOR,THRESHOLD condition, or several (repeated, or a JSON list of lists) that must all hold
+            conditions = [value]
+            if isinstance(value, list) and all(isinstance(item, list) or ',' in str(item) for item in value):
+                conditions = value
+            value = []
+            for condition in conditions:
+                parts = condition.split(',') if isinstance(condition, str) else condition
+                if len(parts) != 3:
+                    raise ValueError('nfdrs_param needs INDEX,OPERATOR,THRESHOLD')
+                value.append([parts[0], parts[1], float(parts[2])])
+            value = nfdrs_conditions(value)
+            value = [list(condition) for condition in value] if len(value) > 1 else list(value[0])
+        elif name == 'duration':
+            # A DURATION_EDGES bucket (6, 12, 18 or 24), or a LOW,HIGH pair of hours (a JSON list in a POST body)
+            # with HIGH empty or null for open-ended
+            parts = value.split(',') if isinstance(value, str) and ',' in value else value
+            if isinstance(parts, list):
+                if len(parts) != 2:
+                    raise ValueError('duration needs HOURS or LOW,HIGH')
+                low, high = parts
+                value = [float(low), None if high in (None, '') else float(high)]
+            else:
+                value = int(parts)
+        elif name in INT_PARAMS:
+            value = int(value)
+        elif name not in QUERY_PARAMS:
+            raise ValueError('Unknown argument %r' % name)
+        params[name] = value
+
+    for name in ('start_date', 'end_date'):
+        if name not in params:
+            raise ValueError('%s is required' % name)
+    return params, params.pop('n_replicates', 100), params.pop('seed', None)
+
+
+class VerifyService:
+    """
+    Parameters:
+        rfw_file_path, fires_file_path (str): Data to serve, as for VerifySkill.
+        workers (int) (optional): Scoring processes. Defaults to every core.
+        score_cache_path (str) (optional): SQLite file the scoring processes share as their result cache.
+        max_results (int): Responses kept in the event loop's own cache.
+    """
+
+    def __init__(self, rfw_file_path, fires_file_path, workers=None, score_cache_path=None, max_results=4096):
+        # Builds or validates the column cache once, before the scoring processes map it
+        load_store(rfw_file_path, fires_file_path)
+        self.pool = ProcessPoolExecutor(workers, initializer=_init_worker,
+                                        initargs=(rfw_file_path, fires_file_path, score_cache_path))
+        self.results = ScoreCache(max_results)
+        self.pending = {}
+
+    async def score(self, kind, params, n_replicates, seed):
+        """Scores one request, sharing the work between identical requests that arrive together"""
+        key = ScoreCache.key(kind, params, 'service', n_replicates=n_replicates, seed=seed)
+        cacheable = seed is not None or kind == 'forecast'
+        if cacheable:
+            result = self.results.get(key)
+            if result is not None:
+                return result
+            if key in self.pending:
+                return await asyncio.shield(self.pending[key])
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.pool, _score, kind, params, n_replicates, seed)
+        if not cacheable:
+            return await future
+        self.pending[key] = future
+        try:
+            result = await asyncio.shield(future)
+        finally:
+            del self.pending[key]
+        self.results.put(key, result)
+        return result
+
+    async def respond(self, method, target, body):
+        url = urlsplit(target)
+        path = url.path.strip('/')
+        if path == 'health':
+            return 200, {'status': 'ok'}
+        if path not in KINDS:
+            return 404, {'error': 'Unknown endpoint /%s' % path}
+
+        try:
+            if method == 'GET':
+                fields = parse_qs(url.query)
+            elif method == 'POST':
+                fields = json.loads(body or b'{}')
+                if not isinstance(fields, dict):
+                    raise ValueError('Expected a JSON object')
+            else:
+                return 405, {'error': 'Use GET or POST'}
+            params, n_replicates, seed = parse_params(fields, query_string=method == 'GET')
+        except (TypeError, ValueError) as err:
+            return 400, {'error': str(err)}
+
+        try:
+            result = await self.score(path, params, n_replicates, seed)
+        except KeyError as err:
+            return 400, {'error': 'Unknown field %s' % err}
+        except ValueError as err:
+            return 400, {'error': str(err)}
+        except Exception as err:
+            return 500, {'error': '%s: %s' % (type(err).__name__, err)}
+        return 200, dict(result, params=params)
+
+    async def handle(self, reader, writer):
+        """Serves the requests of one connection, keeping it open between them unless asked not to"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if not line.strip():
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+
+                parts = request_line.decode('latin-1').split()
+                if len(parts) != 3:
+                    status, payload = 400, {'error': 'Malformed request line'}
+                else:
+                    status, payload = await self.respond(parts[0], parts[1], body)
+
+                keep_alive = headers.get('connection', '').lower() != 'close' and parts[-1:] != ['HTTP/1.0']
+                data = json.dumps(jsonable(payload)).encode()
+                writer.write(('HTTP/1.1 %i %s\r\nContent-Type: application/json\r\nContent-Length: %i\r\n'
+                              'Connection: %s\r\n\r\n' % (status, STATUS_TEXT[status], len(data),
+                                                          'keep-alive' if keep_alive else 'close')).encode() + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=8080):
+        server = await asyncio.start_server(self.handle, host, port)
+        print('Serving verification queries on http://%s:%i' % (host, port))
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self.pool.shutdown()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve RFW verification scores over HTTP')
+    parser.add_argument('rfw_file', nargs='?', default='data/RFWs_Northwest.json')
+    parser.add_argument('fires_file', nargs='?', default='data/Fires_Northwest.json')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--workers', type=int, default=None, help='Scoring processes (default: every core)')
+    parser.add_argument('--score-cache', help='SQLite file to share cached scores between processes and runs')
+    args = parser.parse_args()
+
+    service = VerifyService(args.rfw_file, args.fires_file, args.workers, args.score_cache)
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
@@ -0,0 +1,161 @@
+"""
+Window and lead-time aware matching of RFW days to fire days.
+
+match_keys counts an RFW day as a hit when a fire falls on it or on the day after. Here the window is any number of
+days before and after the RFW day. The day-zone keys are re-encoded zone-major, so each zone's days form one sorted
+run, and two searchsorted calls find, for every RFW day, the gap to the nearest fire day of its zone on or before it
+and on or after it (and the same for every fire day against the RFW days). An RFW day is hit by a window of
+(before, after) days when either gap fits on its side. So a 2-D histogram of the capped gap pairs, summed back from
+the far corner, holds the false alarms (and, for the fires, the misses) of every window up to the cap at once.
+
+Lead time is the number of days between a warning being issued (ISSUED, or INIT_ISS for the first product of its
+event) and the RFW day. Lead buckets select the RFW days issued that far ahead and are matched the same way.
+"""
+import numpy as np
+
+from date_manipulator import yyyymmdd_to_ordinal
+
+# Widest window, in days either side of the RFW day, a WindowMatcher answers for by default
+MAX_WINDOW = 15
+
+# Window shapes for a curve over widths w: fires within w days after, before, or on either side of the RFW day
+WINDOW_SHAPES = {
+    'after': lambda width: (0, width),
+    'before': lambda width: (width, 0),
+    'symmetric': lambda width: (width, width),
+}
+
+LEAD_REFERENCES = ('ISSUED', 'INIT_ISS')
+
+
+def window_pairs(widths, shape='after'):
+    """(before, after) day pairs for a curve over the window widths, in one of WINDOW_SHAPES"""
+    if shape not in WINDOW_SHAPES:
+        raise ValueError('Unknown window shape %r, use one of %s' % (shape, list(WINDOW_SHAPES)))
+    return [WINDOW_SHAPES[shape](int(width)) for width in widths]
+
+
+def nearest_gaps(keys, targets, span, cap):
+    """
+    Day gaps from every key to the nearest target of the same zone on or before it and on or after it
+
+    Parameters:
+        keys, targets (np.ndarray of int64): Zone-major keys zone * span + day; targets sorted.
+        span (int): Days per zone in the encoding.
+        cap (int): Gaps above cap are all reported as cap + 1, as is a side with no target in the zone.
+
+    Returns: (before, after) np.ndarrays of int64
+    """
+    none = cap + 1
+    if not len(targets):
+        return np.full(len(keys), none), np.full(len(keys), none)
+    zones = keys // span
+    last = len(targets) - 1
+
+    after_idx = np.searchsorted(targets, keys, 'left')
+    after = targets[np.minimum(after_idx, last)]
+    after_gap = np.where((after_idx <= last) & (after // span == zones), after - keys, none)
+
+    before_idx = np.searchsorted(targets, keys, 'right') - 1
+    before = targets[np.maximum(before_idx, 0)]
+    before_gap = np.where((before_idx >= 0) & (before // span == zones), keys - before, none)
+    return np.minimum(before_gap, none), np.minimum(after_gap, none)
+
+
+def _beyond(first, second, cap):
+    """beyond[i, j] is the number of pairs with first >= i and second >= j, for i, j in [0, cap + 1]"""
+    size = cap + 2
+    hist = np.bincount(first * size + second, minlength=size * size).reshape(size, size)
+    return hist[::-1, ::-1].cumsum(axis=0).cumsum(axis=1)[::-1, ::-1]
+
+
+class WindowMatcher:
+    """
+    Contingency counts of one selection for every (before, after) window up to max_window days
+
+    Parameters:
+        rfw_keys, fire_keys (np.ndarrays of int64): Unique event days from day_zone_keys.
+        n_zones (int): The zone count the keys were encoded with.
+        max_window (int): Widest window, in days on either side, that can be asked for.
+    """
+
+    def __init__(self, rfw_keys, fire_keys, n_zones, max_window=MAX_WINDOW):
+        self.max_window = max_window
+        self.n_rfw_days = len(rfw_keys)
+        self.n_fire_days = len(fire_keys)
+
+        days = np.concatenate([rfw_keys // n_zones, fire_keys // n_zones])
+        first_day = days.min() if len(days) else 0
+        span = int(days.max() - first_day + 1) if len(days) else 1
+        rfws = np.sort(rfw_keys % n_zones * span + (rfw_keys // n_zones - first_day))
+        fires = np.sort(fire_keys % n_zones * span + (fire_keys // n_zones - first_day))
+
+        # An RFW day is a false alarm for (before, after) when no fire falls in [day - before, day + after]
+        fire_before, fire_after = nearest_gaps(rfws, fires, span, max_window)
+        self.rfw_missed = _beyond(fire_before, fire_after, max_window)
+        # A fire day is missed when no RFW day falls in [day - after, day + before]
+        rfw_before, rfw_after = nearest_gaps(fires, rfws, span, max_window)
+        self.fire_missed = _beyond(rfw_after, rfw_before, max_window)
+
+    def contingency(self, before, after):
+        """
+        Parameters:
+            before, after (ints or np.ndarrays of ints): Days before and after the RFW day a fire may fall on to count
+                                                         as a hit. (0, 1) is the window match_keys uses.
+
+        Returns: (HITS, MISSES, FALSE_ALARMS), shaped like before and after
+        """
+        before, after = np.asarray(before), np.asarray(after)
+        if before.min(initial=0) < 0 or after.min(initial=0) < 0:
+            raise ValueError('Window days must not be negative')
+        if max(before.max(initial=0), after.max(initial=0)) > self.max_window:
+            raise ValueError('Windows wider than max_window=%i days' % self.max_window)
+        FALSE_ALARMS = self.rfw_missed[before + 1, after + 1]
+        MISSES = self.fire_missed[before + 1, after + 1]
+        return self.n_rfw_days - FALSE_ALARMS, MISSES, FALSE_ALARMS
+
+
+def lead_days(store, reference='INIT_ISS'):
+    """
+    Days from issuance to the RFW day for every RFW record, 0 for warnings issued on the day they cover
+
+    Parameters:
+        store (ColumnarStore): The loaded dataset.
+        reference (str): 'ISSUED' (this product) or 'INIT_ISS' (the first product of the event).
+    """
+    if reference not in LEAD_REFERENCES:
+        raise ValueError('Unknown lead time reference %r, use one of %s' % (reference, LEAD_REFERENCES))
+    if reference not in store.rfws:
+        raise ValueError('The RFW data has no %s field' % reference)
+    return store.rfw_day - yyyymmdd_to_ordinal(store.rfws[reference] // 10000)
+
+
+def lead_bucket_mask(leads, bucket):
+    """
+    Parameters:
+        leads (np.ndarray of ints): Lead days, from lead_days.
+        bucket (int, or (low, high) with high None for open-ended): Lead days to keep, inclusive.
+    """
+    low, high = (bucket, bucket) if np.isscalar(bucket) else bucket
+    mask = leads >= low
+    if high is not None:
+        mask &= leads <= high
+    return mask
+
+
+def bucket_label(bucket):
+    if np.isscalar(bucket):
+        return str(bucket)
+    low, high = bucket
+    return '%i+' % low if high is None else '%i-%i' % (low, high)
+
+
+def parse_bucket(text):
+    """Reads a lead bucket written as bucket_label does: '2', '1-3' or '3+'"""
+    text = str(text).strip()
+    if text.endswith('+'):
+        return int(text[:-1]), None
+    if '-' in text:
+        low, high = text.split('-')
+        return int(low), int(high)
+    return int(text)
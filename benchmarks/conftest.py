@@ -0,0 +1,73 @@
+"""
+Benchmarks of loading, querying, scoring and aggregating, on synthetic data (utilities/synthetic_data.py).
+
+The dataset for a scale is generated once and kept in data/.cache/synthetic/<scale>x/, so every run of a scale times
+the same records. The benchmarks need pytest-benchmark (pip install pytest-benchmark) and are skipped without it.
+
+Usage:
+    python -m pytest benchmarks --bench-scale 10
+    python -m pytest benchmarks --bench-scale 10 --benchmark-autosave
+    python -m pytest benchmarks --bench-scale 10 --benchmark-compare --benchmark-compare-fail=mean:15%
+
+--benchmark-autosave keeps each run's timings under .benchmarks/, and --benchmark-compare checks a run against the
+last saved one, failing on any benchmark whose mean time grew by more than the given share.
+"""
+import contextlib
+import io
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+for folder in ('analysis', 'utilities', 'visualization'):
+    if os.path.join(ROOT, folder) not in sys.path:
+        sys.path.append(os.path.join(ROOT, folder))
+
+from synthetic_data import write_dataset
+
+DATA_DIR = os.path.join(ROOT, 'data', '.cache', 'synthetic')
+SEED = 0
+
+
+def pytest_addoption(parser):
+    parser.addoption('--bench-scale', type=int, default=1,
+                     help='Synthetic dataset size as a multiple of the Northwest set (default 1)')
+
+
+@pytest.fixture(scope='session')
+def scale(request):
+    return request.config.getoption('--bench-scale')
+
+
+@pytest.fixture(scope='session')
+def dataset(scale):
+    """(rfw_path, fires_path) of the synthetic JSON files for the scale, written on first use"""
+    out_dir = os.path.join(DATA_DIR, '%ix' % scale)
+    paths = os.path.join(out_dir, 'RFWs.json'), os.path.join(out_dir, 'Fires.json')
+    if not all(os.path.exists(path) for path in paths):
+        paths = write_dataset(out_dir, scale, SEED, workers=None)
+    return paths
+
+
+@pytest.fixture(scope='session')
+def verify(dataset):
+    """A VerifySkill on the dataset, without score caching or query memos, so every call does its work"""
+    from verification_funcs import VerifySkill
+    with contextlib.redirect_stdout(io.StringIO()):
+        verify = VerifySkill(*dataset, score_cache=False)
+    verify.query_memo = 0
+    return verify
+
+
+@pytest.fixture(autouse=True)
+def quiet():
+    """Drops VerifySkill's console output, which would otherwise be timed along with the work"""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+@pytest.fixture(autouse=True)
+def record_scale(request, scale):
+    if 'benchmark' in request.fixturenames:
+        request.getfixturevalue('benchmark').extra_info['scale'] = scale
@@ -0,0 +1,53 @@
+"""Grouped work: the figure aggregates, parameter sweeps and the window, threshold and duration curves"""
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+from group_aggregates import RFW_GROUP_KEYS, aggregate
+
+
+@pytest.mark.benchmark(group='aggregate')
+def test_fire_aggregate(benchmark, verify):
+    benchmark(aggregate, verify.store.fires, ('year', 'month', 'cause', 'forest'))
+
+
+@pytest.mark.benchmark(group='aggregate')
+def test_fire_aggregate_percentiles(benchmark, verify):
+    benchmark(aggregate, verify.store.fires, ('wfo', 'zone'), percentiles=(50, 90))
+
+
+@pytest.mark.benchmark(group='aggregate')
+def test_rfw_aggregate(benchmark, verify):
+    benchmark(aggregate, verify.store.rfws, ('wfo', 'zone', 'year', 'month'), value=None,
+              group_keys=RFW_GROUP_KEYS)
+
+
+@pytest.mark.benchmark(group='sweep')
+def test_sweep_cube(benchmark, verify):
+    # Every cell is answered from the contingency cube
+    verify.contingency_cube()
+    grid = {'wfo': [None] + verify.store.wfos.tolist(), 'cause': [None, 'human', 'lightning'],
+            'forestcover': [None, 'yes', 'no']}
+    benchmark(verify.sweep, 20060101, 20151231, grid)
+
+
+@pytest.mark.benchmark(group='sweep')
+def test_sweep_records(benchmark, verify):
+    # Every cell needs the records, with the zone cells of a group matched once
+    grid = {'zone': [None] + verify.store.zones[:20].tolist(), 'perc_size': [50, 90]}
+    benchmark(verify.sweep, 20060101, 20151231, grid)
+
+
+@pytest.mark.benchmark(group='curves')
+def test_window_scores(benchmark, verify):
+    benchmark(verify.query_params(20060101, 20151231).window_scores)
+
+
+@pytest.mark.benchmark(group='curves')
+def test_nfdrs_sweep(benchmark, verify):
+    benchmark(verify.query_params(20060101, 20151231).nfdrs_sweep, 'ERC_PERC')
+
+
+@pytest.mark.benchmark(group='curves')
+def test_duration_scores(benchmark, verify):
+    benchmark(verify.query_params(20060101, 20151231).duration_scores)
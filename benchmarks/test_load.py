@@ -0,0 +1,40 @@
+"""Loading the dataset: from JSON with the column cache built, from the warm cache, and the contingency cube"""
+import os
+import shutil
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+from contingency_cube import ContingencyCube, load_cube
+from store_cache import default_cache_dir, load_store
+
+
+def _drop_caches(dataset):
+    for path in dataset:
+        shutil.rmtree(default_cache_dir(path), ignore_errors=True)
+
+
+@pytest.mark.benchmark(group='load')
+def test_load_json(benchmark, dataset):
+    # Every round starts without a cache, so it parses the JSON and writes the column cache
+    benchmark.pedantic(load_store, args=dataset, setup=lambda: _drop_caches(dataset), rounds=3)
+
+
+@pytest.mark.benchmark(group='load')
+def test_load_cached(benchmark, dataset):
+    load_store(*dataset)
+    benchmark(load_store, *dataset)
+
+
+@pytest.mark.benchmark(group='load')
+def test_build_cube(benchmark, verify):
+    benchmark(ContingencyCube.build, verify.store)
+
+
+@pytest.mark.benchmark(group='load')
+def test_load_cube(benchmark, verify, dataset):
+    cache_dir = default_cache_dir(dataset[1])
+    load_cube(verify.store, cache_dir)
+    assert os.path.exists(os.path.join(cache_dir, 'CONTINGENCY_CUBE.npz'))
+    benchmark(load_cube, verify.store, cache_dir)
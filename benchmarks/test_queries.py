@@ -0,0 +1,51 @@
+"""query_params selections and the forecast, climatology and bootstrap scores of a selection"""
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+# query_params arguments over 2006 - 2015, from the whole dataset down to a few zones
+QUERIES = {
+    'all': {},
+    'wfo': {'wfo': 'PDT'},
+    'zones': {'zone': ['AAZ001', 'AAZ002', 'AAZ003', 'AAZ201', 'AAZ202']},
+    'filters': {'cause': 'human', 'forestcover': 'yes', 'nfdrs_param': ['ERC_PERC', '>=', 50]},
+    'perc_size': {'wfo': ['PDT', 'SEW'], 'perc_size': 90},
+    'duration': {'duration': 12},
+}
+
+
+def _query(verify, name):
+    return verify.query_params(20060101, 20151231, **QUERIES[name])
+
+
+@pytest.mark.benchmark(group='query_params')
+@pytest.mark.parametrize('name', list(QUERIES))
+def test_query_params(benchmark, verify, name):
+    benchmark(_query, verify, name)
+
+
+@pytest.mark.benchmark(group='forecast')
+@pytest.mark.parametrize('name', list(QUERIES))
+def test_forecast(benchmark, verify, name):
+    benchmark(_query(verify, name).forecast_skill_scores)
+
+
+@pytest.mark.benchmark(group='forecast')
+@pytest.mark.parametrize('name', ['all', 'wfo', 'zones', 'filters'])
+def test_cube_forecast(benchmark, verify, name):
+    verify.contingency_cube()
+    benchmark(verify.cube_skill_scores, 20060101, 20151231, **QUERIES[name])
+
+
+@pytest.mark.benchmark(group='climo')
+@pytest.mark.parametrize('name', ['all', 'wfo'])
+def test_climo(benchmark, verify, name):
+    query = _query(verify, name)
+    forecast = query.forecast_skill_scores()
+    benchmark.pedantic(query.climo_skill_scores, args=(forecast, 100, 1), rounds=3)
+
+
+@pytest.mark.benchmark(group='bootstrap')
+@pytest.mark.parametrize('by', [None, 'zone'])
+def test_bootstrap(benchmark, verify, by):
+    benchmark(_query(verify, 'all').bootstrap_skill_scores, 1000, 'year', 95, 1, by)
@@ -0,0 +1,192 @@
+"""
+The original list-of-dicts code paths, ported from the scripts the columnar code replaced with their console output
+dropped, so the tests can check that the new code still reproduces them.
+"""
+import statistics as stat
+from datetime import datetime, timedelta
+
+import numpy as np
+
+HUMAN_CODES = ['2', '3', '4', '5', '6', '7', '8', '9', '10', '11', '12']
+
+
+def select(rfws, fires, start_date, end_date, **kwargs):
+    """The filtering of the original VerifySkill.query_params. Returns the (rfws, fires) records kept."""
+    if 'wfo' in kwargs:
+        if type(kwargs['wfo']) is list:
+            rfws = [rfw for rfw in rfws if rfw['WFO'] in kwargs['wfo']]
+            fires = [fire for fire in fires if fire['WFO'] in kwargs['wfo']]
+        else:
+            rfws = [rfw for rfw in rfws if rfw['WFO'] == kwargs['wfo']]
+            fires = [fire for fire in fires if fire['WFO'] == kwargs['wfo']]
+
+    if 'perc_size' in kwargs:
+        zone_sizes = {}
+        for fire in fires:
+            zone_sizes.setdefault(fire['UGC_ZONE'], []).append(fire['SIZE_AC'])
+        thresholds = {zone: np.percentile(np.array(sizes), kwargs['perc_size']) for zone, sizes in zone_sizes.items()}
+        fires = [fire for fire in fires if fire['SIZE_AC'] >= thresholds[fire['UGC_ZONE']]]
+
+    start, end = datetime.strptime(str(start_date), '%Y%m%d'), datetime.strptime(str(end_date), '%Y%m%d')
+    rfws = [rfw for rfw in rfws if start <= datetime.strptime(rfw['FLAT_DATE'], '%Y%m%d') <= end]
+    fires = [fire for fire in fires
+             if start <= datetime.strptime(str(fire['DISC_DATE'])[:8], '%Y%m%d') <= end + timedelta(days=1)]
+
+    if 'zone' in kwargs:
+        if type(kwargs['zone']) is list:
+            rfws = [rfw for rfw in rfws if rfw['NWS_UGC'] in kwargs['zone']]
+            fires = [fire for fire in fires if fire['UGC_ZONE'] in kwargs['zone']]
+        else:
+            rfws = [rfw for rfw in rfws if rfw['NWS_UGC'] == kwargs['zone']]
+            fires = [fire for fire in fires if fire['UGC_ZONE'] == kwargs['zone']]
+
+    if 'forestcover' in kwargs:
+        fires = [fire for fire in fires if fire['FORESTED'] == kwargs['forestcover']]
+
+    if 'cause' in kwargs:
+        if kwargs['cause'] == 'lightning':
+            fires = [fire for fire in fires if str(fire['STAT_CAUSE']) in ['1']]
+        if kwargs['cause'] == 'human':
+            fires = [fire for fire in fires if str(fire['STAT_CAUSE']) in HUMAN_CODES]
+
+    if 'nfdrs_param' in kwargs:
+        fd_index, fd_operator, fd_threshold = kwargs['nfdrs_param']
+        if fd_operator == '<':
+            fires = [fire for fire in fires if fire[fd_index] < fd_threshold]
+        elif fd_operator == '==':
+            fires = [fire for fire in fires if fire[fd_index] == fd_threshold]
+        elif fd_operator == '>=':
+            fires = [fire for fire in fires if fire[fd_index] >= fd_threshold]
+
+    if 'duration' in kwargs:
+        kept = []
+        for rfw in rfws:
+            length = (datetime.strptime(rfw['EXPIRED'], '%Y%m%d%H%M') - datetime.strptime(rfw['ISSUED'], '%Y%m%d%H%M'))
+            hours = length.seconds / 3600
+            if kwargs['duration'] == 6:
+                if 0 <= hours <= 6:
+                    kept.append(rfw)
+            elif kwargs['duration'] == 12:
+                if 6 < hours <= 12:
+                    kept.append(rfw)
+            elif kwargs['duration'] == 18:
+                if 12 < hours <= 18:
+                    kept.append(rfw)
+            elif kwargs['duration'] == 24:
+                if 18 < hours <= 24:
+                    kept.append(rfw)
+        rfws = kept
+    return rfws, fires
+
+
+def event_days(rfws, fires):
+    """The unique (YYYYMMDD, zone) RFW days and fire days"""
+    return ({(rfw['FLAT_DATE'], rfw['NWS_UGC']) for rfw in rfws},
+            {(str(fire['DISC_DATE'])[:8], fire['UGC_ZONE']) for fire in fires})
+
+
+def shift(days, delta):
+    return {((datetime.strptime(day, '%Y%m%d') + timedelta(days=delta)).strftime('%Y%m%d'), zone) for day, zone in days}
+
+
+def match(rfw_days, fire_days):
+    """(HITS, MISSES, FALSE_ALARMS) of the original set intersections: a fire on an RFW day or the day after is a hit"""
+    exact_matches = rfw_days & fire_days
+    day_2_matches = shift(rfw_days, 1) & fire_days
+    rfw_matches = exact_matches | shift(day_2_matches, -1)
+    fire_matches = exact_matches | day_2_matches
+    return len(rfw_matches), len(fire_days - fire_matches), len(rfw_days - rfw_matches)
+
+
+def window_match(rfw_days, fire_days, before, after):
+    """match with the day-after shift widened to every shift from before days before to after days after the RFW day"""
+    rfw_matches, fire_matches = set(), set()
+    for delta in range(-before, after + 1):
+        matches = shift(rfw_days, delta) & fire_days
+        rfw_matches |= shift(matches, -delta)
+        fire_matches |= matches
+    return len(rfw_matches), len(fire_days - fire_matches), len(rfw_days - rfw_matches)
+
+
+def forecast_counts(rfws, fires, start_date, end_date, **kwargs):
+    return match(*event_days(*select(rfws, fires, start_date, end_date, **kwargs)))
+
+
+def climo_days(rfw_days, deltas, years):
+    """
+    The original climatology move of a list of (YYYYMMDD, zone) RFW days: each by its delta days, then into its year
+    (a leap year for a Feb 29, as the original drew it from 2008 and 2012)
+    """
+    moved = set()
+    for (day, zone), delta, year in zip(rfw_days, deltas, years):
+        rfwday = datetime.strptime(day, '%Y%m%d') + timedelta(days=delta)
+        moved.add((rfwday.replace(year=year).strftime('%Y%m%d'), zone))
+    return moved
+
+
+def climo_medians(forecast_dict, replicates):
+    """The original median scores and SIG_TEST count over a list of replicate (HITS, MISSES, FALSE_ALARMS)"""
+    scores = []
+    for HITS, MISSES, FALSE_ALARMS in replicates:
+        scores.append({'BIAS': (HITS + FALSE_ALARMS) / (HITS + MISSES), 'POD': HITS / (HITS + MISSES),
+                       'FAR': FALSE_ALARMS / (HITS + FALSE_ALARMS), 'CSI': HITS / (HITS + MISSES + FALSE_ALARMS)})
+    medians = {name: stat.median(sorted(score[name] for score in scores)) for name in ('BIAS', 'POD', 'FAR', 'CSI')}
+    sig_list = [(forecast_dict['POD'] - score['POD']) / (1 - score['POD']) for score in scores]
+    medians['SIG_TEST'] = len([score for score in sig_list if score > 0])
+    return medians
+
+
+def large_fires(fires, perc_input):
+    """The original LARGE_FIRES_visuals selection: fires at or above their zone's rounded perc_input-th percentile"""
+    zone_sizes = {}
+    for fire in fires:
+        zone_sizes.setdefault(fire['UGC_ZONE'], []).append(fire['SIZE_AC'])
+    fire_sizes = {zone: round(np.percentile(np.array(sizes), perc_input), 2) for zone, sizes in zone_sizes.items()}
+    return [fire for fire in fires if fire['SIZE_AC'] >= fire_sizes[fire['UGC_ZONE']]]
+
+
+def reduce_rfws(collection):
+    """The original rfw_reducer filter over a loaded feature collection: Northwest fire weather warnings"""
+    rfws_reduced = []
+    for rfw in collection['features']:
+        if rfw['attributes']["WFO"] in ['MSO', "PIH", "BOI", "SEW", "MFR", "PQR", "PDT", "OTX"]:
+            if rfw['attributes']["PHENOM"] == 'FW':
+                if rfw['attributes']["SIG"] == 'W':
+                    rfws_reduced.append({
+                        "WFO": rfw['attributes']["WFO"],
+                        "ISSUED": rfw['attributes']["ISSUED"],
+                        "EXPIRED": rfw['attributes']["EXPIRED"],
+                        "INIT_ISS": rfw['attributes']["INIT_ISS"],
+                        "INIT_EXP": rfw['attributes']["INIT_EXP"],
+                        "STATUS": rfw['attributes']["STATUS"],
+                        "NWS_UGC": rfw['attributes']["NWS_UGC"],
+                        "STATE": rfw['attributes']["calc_state"],
+                    })
+    return rfws_reduced
+
+
+def flatten(rfws):
+    """The original date_manipulator script: one record per day a reduced warning covers, numbered in order"""
+    RFWS_flattened = []
+    for rfw in rfws:
+        iss_date = datetime.strptime(rfw['ISSUED'], '%Y%m%d%H%M')
+        exp_date = datetime.strptime(rfw['EXPIRED'], '%Y%m%d%H%M')
+        date_delta = ((exp_date - iss_date).seconds / 60) / 60
+        starttime_delta = 24 - int(rfw['ISSUED'][8:10])
+
+        fields = {name: rfw[name] for name in ('WFO', 'ISSUED', 'EXPIRED', 'INIT_ISS', 'INIT_EXP', 'STATUS',
+                                               'NWS_UGC', 'STATE')}
+        # Stays within one day
+        if starttime_delta >= date_delta:
+            RFWS_flattened.append(dict(fields, OBJECTID=0, FLAT_DATE=iss_date.strftime('%Y%m%d'), RFW_DAYS='1 day'))
+        else:
+            iss_date = datetime.strptime(rfw['ISSUED'][:8], '%Y%m%d')
+            exp_date = datetime.strptime(rfw['EXPIRED'][:8], '%Y%m%d')
+            while iss_date <= exp_date:
+                RFWS_flattened.append(dict(fields, OBJECTID=0, FLAT_DATE=iss_date.strftime('%Y%m%d'),
+                                           RFW_DAYS='2 days'))
+                iss_date += timedelta(days=1)
+
+    for id, rfw in enumerate(RFWS_flattened):
+        rfw['OBJECTID'] = id
+    return RFWS_flattened
@@ -0,0 +1,178 @@
+"""
+Shared fixtures: a small hand-made dataset whose counts are known, written as the flattened JSON VerifySkill reads.
+
+Zones AAZ001 and AAZ002 (WFO AAA) have warnings and fires; BBZ001 (WFO BBB) has fires but never a warning. Nothing
+happens outside 2010 and 2011.
+
+random_records makes a larger seeded dataset for checking the columnar code against the original list-of-dicts code
+(tests/baseline.py) on many queries.
+"""
+import contextlib
+import io
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+for folder in ('analysis', 'utilities', 'visualization'):
+    if os.path.join(ROOT, folder) not in sys.path:
+        sys.path.append(os.path.join(ROOT, folder))
+
+# (WFO, zone, issued, expired) of every RFW day
+RFW_DAYS = [
+    ('AAA', 'AAZ001', '201007011300', '201007020200'),
+    ('AAA', 'AAZ001', '201007101200', '201007110400'),
+    ('AAA', 'AAZ002', '201108051400', '201108052200'),
+    ('AAA', 'AAZ002', '201108201400', '201108210600'),
+]
+# (WFO, zone, discovery date, STAT_CAUSE, forested, acres, ERC_PERC)
+FIRES = [
+    ('AAA', 'AAZ001', '201007021500', 1, 'yes', 12.0, 95.0),
+    ('AAA', 'AAZ001', 20100801, 5, 'no', 0.5, 60.0),
+    ('AAA', 'AAZ002', '201108051600', 1, 'yes', 300.0, 99.0),
+    ('BBB', 'BBZ001', 20100715, 1, 'yes', 40.0, 80.0),
+    ('BBB', 'BBZ001', '201106010900', 9, 'no', 2.0, None),
+]
+
+
+def rfw_records():
+    records = []
+    for i, (wfo, zone, issued, expired) in enumerate(RFW_DAYS):
+        records.append({'OBJECTID': i, 'WFO': wfo, 'NWS_UGC': zone, 'STATE': wfo[:2], 'STATUS': 'NEW',
+                        'RFW_DAYS': '1 days', 'FLAT_DATE': issued[:8], 'ISSUED': issued, 'EXPIRED': expired,
+                        'INIT_ISS': issued, 'INIT_EXP': expired})
+    return records
+
+
+def fire_records():
+    records = []
+    for i, (wfo, zone, disc_date, cause, forested, acres, erc) in enumerate(FIRES):
+        records.append({'ID': i, 'WFO': wfo, 'UGC_ZONE': zone, 'FORESTED': forested, 'DISC_DATE': disc_date,
+                        'STAT_CAUSE': cause, 'SIZE_AC': acres, 'BI_PERC': erc, 'ERC_PERC': erc,
+                        'FM100_PERC': erc, 'FM1000_PER': erc})
+    return records
+
+
+# WFO -> zones of the random dataset. DDZ001 only ever has fires.
+RANDOM_ZONES = {
+    'AAA': ['AAZ001', 'AAZ002', 'AAZ003', 'AAZ004'],
+    'BBB': ['BBZ001', 'BBZ002', 'BBZ003'],
+    'CCC': ['CCZ001', 'CCZ002', 'CCZ003'],
+    'DDD': ['DDZ001'],
+}
+NFDRS_FIELDS = ('BI_PERC', 'ERC_PERC', 'FM100_PERC', 'FM1000_PER')
+
+
+def random_records(seed=0, n_rfws=300, n_fires=500):
+    """
+    (rfw_records, fire_records) of a seeded dataset over 2006 - 2015 in the fields the original code read: warnings
+    shorter than a day (whose length the original .seconds arithmetic got right), fires partly on or the day after a
+    warning in their zone, DISC_DATE mixing YYYYMMDD ints and YYYYMMDDHHMM strings, and no missing values.
+    """
+    rng = np.random.default_rng(seed)
+    warned = [(wfo, zone) for wfo, zones in RANDOM_ZONES.items() if wfo != 'DDD' for zone in zones]
+    everywhere = [(wfo, zone) for wfo, zones in RANDOM_ZONES.items() for zone in zones]
+
+    def season_day():
+        return datetime(int(rng.integers(2006, 2016)), 6, 1) + timedelta(days=int(rng.integers(0, 122)))
+
+    rfws = []
+    for i in range(n_rfws):
+        wfo, zone = warned[rng.integers(len(warned))]
+        issued = season_day() + timedelta(minutes=int(rng.integers(0, 24 * 60)))
+        expired = issued + timedelta(minutes=int(rng.integers(0, 24 * 60)))
+        init_iss = issued - timedelta(hours=int(rng.integers(0, 48)))
+        rfws.append({'OBJECTID': i, 'WFO': wfo, 'NWS_UGC': zone, 'STATE': wfo[:2], 'STATUS': 'NEW',
+                     'RFW_DAYS': '1 day', 'FLAT_DATE': issued.strftime('%Y%m%d'),
+                     'ISSUED': issued.strftime('%Y%m%d%H%M'), 'EXPIRED': expired.strftime('%Y%m%d%H%M'),
+                     'INIT_ISS': init_iss.strftime('%Y%m%d%H%M'), 'INIT_EXP': expired.strftime('%Y%m%d%H%M')})
+
+    fires = []
+    for i in range(n_fires):
+        if rng.random() < 0.4:
+            rfw = rfws[rng.integers(len(rfws))]
+            wfo, zone = rfw['WFO'], rfw['NWS_UGC']
+            day = datetime.strptime(rfw['FLAT_DATE'], '%Y%m%d') + timedelta(days=int(rng.integers(0, 2)))
+        else:
+            wfo, zone = everywhere[rng.integers(len(everywhere))]
+            day = season_day()
+        if rng.random() < 0.5:
+            disc_date = int(day.strftime('%Y%m%d'))
+        else:
+            disc_date = (day + timedelta(minutes=int(rng.integers(0, 24 * 60)))).strftime('%Y%m%d%H%M')
+        record = {'ID': i, 'WFO': wfo, 'UGC_ZONE': zone, 'FORESTED': ['yes', 'no'][rng.integers(2)],
+                  'DISC_DATE': disc_date, 'STAT_CAUSE': int(rng.integers(1, 14)),
+                  'SIZE_AC': round(float(rng.lognormal(1, 2)), 1)}
+        record.update((field, float(rng.integers(0, 101))) for field in NFDRS_FIELDS)
+        fires.append(record)
+    return rfws, fires
+
+
+def random_queries(seed=0, n=100):
+    """query_params arguments the original code took, at random: (start_date, end_date, kwargs)"""
+    rng = np.random.default_rng(seed)
+    wfos = list(RANDOM_ZONES)
+    zones = [zone for zones in RANDOM_ZONES.values() for zone in zones]
+    queries = []
+    for _ in range(n):
+        start = datetime(int(rng.integers(2005, 2016)), 1, 1) + timedelta(days=int(rng.integers(0, 365)))
+        end = start + timedelta(days=int(rng.integers(0, 4000)))
+        kwargs = {}
+        if rng.random() < 0.4:
+            kwargs['wfo'] = wfos[rng.integers(len(wfos))] if rng.random() < 0.5 else \
+                [str(wfo) for wfo in rng.choice(wfos, 2, replace=False)]
+        if rng.random() < 0.3:
+            kwargs['zone'] = zones[rng.integers(len(zones))] if rng.random() < 0.5 else \
+                [str(zone) for zone in rng.choice(zones, 3, replace=False)]
+        if rng.random() < 0.3:
+            kwargs['perc_size'] = int(rng.choice([50, 75, 90]))
+        if rng.random() < 0.3:
+            kwargs['forestcover'] = ['yes', 'no'][rng.integers(2)]
+        if rng.random() < 0.3:
+            kwargs['cause'] = ['human', 'lightning'][rng.integers(2)]
+        if rng.random() < 0.3:
+            kwargs['nfdrs_param'] = [NFDRS_FIELDS[rng.integers(4)], ['<', '==', '>='][rng.integers(3)],
+                                     int(rng.integers(0, 101))]
+        if rng.random() < 0.3:
+            kwargs['duration'] = int(rng.choice([6, 12, 18, 24]))
+        queries.append((int(start.strftime('%Y%m%d')), int(end.strftime('%Y%m%d')), kwargs))
+    return queries
+
+
+def write_records(paths, records):
+    for path, data in zip(paths, records):
+        with open(path, 'w') as f:
+            json.dump(data, f)
+    return paths
+
+
+@pytest.fixture(scope='session')
+def random_dataset(tmp_path_factory):
+    """(rfw_path, fires_path) of random_records(), written once per session. Tests must not modify the files."""
+    out_dir = tmp_path_factory.mktemp('random')
+    return write_records((str(out_dir / 'RFWs.json'), str(out_dir / 'Fires.json')), random_records())
+
+
+@pytest.fixture(scope='session')
+def random_verify(random_dataset):
+    """A VerifySkill on random_dataset, shared by the tests, so only use its immutable query results"""
+    from verification_funcs import VerifySkill
+    with contextlib.redirect_stdout(io.StringIO()):
+        return VerifySkill(*random_dataset, score_cache=False, use_cache=False)
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    """(rfw_path, fires_path) of the dataset, in a fresh directory so every test builds its own caches"""
+    return write_records((str(tmp_path / 'RFWs.json'), str(tmp_path / 'Fires.json')), (rfw_records(), fire_records()))
+
+
+@pytest.fixture
+def verify(dataset):
+    from verification_funcs import VerifySkill
+    with contextlib.redirect_stdout(io.StringIO()):
+        return VerifySkill(*dataset, score_cache=False)
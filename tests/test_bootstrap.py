@@ -0,0 +1,45 @@
+import contextlib
+import io
+import math
+
+import numpy as np
+import pytest
+
+
+def bootstrap(verify, start_date, end_date, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return verify.bootstrap_skill_scores(verify.query_params(start_date, end_date), seed=1, **kwargs)
+
+
+def test_empty_window(verify):
+    scores = bootstrap(verify, 20000101, 20001231, n_resamples=50)
+    assert (scores['HITS'], scores['MISSES'], scores['FALSE_ALARMS'], scores['N_BLOCKS']) == (0, 0, 0, 0)
+    for name in ('BIAS', 'POD', 'FAR', 'CSI'):
+        assert math.isnan(scores[name])
+        assert all(math.isnan(value) for value in scores[name + '_CI'])
+
+
+def test_empty_window_by_zone(verify):
+    assert bootstrap(verify, 20000101, 20001231, n_resamples=50, by='zone') == {}
+
+
+def test_intervals_cover_the_scores(verify):
+    scores = bootstrap(verify, 20060101, 20151231, n_resamples=200)
+    assert scores['POD'] == pytest.approx(0.4)
+    assert scores['N_BLOCKS'] == 2
+    low, high = scores['POD_CI']
+    assert low <= scores['POD'] <= high
+
+
+def test_table_scores_match_contingency_scores():
+    from bootstrap import table_scores
+    from verification_funcs import contingency_scores
+
+    rng = np.random.default_rng(0)
+    n_rfw, n_fire = rng.integers(0, 4, size=(2, 200)).astype(np.float64)
+    hits, caught = np.minimum(rng.integers(0, 4, size=(2, 200)), [n_rfw, n_fire])
+    scores = table_scores(n_rfw, hits, n_fire, caught)
+    for i in range(200):
+        expected = contingency_scores(int(hits[i]), int(n_fire[i] - caught[i]), int(n_rfw[i] - hits[i]))
+        for name in ('BIAS', 'POD', 'FAR', 'CSI'):
+            np.testing.assert_equal(scores[name][i], expected[name])
@@ -0,0 +1,78 @@
+import contextlib
+import io
+
+import numpy as np
+import pytest
+
+import baseline
+
+
+def day_strings(ordinals):
+    from date_manipulator import ordinal_to_yyyymmdd
+    return [str(day) for day in ordinal_to_yyyymmdd(ordinals)]
+
+
+@pytest.fixture(scope='module')
+def query(random_verify):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return random_verify.query_params(20060101, 20151231, wfo=['AAA', 'BBB'])
+
+
+def test_replicates_match_the_original_moves(query):
+    from climatology import DAY_OFFSETS, FireGrid, draw_climo_days, score_climo_days
+
+    rfw_day, rfw_zone = np.divmod(np.asarray(query.rfw_keys), query.n_zones)
+    fire_day, fire_zone = np.divmod(np.asarray(query.fire_keys), query.n_zones)
+    climo = draw_climo_days(np.random.default_rng(0), rfw_day, 50)
+    HITS, MISSES, FALSE_ALARMS = score_climo_days(climo, rfw_zone, FireGrid.from_keys(query.fire_keys, query.n_zones))
+
+    rfw_days = list(zip(day_strings(rfw_day), rfw_zone.tolist()))
+    fire_days = set(zip(day_strings(fire_day), fire_zone.tolist()))
+    shifted = [[day[4:] for day in day_strings(rfw_day + offset)] for offset in DAY_OFFSETS]
+    for row, counts in zip(climo, zip(HITS, MISSES, FALSE_ALARMS)):
+        # Recover each RFW's offset and year from its draw, which must be a move the original could make
+        drawn = day_strings(row)
+        deltas = []
+        for i, day in enumerate(drawn):
+            offsets = [offset for offset, days in zip(DAY_OFFSETS, shifted) if days[i] == day[4:]]
+            assert len(offsets) == 1 and 2006 <= int(day[:4]) <= 2015
+            deltas.append(int(offsets[0]))
+        climo_days = baseline.climo_days(rfw_days, deltas, [int(day[:4]) for day in drawn])
+        assert climo_days == set(zip(drawn, rfw_zone.tolist()))
+        assert tuple(int(count) for count in counts) == baseline.match(climo_days, fire_days)
+
+
+def test_leap_days_move_to_leap_years():
+    from climatology import draw_climo_days
+    from date_manipulator import yyyymmdd_to_ordinal
+
+    # Feb 14 2012 + 15 days is Feb 29, which must stay Feb 29 and so move to a leap year, never to Mar 1
+    rfw_day = yyyymmdd_to_ordinal(np.array([20120214]))
+    climo = day_strings(draw_climo_days(np.random.default_rng(1), rfw_day, 2000).ravel())
+    assert '0301' not in {day[4:] for day in climo}
+    assert {day[:4] for day in climo if day[4:] == '0229'} == {'2008', '2012'}
+
+
+def test_medians_match_the_original_summary(query):
+    from climatology import climo_contingency
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        forecast = query.forecast_skill_scores()
+        medians = query.climo_skill_scores(forecast, n_replicates=200, seed=3)
+    replicates = zip(*climo_contingency(query.rfw_keys, query.fire_keys, query.n_zones, 200, seed=3))
+    assert medians == pytest.approx(baseline.climo_medians(forecast, replicates))
+
+
+def test_counts_do_not_depend_on_workers(query, monkeypatch):
+    import climatology
+
+    # Small blocks, so the replicates spread over several processes
+    monkeypatch.setattr(climatology, 'BLOCK_CELLS', 20 * len(query.rfw_keys))
+    serial = climatology.climo_contingency(query.rfw_keys, query.fire_keys, query.n_zones, 100, seed=5)
+    parallel = climatology.climo_contingency(query.rfw_keys, query.fire_keys, query.n_zones, 100, seed=5, workers=3)
+    assert len(climatology.replicate_blocks(100, len(query.rfw_keys))) == 5
+    assert all(np.array_equal(a, b) for a, b in zip(serial, parallel))
+    with contextlib.redirect_stdout(io.StringIO()):
+        forecast = query.forecast_skill_scores()
+        medians = query.climo_skill_scores(forecast, 100, seed=5)
+        assert query.climo_skill_scores(forecast, 100, seed=5, workers=3) == medians
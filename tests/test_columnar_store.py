@@ -0,0 +1,47 @@
+import contextlib
+import io
+
+import numpy as np
+import pytest
+
+import baseline
+from conftest import random_queries, random_records
+
+
+def counts(scores):
+    return scores['HITS'], scores['MISSES'], scores['FALSE_ALARMS']
+
+
+def test_records_round_trip():
+    from columnar_store import FIRE_SCHEMA, RFW_SCHEMA, table_from_records
+
+    rfws, fires = random_records()
+    for records, schema in ((rfws, RFW_SCHEMA), (fires, FIRE_SCHEMA)):
+        table = table_from_records(records, schema)
+        fields = [name for name in records[0] if name in table]
+        assert [{name: record[name] for name in fields} for record in table.to_records()] == \
+            [{name: record[name] if name != 'DISC_DATE' else int(str(record[name])[:8]) for name in fields}
+             for record in records]
+
+
+def test_categorical():
+    from columnar_store import Categorical
+
+    column = Categorical.from_values(['BBZ001', 'AAZ001', 'BBZ001', 'CCZ001'])
+    assert column.values().tolist() == ['BBZ001', 'AAZ001', 'BBZ001', 'CCZ001']
+    assert column.isin(['BBZ001', 'XXZ001']).tolist() == [True, False, True, False]
+    assert column.isin('CCZ001').tolist() == [False, False, False, True]
+    assert column.code_of('AAZ001') == 0 and column.code_of('XXZ001') == -1
+    assert column.recode(np.array(['AAZ001', 'ABZ001', 'BBZ001', 'CCZ001'])).tolist() == [2, 0, 2, 3]
+
+
+RECORDS = random_records()
+
+
+@pytest.mark.parametrize('start_date, end_date, kwargs', random_queries(n=150))
+def test_queries_match_the_record_filters(random_verify, start_date, end_date, kwargs):
+    rfws, fires = RECORDS
+    with contextlib.redirect_stdout(io.StringIO()):
+        query = random_verify.query_params(start_date, end_date, **kwargs)
+    expected = baseline.forecast_counts(rfws, fires, start_date, end_date, **kwargs)
+    assert counts(query.forecast_skill_scores()) == expected
@@ -0,0 +1,35 @@
+import contextlib
+import io
+
+import numpy as np
+import pytest
+
+QUERIES = [
+    {},
+    {'zone': 'BBZ001'},
+    {'wfo': 'BBB'},
+    {'zone': ['AAZ001', 'BBZ001']},
+    {'wfo': 'AAA', 'cause': 'lightning'},
+    {'cause': 'human', 'forestcover': 'no'},
+    {'zone': 'AAZ002', 'forestcover': 'no'},
+]
+WINDOWS = [(20060101, 20151231), (20100702, 20100731), (20110601, 20110601), (20000101, 20001231)]
+
+
+@pytest.mark.parametrize('window', WINDOWS)
+@pytest.mark.parametrize('params', QUERIES)
+def test_cube_matches_records(verify, window, params):
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert verify.contingency_cube().supports(dict(params, start_date=window[0], end_date=window[1]))
+        cube = verify.cube_skill_scores(*window, **params)
+        records = verify.forecast_skill_scores(verify.query_params(*window, **params))
+    for name, value in records.items():
+        np.testing.assert_equal(cube[name], value, err_msg=name)
+        assert type(cube[name]) is type(value)
+
+
+def test_zone_without_warnings(verify):
+    with contextlib.redirect_stdout(io.StringIO()):
+        scores = verify.cube_skill_scores(20060101, 20151231, zone='BBZ001')
+    assert (scores['N_RFW_DAYS'], scores['N_FIRE_DAYS'], scores['HITS'], scores['MISSES']) == (0, 2, 0, 2)
+    assert scores['POD'] == 0 and np.isnan(scores['FAR'])
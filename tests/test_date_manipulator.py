@@ -0,0 +1,95 @@
+import datetime
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+import baseline
+from columnar_store import Categorical
+from date_manipulator import (duration_minutes, flatten_rfws, flatten_table, ordered_map, ordinal_to_yyyymmdd,
+                              stamps_to_minutes, yyyymmdd_to_ordinal)
+
+
+def reduced_rfws(n, seed=0, max_hours=60):
+    """Reduced RFW records (rfw_reducer output) issued over 2010 and lasting 1 - max_hours hours"""
+    rng = np.random.default_rng(seed)
+    rfws = []
+    for i in range(n):
+        issued = datetime.datetime(2010, 1, 1) + datetime.timedelta(minutes=int(rng.integers(365 * 1440)))
+        expired = issued + datetime.timedelta(minutes=int(rng.integers(60, max_hours * 60)))
+        wfo = ['AAA', 'BBB', 'CCC'][i % 3]
+        rfws.append({'WFO': wfo, 'NWS_UGC': '%sZ%03i' % (wfo[:2], rng.integers(1, 6)), 'STATE': wfo[:2],
+                     'STATUS': ['NEW', 'CON', 'EXT'][i % 3], 'ISSUED': issued.strftime('%Y%m%d%H%M'),
+                     'EXPIRED': expired.strftime('%Y%m%d%H%M'), 'INIT_ISS': issued.strftime('%Y%m%d%H%M'),
+                     'INIT_EXP': expired.strftime('%Y%m%d%H%M')})
+    return rfws
+
+
+def chunked(records, size):
+    return [records[i:i + size] for i in range(0, len(records), size)]
+
+
+def column_values(table, name):
+    col = table[name]
+    return col.values().tolist() if isinstance(col, Categorical) else np.asarray(col).tolist()
+
+
+def test_ordinals_match_datetime():
+    """The strptime/timedelta arithmetic the ordinals replaced, over leap days and year ends"""
+    rng = np.random.default_rng(0)
+    epoch = datetime.datetime(1970, 1, 1)
+    offsets = rng.integers(0, 30 * 525960, 500)
+    stamps = [datetime.datetime(2000, 1, 1) + datetime.timedelta(minutes=int(minute)) for minute in offsets]
+    stamps += [datetime.datetime(year, month, day, 23, 59) for year in (2008, 2011, 2012, 2100)
+               for month, day in ((2, 28), (3, 1), (12, 31))] + [datetime.datetime(2012, 2, 29)]
+    dates = np.array([int(stamp.strftime('%Y%m%d')) for stamp in stamps])
+    minutes = np.array([int(stamp.strftime('%Y%m%d%H%M')) for stamp in stamps])
+
+    ordinals = yyyymmdd_to_ordinal(dates)
+    assert ordinals.tolist() == [(stamp - epoch).days for stamp in stamps]
+    assert ordinal_to_yyyymmdd(ordinals + 1).tolist() == \
+        [int((stamp + datetime.timedelta(days=1)).strftime('%Y%m%d')) for stamp in stamps]
+    assert stamps_to_minutes(minutes).tolist() == [(stamp - epoch) // datetime.timedelta(minutes=1) for stamp in stamps]
+    spans = [(end - start) // datetime.timedelta(minutes=1) for start, end in zip(stamps, stamps[1:])]
+    assert duration_minutes(minutes[:-1], minutes[1:]).tolist() == [max(-32768, min(32767, span)) for span in spans]
+
+
+def test_ordered_map_reads_a_bounded_window_ahead():
+    read = []
+
+    def items():
+        for i in range(50):
+            read.append(i)
+            yield i
+
+    with ThreadPoolExecutor(2) as pool:
+        for i, result in enumerate(ordered_map(pool, lambda x: x * 2, items(), 4)):
+            assert result == 2 * i
+            # The item yielded, plus at most the window read ahead of it
+            assert len(read) <= i + 1 + 4
+
+
+@pytest.mark.parametrize('workers', [2, 3])
+def test_parallel_flattening_matches_serial(workers):
+    chunks = chunked(reduced_rfws(300), 25)
+    serial = flatten_table(chunks, workers=1)
+    parallel = flatten_table(iter(chunks), workers=workers)
+    assert list(parallel.columns) == list(serial.columns)
+    for name in serial.columns:
+        assert column_values(parallel, name) == column_values(serial, name)
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_flattened_json_is_the_original_output(tmp_path, workers):
+    """For warnings under 24 h, where the original .seconds arithmetic was right, only DURATION_MIN is new"""
+    rfws = reduced_rfws(200, seed=1, max_hours=24)
+    (tmp_path / 'reduced.json').write_text(json.dumps(rfws))
+    count = flatten_rfws(str(tmp_path / 'reduced.json'), str(tmp_path / 'flat.json'), workers, 37, as_json=True)
+
+    expected = baseline.flatten(rfws)
+    for record in expected:
+        record['DURATION_MIN'] = int(stamps_to_minutes(int(record['EXPIRED'])) -
+                                     stamps_to_minutes(int(record['ISSUED'])))
+    assert count == len(expected) and {record['RFW_DAYS'] for record in expected} == {'1 day', '2 days'}
+    assert (tmp_path / 'flat.json').read_text() == json.dumps(expected, indent=4, sort_keys=True, default=str)
@@ -0,0 +1,56 @@
+import contextlib
+import io
+import json
+from collections import Counter
+
+import pytest
+
+from conftest import fire_records, rfw_records
+
+
+def baseline_cause(stat_cause):
+    """The cause the original plot scripts gave a fire, None for the codes they left out"""
+    if stat_cause in range(2, 13):
+        return 'Human'
+    if stat_cause == 1:
+        return 'Lightning'
+    if stat_cause == 13:
+        return 'Missing'
+    return None
+
+
+@pytest.fixture
+def unlisted_cause_dataset(tmp_path):
+    """The shared dataset plus fires with STAT_CAUSE codes outside 1 - 13"""
+    fires = fire_records()
+    fires += [dict(fires[0], ID=len(fires), STAT_CAUSE=14), dict(fires[3], ID=len(fires) + 1, STAT_CAUSE=0)]
+    paths = str(tmp_path / 'RFWs.json'), str(tmp_path / 'Fires.json')
+    for path, records in zip(paths, (rfw_records(), fires)):
+        with open(path, 'w') as f:
+            json.dump(records, f)
+    return paths, fires
+
+
+def test_unlisted_causes_are_left_out_of_the_cause_bars(unlisted_cause_dataset):
+    from FIRES_visuals import fires_by_cause_data, fires_mega_plot_data
+
+    (rfws_path, fires_path), fires = unlisted_cause_dataset
+    causes = Counter(baseline_cause(fire['STAT_CAUSE']) for fire in fires)
+    del causes[None]
+    assert fires_by_cause_data(fires_path) == {'cause_count': dict(causes)}
+
+    counts = fires_mega_plot_data(fires_path)['fire_counts']
+    assert counts['cause'] == dict(causes)
+    # Every fire still counts by year, month and forest cover
+    assert sum(counts['year'].values()) == sum(counts['month'].values()) == len(fires)
+
+
+def test_unlisted_causes_are_left_out_of_the_summaries(unlisted_cause_dataset):
+    from render_figures import figure_specs
+
+    (rfws_path, fires_path), fires = unlisted_cause_dataset
+    with contextlib.redirect_stdout(io.StringIO()):
+        specs = figure_specs(fires_path, rfws_path, ('zone',))
+    year_panel, _, cause_panel, _ = specs['zone/BBZ001.png']['data']['panels']
+    assert dict(zip(cause_panel['series'][0]['x'], cause_panel['series'][0]['y'])) == {'Lightning': 1, 'Human': 1}
+    assert sum(year_panel['series'][0]['y']) == 3
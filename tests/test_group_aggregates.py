@@ -0,0 +1,102 @@
+import contextlib
+import io
+from collections import Counter
+
+import numpy as np
+import pytest
+
+import baseline
+from conftest import random_records, write_records
+from test_fires_visuals import baseline_cause
+
+RECORDS = random_records()
+
+
+@pytest.fixture(scope='module')
+def paths(tmp_path_factory):
+    tmp_path = tmp_path_factory.mktemp('aggregates')
+    return write_records((str(tmp_path / 'RFWs.json'), str(tmp_path / 'Fires.json')), RECORDS)
+
+
+def original_counts(fires):
+    """The year, month, cause and forest cover Counters of the original fires_by_month"""
+    causes = Counter(baseline_cause(fire['STAT_CAUSE']) for fire in fires)
+    del causes[None]
+    return {'year': Counter(str(fire['DISC_DATE'])[:4] for fire in fires),
+            'month': Counter(str(fire['DISC_DATE'])[4:6] for fire in fires),
+            'cause': causes,
+            'forest': Counter('Forested' if fire['FORESTED'] == 'yes' else 'Non-Forested' for fire in fires)}
+
+
+def test_mega_plot_counts_match_the_original_counters(paths):
+    from FIRES_visuals import fires_mega_plot_data
+    from visual_data import LARGE_PERC
+
+    fires = RECORDS[1]
+    data = fires_mega_plot_data(paths[1])
+    assert data['fire_counts'] == original_counts(fires)
+    assert data['large_fire_counts'] == original_counts(baseline.large_fires(fires, LARGE_PERC))
+
+
+def test_office_zone_and_forest_counts_match_the_original_counters(paths):
+    from FIRES_visuals import cause_shares, fires_by_forest_data, fires_by_wfo_data, fires_by_zone_data
+
+    fires = RECORDS[1]
+    assert fires_by_wfo_data(paths[1])['office_count'] == Counter(fire['WFO'] for fire in fires)
+    assert fires_by_zone_data(paths[1])['zone_count'] == Counter(fire['UGC_ZONE'] for fire in fires)
+    assert fires_by_forest_data(paths[1])['forest_count'] == \
+        Counter(fire['WFO'] for fire in fires if fire['FORESTED'] == 'yes')
+
+    human = [fire['SIZE_AC'] for fire in fires if fire['STAT_CAUSE'] in range(2, 13)]
+    ltng = [fire['SIZE_AC'] for fire in fires if fire['STAT_CAUSE'] == 1]
+    with contextlib.redirect_stdout(io.StringIO()):
+        shares = cause_shares(paths[1])
+    assert shares == pytest.approx((len(human) / (len(human) + len(ltng)), sum(human) / (sum(human) + sum(ltng)),
+                                    len(ltng) / (len(human) + len(ltng)), sum(ltng) / (sum(human) + sum(ltng))))
+
+
+def test_office_sizes_match_the_original_loops(paths):
+    from visual_data import fire_aggregate
+
+    fires = RECORDS[1]
+    sizes = fire_aggregate('wfo', percentiles=(90,), path=paths[1])
+    high_erc = fire_aggregate('wfo', 'erc85', path=paths[1])
+    for wfo in {fire['WFO'] for fire in fires}:
+        avg_sizes = [fire['SIZE_AC'] for fire in fires if fire['WFO'] == wfo]
+        erc_sizes = [fire['SIZE_AC'] for fire in fires if fire['WFO'] == wfo and fire['ERC_PERC'] >= 85]
+        assert sizes.to_dict('mean')[wfo] == pytest.approx(sum(avg_sizes) / len(avg_sizes))
+        assert sizes.to_dict(90)[wfo] == pytest.approx(np.percentile(avg_sizes, 90))
+        assert high_erc.to_dict('mean')[wfo] == pytest.approx(sum(erc_sizes) / len(erc_sizes))
+
+
+def test_rfw_counts_match_the_original_counters(paths):
+    from visual_data import rfw_aggregate
+
+    rfws = RECORDS[0]
+    assert rfw_aggregate('year', path=paths[0]).to_dict() == Counter(rfw['ISSUED'][:4] for rfw in rfws)
+    assert rfw_aggregate('month', path=paths[0]).to_dict() == Counter(rfw['ISSUED'][4:6] for rfw in rfws)
+    assert rfw_aggregate('wfo', path=paths[0]).to_dict() == Counter(rfw['WFO'] for rfw in rfws)
+    assert rfw_aggregate('zone', path=paths[0]).to_dict() == Counter(rfw['NWS_UGC'] for rfw in rfws)
+
+
+def test_marginals_and_saved_aggregates(paths, tmp_path):
+    from columnar_store import FIRE_SCHEMA, table_from_records
+    from group_aggregates import GroupAggregate, aggregate
+
+    fires = RECORDS[1]
+    full = aggregate(table_from_records(fires, FIRE_SCHEMA), ('wfo', 'zone', 'month'), percentiles=(50, 90))
+    for key in ('wfo', 'zone', 'month'):
+        assert full.marginal(key).to_dict() == aggregate(table_from_records(fires, FIRE_SCHEMA), key).to_dict()
+    pairs = Counter((fire['UGC_ZONE'], fire['WFO']) for fire in fires)
+    assert full.marginal('zone', 'wfo').to_dict() == pairs
+
+    august = full.select(month='08')
+    for (wfo, zone), perc in august.to_dict(50).items():
+        sizes = [fire['SIZE_AC'] for fire in fires
+                 if (fire['WFO'], fire['UGC_ZONE'], str(fire['DISC_DATE'])[4:6]) == (wfo, zone, '08')]
+        assert perc == pytest.approx(np.percentile(sizes, 50))
+
+    full.save(str(tmp_path / 'aggregate.npz'))
+    loaded = GroupAggregate.load(str(tmp_path / 'aggregate.npz'))
+    assert loaded.by == full.by and loaded.to_dict(90) == full.to_dict(90)
+    assert loaded.to_dict('sum') == full.to_dict('sum')
@@ -0,0 +1,86 @@
+import contextlib
+import io
+from datetime import datetime, timedelta
+
+import pytest
+
+import baseline
+from conftest import random_records, write_records
+
+RECORDS = random_records()
+
+
+def coarse(stamp):
+    """The YYYYMMDDHHMM stamp moved back to 00, 06, 12 or 18 o'clock"""
+    return '%s%02i00' % (stamp[:8], int(stamp[8:10]) // 6 * 6)
+
+
+def day_before(rfw):
+    return int((datetime.strptime(rfw['FLAT_DATE'], '%Y%m%d') - timedelta(days=1)).strftime('%Y%m%d'))
+
+
+# The random records on a six-hour clock, plus untimed fires the day before some warnings, so fires fall exactly on
+# issuance, on expiry and next to midnight
+COARSE_RECORDS = ([dict(rfw, ISSUED=coarse(rfw['ISSUED']), EXPIRED=coarse(rfw['EXPIRED'])) for rfw in RECORDS[0]],
+                  [dict(fire, DISC_DATE=coarse(fire['DISC_DATE'])) if isinstance(fire['DISC_DATE'], str) else fire
+                   for fire in RECORDS[1]] +
+                  [dict(RECORDS[1][0], ID=len(RECORDS[1]) + i, WFO=rfw['WFO'], UGC_ZONE=rfw['NWS_UGC'],
+                        DISC_DATE=day_before(rfw)) for i, rfw in enumerate(RECORDS[0][::5])])
+
+
+@pytest.fixture(scope='module')
+def coarse_verify(tmp_path_factory):
+    from verification_funcs import VerifySkill
+
+    out_dir = tmp_path_factory.mktemp('coarse')
+    paths = write_records((str(out_dir / 'RFWs.json'), str(out_dir / 'Fires.json')), COARSE_RECORDS)
+    with contextlib.redirect_stdout(io.StringIO()):
+        return VerifySkill(*paths, score_cache=False, use_cache=False)
+
+
+def hourly_counts(rfws, fires, before, after, untimed):
+    """(N_WARNINGS, N_FIRES, HITS, MISSES, FALSE_ALARMS) of every warning against every fire, one pair at a time"""
+    def stamp(text):
+        return datetime.strptime(text, '%Y%m%d%H%M')
+
+    warnings = {(rfw['NWS_UGC'], rfw['ISSUED'], rfw['EXPIRED']) for rfw in rfws}
+    warnings = [(zone, stamp(issued) - before, max(stamp(expired), stamp(issued)) + after)
+                for zone, issued, expired in warnings]
+    # Timed fires are one instant, untimed ones their whole discovery day
+    events = set()
+    for fire in fires:
+        if isinstance(fire['DISC_DATE'], str):
+            events.add((fire['UGC_ZONE'], stamp(fire['DISC_DATE']), None))
+        elif untimed == 'day':
+            day = datetime.strptime(str(fire['DISC_DATE']), '%Y%m%d')
+            events.add((fire['UGC_ZONE'], day, day + timedelta(days=1)))
+
+    def inside(event, warning):
+        (fire_zone, start, end), (zone, low, high) = event, warning
+        if fire_zone != zone:
+            return False
+        return low <= start < high if end is None else start < high and end > low
+
+    hits = sum(any(inside(event, warning) for event in events) for warning in warnings)
+    caught = sum(any(inside(event, warning) for warning in warnings) for event in events)
+    return len(warnings), len(events), hits, len(events) - caught, len(warnings) - hits
+
+
+@pytest.mark.parametrize('untimed', ['day', 'drop'])
+@pytest.mark.parametrize('before_hours, after_hours', [(0, 0), (0, 6), (3, 0), (12, 24), (0.5, 1.5)])
+@pytest.mark.parametrize('clock', ['random', 'coarse'])
+def test_hourly_counts_match_the_intervals(request, clock, untimed, before_hours, after_hours):
+    verify = request.getfixturevalue(clock + '_verify')
+    rfws, fires = RECORDS if clock == 'random' else COARSE_RECORDS
+    for kwargs in ({'wfo': 'AAA'}, {'zone': ['BBZ001', 'CCZ002'], 'cause': 'lightning'}):
+        with contextlib.redirect_stdout(io.StringIO()):
+            query = verify.query_params(20060101, 20151231, **kwargs)
+            scores = query.hourly_skill_scores(before_hours, after_hours, untimed)
+        selected = baseline.select(rfws, fires, 20060101, 20151231, **kwargs)
+        expected = hourly_counts(*selected, timedelta(hours=before_hours), timedelta(hours=after_hours), untimed)
+        assert tuple(scores[name] for name in ('N_WARNINGS', 'N_FIRES', 'HITS', 'MISSES', 'FALSE_ALARMS')) == \
+            expected
+        assert scores['N_UNTIMED_FIRES'] == (0 if untimed == 'drop' else
+                                             len({(fire['UGC_ZONE'], fire['DISC_DATE']) for fire in selected[1]
+                                                  if not isinstance(fire['DISC_DATE'], str)}))
+        assert expected[2] and expected[3] and expected[4]
@@ -0,0 +1,82 @@
+import contextlib
+import io
+
+import numpy as np
+import pytest
+
+import baseline
+from conftest import random_queries, random_records, write_records
+
+
+def random_sizes(seed, n=400, n_zones=12):
+    """Zone codes and sizes, with repeated sizes and zones 0 and n_zones - 1 left without fires"""
+    rng = np.random.default_rng(seed)
+    return rng.integers(1, n_zones - 1, n), np.round(rng.lognormal(1, 2, n), 0), n_zones
+
+
+def percentiles(zone_codes, sizes, n_zones, perc):
+    return [np.percentile(sizes[zone_codes == zone], perc) if (zone_codes == zone).any() else np.nan
+            for zone in range(n_zones)]
+
+
+@pytest.mark.parametrize('perc', [0, 10, 33.3, 50, 75, 90, 99.9, 100])
+def test_thresholds_match_np_percentile(perc):
+    from percentile_index import ZoneSizeIndex
+
+    zone_codes, sizes, n_zones = random_sizes(0)
+    index = ZoneSizeIndex.build(zone_codes, sizes, n_zones)
+    expected = percentiles(zone_codes, sizes, n_zones, perc)
+    assert np.array_equal(index.thresholds(perc), expected, equal_nan=True)
+    assert np.array_equal([index.threshold(zone, perc) for zone in range(n_zones)], expected, equal_nan=True)
+    assert np.array_equal(index.large_mask(zone_codes, sizes, perc), sizes >= np.array(expected)[zone_codes])
+
+
+def test_updated_and_saved_indexes(tmp_path):
+    from percentile_index import ZoneSizeIndex
+
+    zone_codes, sizes, n_zones = random_sizes(1)
+    index = ZoneSizeIndex.build(zone_codes, sizes, n_zones)
+    removed = np.random.default_rng(1).random(len(sizes)) < 0.2
+    added_zones, added_sizes, _ = random_sizes(2, n=50)
+    updated = index.updated(zone_codes[removed], sizes[removed], added_zones, added_sizes)
+    rebuilt = ZoneSizeIndex.build(np.concatenate([zone_codes[~removed], added_zones]),
+                                  np.concatenate([sizes[~removed], added_sizes]), n_zones)
+    assert np.array_equal(updated.offsets, rebuilt.offsets)
+    assert np.array_equal(updated.sorted_sizes, rebuilt.sorted_sizes)
+
+    recoded = index.recode(np.arange(n_zones) * 2, 2 * n_zones)
+    assert np.array_equal(recoded.thresholds(90)[::2], index.thresholds(90), equal_nan=True)
+    assert np.isnan(recoded.thresholds(90)[1::2]).all()
+
+    index.save(str(tmp_path / 'SIZE_INDEX.npz'))
+    loaded = ZoneSizeIndex.load(str(tmp_path / 'SIZE_INDEX.npz'))
+    assert np.array_equal(loaded.thresholds(75), index.thresholds(75), equal_nan=True)
+
+
+@pytest.mark.parametrize('perc', [50, 90])
+def test_large_fires_match_the_original_loop(perc):
+    import LARGE_FIRES_visuals
+    from columnar_store import FIRE_SCHEMA, table_from_records
+
+    fires = random_records()[1]
+    table = table_from_records(fires, FIRE_SCHEMA)
+    with contextlib.redirect_stdout(io.StringIO()):
+        large = LARGE_FIRES_visuals.large_fires_counter(table, LARGE_FIRES_visuals.large_fires_sizer(table, perc))
+    assert [fire['ID'] for fire in large] == [fire['ID'] for fire in baseline.large_fires(fires, perc)]
+
+
+def test_zones_shared_between_offices(tmp_path):
+    """Zones reported to several WFOs get their percentiles over the queried WFOs' fires only, as before"""
+    from verification_funcs import VerifySkill
+
+    rfws, fires = random_records()
+    for fire in fires[::3]:
+        fire['WFO'] = {'AAA': 'BBB', 'BBB': 'CCC', 'CCC': 'AAA', 'DDD': 'AAA'}[fire['WFO']]
+    paths = write_records((str(tmp_path / 'RFWs.json'), str(tmp_path / 'Fires.json')), (rfws, fires))
+    with contextlib.redirect_stdout(io.StringIO()):
+        verify = VerifySkill(*paths, score_cache=False)
+        for start, end, kwargs in random_queries(seed=3, n=30):
+            kwargs = dict(kwargs, wfo=kwargs.get('wfo', ['AAA', 'CCC']), perc_size=kwargs.get('perc_size', 90))
+            scores = verify.query_params(start, end, **kwargs).forecast_skill_scores()
+            assert (scores['HITS'], scores['MISSES'], scores['FALSE_ALARMS']) == \
+                baseline.forecast_counts(rfws, fires, start, end, **kwargs)
@@ -0,0 +1,67 @@
+import json
+import math
+
+import pytest
+
+from redflag_verify import main
+
+JOBS = [
+    {'name': 'all', 'start_date': 20060101, 'end_date': 20151231},
+    {'name': 'no_fires', 'start_date': 20000101, 'end_date': 20001231},
+    {'name': 'no_warnings', 'start_date': 20060101, 'end_date': 20151231, 'zone': 'BBZ001'},
+    {'name': 'warnings_only', 'start_date': 20110810, 'end_date': 20110831, 'zone': 'AAZ002'},
+    {'name': 'bad_index', 'start_date': 20060101, 'end_date': 20151231, 'nfdrs_param': ['XYZ', '>=', 50]},
+]
+
+
+def strict_constant(name):
+    raise ValueError('%s is not JSON' % name)
+
+
+@pytest.fixture
+def run(dataset, tmp_path):
+    jobs = tmp_path / 'jobs.json'
+    jobs.write_text(json.dumps(JOBS))
+
+    def run(*command):
+        output = tmp_path / 'out.json'
+        main(['--rfw', dataset[0], '--fires', dataset[1], command[0], str(jobs), '-o', str(output)] +
+             list(command[1:]))
+        # Strict JSON: NaN and Infinity tokens are an error
+        return json.loads(output.read_text(), parse_constant=strict_constant)
+    return run
+
+
+@pytest.mark.parametrize('command', [('run',), ('run', '--bootstrap', '20'), ('climo', '--seed', '1'),
+                                     ('durations',), ('windows', '--max-width', '2'),
+                                     ('bench', '--repeat', '2', '--n-replicates', '10')])
+def test_batch_with_empty_and_failing_specs(run, command):
+    # bench starts with the dataset load time, under no name
+    rows = [row for row in run(*command) if row['name'] != '']
+    by_name = {}
+    for row in rows:
+        by_name.setdefault(row['name'], []).append(row)
+    assert list(by_name) == [job['name'] for job in JOBS]
+
+    assert all(row.get('ERROR') is None for row in by_name['all'])
+    assert 'XYZ' in by_name['bad_index'][0]['ERROR']
+    if command[0] == 'bench':
+        for name in ('all', 'no_fires', 'no_warnings'):
+            assert [row['stage'] for row in by_name[name]] == ['query_params', 'forecast', 'climo']
+            assert all(row.get('ERROR') is None and row['BEST_S'] <= row['MEDIAN_S'] for row in by_name[name])
+        return
+    for row in by_name['no_fires']:
+        assert row.get('ERROR') is None
+        assert (row['HITS'], row['MISSES'], row['FALSE_ALARMS']) == (0, 0, 0)
+        # jsonable writes NaN scores as null
+        assert row['POD'] is None and row['CSI'] is None
+    if command[0] in ('run', 'climo'):
+        assert by_name['all'][0]['POD'] == pytest.approx(0.4)
+        assert by_name['no_warnings'][0]['POD'] == 0 and by_name['no_warnings'][0]['FAR'] is None
+        assert by_name['warnings_only'][0]['FALSE_ALARMS'] == 1 and by_name['warnings_only'][0]['BIAS'] is None
+
+
+def test_empty_spec_scores_nan(verify):
+    from redflag_verify import score_jobs
+    rows = score_jobs(verify, JOBS[1:2], True, 10, 1, 1)
+    assert math.isnan(rows[0]['POD']) and math.isnan(rows[0]['CLIMO_POD']) and math.isnan(rows[0]['POD_SS'])
@@ -0,0 +1,65 @@
+import contextlib
+import importlib
+import inspect
+import io
+import json
+import os
+
+import pytest
+
+
+def specs(dataset, sets=('global',)):
+    from render_figures import figure_specs
+    rfws_path, fires_path = dataset
+    with contextlib.redirect_stdout(io.StringIO()):
+        return figure_specs(fires_path, rfws_path, sets)
+
+
+def test_global_figures_are_the_plot_script_figures(dataset):
+    import FIRES_visuals
+    import RFWs_visuals
+
+    global_specs = specs(dataset)
+    assert set(global_specs) == set(FIRES_visuals.FIGURES) | set(RFWs_visuals.FIGURES)
+    assert 'rfws_by_duration.png' in global_specs
+    for name, spec in global_specs.items():
+        module, draw = spec['draw'].rsplit('.', 1)
+        draw = getattr(importlib.import_module(module), draw)
+        inspect.signature(draw).bind(**spec['data'])
+
+
+def test_duration_figure_data(dataset):
+    data = specs(dataset)['rfws_by_duration.png']['data']
+    assert data == {'length_count': {'0-3': 0, '3-6': 0, '6-12': 1, '12-18': 3, '18-24': 0, '>24': 0}}
+
+
+def test_unchanged_figures_are_skipped(dataset, tmp_path):
+    from render_figures import content_hash, render_figures
+
+    all_specs = specs(dataset, ('global', 'wfo', 'zone'))
+    out_dir = tmp_path / 'graphics'
+    manifest = {}
+    for name, spec in all_specs.items():
+        os.makedirs(os.path.dirname(out_dir / name), exist_ok=True)
+        (out_dir / name).write_bytes(b'')
+        manifest[name] = content_hash(spec, 150)
+    (out_dir / '.render_manifest.json').write_text(json.dumps(manifest))
+
+    assert render_figures(str(out_dir), all_specs, workers=1, dpi=150) == (0, len(all_specs))
+
+
+@pytest.mark.parametrize('name', ['fires_mega_plot.png', 'rfws_by_duration.png', 'zone/BBZ001.png'])
+def test_render(dataset, tmp_path, name):
+    pytest.importorskip('matplotlib')
+    from render_figures import render_figures
+
+    assert render_figures(str(tmp_path), {name: specs(dataset, ('global', 'zone'))[name]}, workers=1, dpi=50) == (1, 0)
+    assert os.path.getsize(tmp_path / name) > 0
+
+
+def test_style_is_available():
+    pytest.importorskip('matplotlib')
+    import visual_data
+
+    plt = visual_data.pyplot()
+    assert visual_data.STYLE in plt.style.available or visual_data.OLD_STYLE in plt.style.available
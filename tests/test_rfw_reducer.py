@@ -0,0 +1,49 @@
+import contextlib
+import io
+import json
+
+import numpy as np
+import pytest
+
+import baseline
+
+
+def feature_collection(n, seed=0):
+    """A raw archive of n features over a few offices and products, with other top-level keys around the features"""
+    rng = np.random.default_rng(seed)
+    features = []
+    for i in range(n):
+        attributes = {'WFO': str(rng.choice(['SEW', 'PDT', 'BOI', 'ABQ', 'LOX'])),
+                      'PHENOM': str(rng.choice(['FW', 'FW', 'HW'])), 'SIG': str(rng.choice(['W', 'W', 'A'])),
+                      'ISSUED': '2010%08i' % rng.integers(1e7), 'EXPIRED': '2010%08i' % rng.integers(1e7),
+                      'INIT_ISS': '2010%08i' % rng.integers(1e7), 'INIT_EXP': None, 'STATUS': 'NEW',
+                      'NWS_UGC': 'WAZ%03i' % rng.integers(1000), 'calc_state': 'WA',
+                      'OBJECTID': int(rng.integers(1e9)), 'AREA': float(rng.random() * 1e4),
+                      'NOTE': 'a "quoted" {brace} [bracket], é'}
+        features.append({'attributes': attributes, 'geometry': {'rings': rng.random((3, 2)).round(6).tolist()}})
+    return {'displayFieldName': '', 'fieldAliases': {'WFO': 'WFO'}, 'features': features,
+            'spatialReference': {'wkid': 4326, 'latestWkid': [4326]}, 'exceededTransferLimit': False}
+
+
+@pytest.mark.parametrize('chunk_size, indent', [(1, None), (7, 2), (64, None), (1 << 20, 4)])
+def test_features_stream_like_json_load(tmp_path, chunk_size, indent):
+    from rfw_reducer import iter_features
+
+    collection = feature_collection(40)
+    path = tmp_path / 'archive.json'
+    path.write_text(json.dumps(collection, indent=indent))
+    with open(path) as f:
+        assert list(iter_features(f, chunk_size)) == collection['features']
+
+
+@pytest.mark.parametrize('n', [0, 200])
+def test_reduced_file_is_the_original_dump(tmp_path, n):
+    from rfw_reducer import reduce_rfws
+
+    collection = feature_collection(n, seed=1)
+    (tmp_path / 'archive.json').write_text(json.dumps(collection))
+    with contextlib.redirect_stdout(io.StringIO()):
+        count = reduce_rfws(str(tmp_path / 'archive.json'), str(tmp_path / 'reduced.json'), progress_every=50)
+    expected = baseline.reduce_rfws(collection)
+    assert count == len(expected) and (count > 0 or n == 0)
+    assert (tmp_path / 'reduced.json').read_text() == json.dumps(expected, indent=4, sort_keys=True, default=str)
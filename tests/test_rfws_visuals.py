@@ -0,0 +1,28 @@
+import pytest
+
+from columnar_store import RFW_SCHEMA, table_from_records
+from conftest import rfw_records
+from RFWs_visuals import rfws_length_data
+from store_cache import write_table
+
+# (ISSUED, EXPIRED) -> hours: 3, 12, 24, 25 and 48
+SPANS = [('201007011200', '201007011500'), ('201007011200', '201007020000'), ('201007011200', '201007021200'),
+         ('201007011200', '201007021300'), ('201007011200', '201007031200')]
+
+
+def rfw_dir(tmp_path, with_duration):
+    records = [dict(record, ISSUED=issued, EXPIRED=expired)
+               for record, (issued, expired) in zip(rfw_records() * 2, SPANS)]
+    table = table_from_records(records, RFW_SCHEMA)
+    if not with_duration:
+        del table.columns['DURATION_MIN']
+    path = str(tmp_path / 'RFWs')
+    write_table(table, path)
+    return path
+
+
+@pytest.mark.parametrize('with_duration', [True, False])
+def test_length_buckets(tmp_path, with_duration):
+    # A warning of exactly 24 h stays in the last histogram bin, as with plt.hist
+    assert rfws_length_data(rfw_dir(tmp_path, with_duration)) == {
+        'length_count': {'0-3': 0, '3-6': 1, '6-12': 0, '12-18': 1, '18-24': 1, '>24': 2}}
@@ -0,0 +1,103 @@
+import contextlib
+import io
+import sqlite3
+
+import baseline
+from conftest import random_queries, random_records, write_records
+
+
+def quiet(fn, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*args, **kwargs)
+
+
+def test_canonical_params():
+    from score_cache import canonical_params
+
+    assert canonical_params({'wfo': 'AAA', 'zone': ['BBZ002', 'BBZ001']}) == \
+        canonical_params({'zone': ['BBZ001', 'BBZ002', 'BBZ001'], 'wfo': ['AAA']})
+    assert canonical_params({'duration': (12, None)}) == canonical_params({'duration': [12, None]})
+    assert canonical_params({'wfo': 'AAA'}) != canonical_params({'wfo': ['AAA', 'BBB']})
+    assert canonical_params({'nfdrs_param': ['ERC_PERC', '>=', 50]}) != \
+        canonical_params({'nfdrs_param': ['ERC_PERC', '>=', 60]})
+
+
+def test_cached_scores_match_uncached(random_verify, tmp_path, monkeypatch):
+    import verification_funcs
+    from score_cache import ScoreCache, jsonable
+
+    paths = write_records((str(tmp_path / 'RFWs.json'), str(tmp_path / 'Fires.json')), random_records())
+    db_path = str(tmp_path / 'scores.sqlite')
+    queries = random_queries(seed=5, n=15)
+
+    def scores(verify):
+        results = []
+        for start, end, kwargs in queries:
+            query = quiet(verify.query_params, start, end, **kwargs)
+            forecast = quiet(query.forecast_skill_scores)
+            if forecast['HITS'] + forecast['MISSES'] and forecast['HITS'] + forecast['FALSE_ALARMS']:
+                results.append((forecast, quiet(query.climo_skill_scores, forecast, n_replicates=20, seed=1)))
+            else:
+                results.append((forecast, None))
+        return results
+
+    # jsonable so NaN scores compare equal
+    expected = jsonable(scores(random_verify))
+    assert sum(climo is not None for _, climo in expected) > 5
+    cached = quiet(verification_funcs.VerifySkill, *paths, score_cache=ScoreCache(path=db_path))
+    assert jsonable(scores(cached)) == expected
+    assert jsonable(scores(cached)) == expected
+
+    # A new process's cache is filled from the SQLite file, so nothing is recomputed
+    def fail(*args, **kwargs):
+        raise AssertionError('recomputed a cached score')
+    monkeypatch.setattr(verification_funcs, 'match_keys', fail)
+    monkeypatch.setattr(verification_funcs, 'climo_contingency', fail)
+    reloaded = quiet(verification_funcs.VerifySkill, *paths, score_cache=ScoreCache(path=db_path))
+    assert jsonable(scores(reloaded)) == expected
+
+
+def test_unseeded_climatology_is_not_cached(random_dataset, tmp_path):
+    from score_cache import ScoreCache
+    from verification_funcs import VerifySkill
+
+    db_path = str(tmp_path / 'scores.sqlite')
+    verify = quiet(VerifySkill, *random_dataset, use_cache=False, score_cache=ScoreCache(path=db_path))
+    query = quiet(verify.query_params, 20060101, 20151231, wfo='AAA')
+    forecast = quiet(query.forecast_skill_scores)
+    quiet(query.climo_skill_scores, forecast, n_replicates=20)
+    quiet(query.climo_skill_scores, forecast, n_replicates=20, seed=2)
+    with sqlite3.connect(db_path) as db:
+        assert db.execute('SELECT COUNT(*) FROM scores').fetchone()[0] == 2
+
+
+def test_append_retires_only_the_zones_it_touches(tmp_path):
+    import store_append
+    from columnar_store import FIRE_SCHEMA, load_table
+    from score_cache import ScoreCache
+    from store_cache import file_fingerprint, write_table
+    from verification_funcs import VerifySkill
+
+    rfws, fires = random_records()
+    paths = write_records((str(tmp_path / 'RFWs.json'), str(tmp_path / 'Fires.json'), str(tmp_path / 'new.json')),
+                          (rfws, fires, [dict(fire, SIZE_AC=0.1) for fire in fires if fire['UGC_ZONE'] == 'AAZ001']))
+    fire_dir = str(tmp_path / 'Fires')
+    write_table(load_table(paths[1], FIRE_SCHEMA), fire_dir, file_fingerprint(paths[1]))
+    cache = ScoreCache()
+
+    def versions():
+        verify = quiet(VerifySkill, paths[0], fire_dir, score_cache=cache)
+        return {zone: quiet(verify.query_params, 20060101, 20151231, zone=zone).version
+                for zone in ('AAZ001', 'AAZ002', 'BBZ001')}, verify
+
+    before, _ = versions()
+    store_append.append_fires(fire_dir, paths[2])
+    after, verify = versions()
+    assert after['AAZ001'] != before['AAZ001']
+    assert (after['AAZ002'], after['BBZ001']) == (before['AAZ002'], before['BBZ001'])
+
+    new_fires = [dict(fire, SIZE_AC=0.1) if fire['UGC_ZONE'] == 'AAZ001' else fire for fire in fires]
+    for zone in ('AAZ001', 'AAZ002'):
+        scores = quiet(quiet(verify.query_params, 20060101, 20151231, zone=zone, perc_size=90).forecast_skill_scores)
+        assert (scores['HITS'], scores['MISSES'], scores['FALSE_ALARMS']) == \
+            baseline.forecast_counts(rfws, new_fires, 20060101, 20151231, zone=zone, perc_size=90)
@@ -0,0 +1,131 @@
+import contextlib
+import io
+import json
+import os
+
+import numpy as np
+import pytest
+
+import baseline
+import store_append
+from columnar_store import FIRE_SCHEMA, RFW_SCHEMA, Categorical, load_table, table_from_records
+from conftest import fire_records, random_queries, random_records, rfw_records, write_records
+from date_manipulator import flatten_rfws
+from store_cache import read_table, write_table
+
+
+def column_values(table, name):
+    col = table[name]
+    return col.values().tolist() if isinstance(col, Categorical) else np.asarray(col).tolist()
+
+
+@pytest.fixture
+def fire_dir(dataset, tmp_path):
+    path = str(tmp_path / 'Fires')
+    write_table(load_table(dataset[1], FIRE_SCHEMA), path)
+    return path
+
+
+@pytest.fixture
+def searched(monkeypatch):
+    """Directories whose columns an append reads"""
+    paths = []
+    read_columns = store_append.read_columns
+
+    def recording(path, meta, mmap_mode='r'):
+        paths.append(os.path.basename(path))
+        return read_columns(path, meta, mmap_mode)
+    monkeypatch.setattr(store_append, 'read_columns', recording)
+    return paths
+
+
+def append(path, records, tmp_path):
+    in_path = str(tmp_path / 'new.json')
+    with open(in_path, 'w') as f:
+        json.dump(records, f)
+    return store_append.append_fires(path, in_path)
+
+
+def test_upsert_matches_rebuild(fire_dir, tmp_path):
+    week = fire_records()[:2]
+    week[0]['SIZE_AC'] = 1000.0
+    week[1]['UGC_ZONE'] = 'BBZ001'
+    week.append(dict(fire_records()[0], ID=10, UGC_ZONE='CCZ001', WFO='CCC'))
+    assert append(fire_dir, week, tmp_path) == (3, 2)
+    assert append(fire_dir, [dict(week[2], SIZE_AC=5.0)], tmp_path) == (1, 1)
+
+    expected = {record['ID']: record for record in fire_records()}
+    expected.update((record['ID'], record) for record in week + [dict(week[2], SIZE_AC=5.0)])
+    rebuilt = table_from_records(list(expected.values()), FIRE_SCHEMA)
+    table = read_table(fire_dir)
+    order = np.argsort(np.asarray(table['ID']))
+    for name in FIRE_SCHEMA:
+        if name in rebuilt:
+            np.testing.assert_equal([column_values(table, name)[i] for i in order], column_values(rebuilt, name),
+                                    err_msg=name)
+    assert table.generations == {'AAZ001': 1, 'BBZ001': 1, 'CCZ001': 2}
+
+
+def test_reads_after_append_are_memory_mapped(fire_dir, tmp_path):
+    append(fire_dir, [dict(fire_records()[0], ID=10)], tmp_path)
+    table = read_table(fire_dir)
+    assert isinstance(table['SIZE_AC'], np.memmap)
+    assert isinstance(table['UGC_ZONE'].codes, np.memmap)
+    assert len(table) == len(fire_records()) + 1
+
+    store_append.compact(fire_dir)
+    assert isinstance(read_table(fire_dir)['SIZE_AC'], np.memmap)
+
+
+def test_append_skips_parts_outside_its_keys(fire_dir, tmp_path, searched):
+    append(fire_dir, [dict(fire_records()[0], ID=10)], tmp_path)
+    append(fire_dir, [dict(fire_records()[0], ID=11)], tmp_path)
+    assert searched == ['Fires']  # the first append computes the base's bounds once
+    searched.clear()
+
+    append(fire_dir, [dict(fire_records()[0], ID=10, SIZE_AC=3.0)], tmp_path)
+    assert searched == ['000000']
+    assert column_values(read_table(fire_dir), 'SIZE_AC')[-1] == 3.0
+
+
+def test_rfw_objectids_continue(tmp_path):
+    path = str(tmp_path / 'RFWs')
+    write_table(table_from_records(rfw_records(), RFW_SCHEMA), path)
+    later = [dict(record, ISSUED='2012' + record['ISSUED'][4:], FLAT_DATE='2012' + record['FLAT_DATE'][4:])
+             for record in rfw_records()[:2]]
+    for _ in range(2):
+        store_append.upsert(path, table_from_records(later, RFW_SCHEMA), store_append.RFW_KEY, 'NWS_UGC')
+    table = read_table(path)
+    assert len(table) == len(rfw_records()) + 2
+    assert sorted(np.asarray(table['OBJECTID']).tolist()) == list(range(len(rfw_records()))) + [6, 7]
+
+
+def test_scores_after_appends_match_the_records(tmp_path):
+    """Appended and replaced warnings and fires, a new zone among them, score like the combined records did"""
+    from verification_funcs import VerifySkill
+
+    rfws, fires = random_records()
+    new_rfws = [dict(rfw, EXPIRED=rfw['ISSUED']) for rfw in rfws[:10]] + rfws[200:]
+    new_rfws += [dict(rfw, WFO='EEE', NWS_UGC='EEZ001') for rfw in rfws[:5]]
+    new_fires = [dict(fire, SIZE_AC=fire['SIZE_AC'] * 10) for fire in fires[:20]] + fires[350:]
+    new_fires += [dict(fire, ID=1000 + fire['ID'], WFO='EEE', UGC_ZONE='EEZ001') for fire in fires[:15]]
+    paths = write_records([str(tmp_path / name) for name in ('rfws.json', 'fires.json', 'new_rfws.json',
+                                                             'new_fires.json')],
+                          (rfws[:200], fires[:350], new_rfws, new_fires))
+    rfw_dir, fire_dir = str(tmp_path / 'RFWs'), str(tmp_path / 'Fires')
+    flatten_rfws(paths[0], rfw_dir, workers=1)
+    write_table(load_table(paths[1], FIRE_SCHEMA), fire_dir)
+    with contextlib.redirect_stdout(io.StringIO()):
+        VerifySkill(rfw_dir, fire_dir, score_cache=False)  # saves the size index the fire append then updates
+        store_append.append_rfws(rfw_dir, paths[2])
+        store_append.append_fires(fire_dir, paths[3])
+        verify = VerifySkill(rfw_dir, fire_dir, score_cache=False)
+
+    all_rfws = baseline.flatten(new_rfws[:10] + rfws[10:200] + new_rfws[10:])
+    all_fires = new_fires[:20] + fires[20:350] + new_fires[20:]
+    queries = random_queries(seed=4, n=30) + [(20060101, 20151231, {'wfo': 'EEE', 'perc_size': 50})]
+    for start, end, kwargs in queries:
+        with contextlib.redirect_stdout(io.StringIO()):
+            scores = verify.query_params(start, end, **kwargs).forecast_skill_scores()
+        assert (scores['HITS'], scores['MISSES'], scores['FALSE_ALARMS']) == \
+            baseline.forecast_counts(all_rfws, all_fires, start, end, **kwargs)
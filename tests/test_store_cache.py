@@ -0,0 +1,62 @@
+import contextlib
+import io
+import json
+import os
+
+import numpy as np
+
+import baseline
+from conftest import random_queries, random_records, write_records
+
+
+def load(path, schema_name):
+    import columnar_store
+    from store_cache import load_cached_table
+    return load_cached_table(path, getattr(columnar_store, schema_name))
+
+
+def cache_stamp(path):
+    """Changes whenever the cache directory of path is rewritten"""
+    from store_cache import default_cache_dir
+    return os.stat(os.path.join(default_cache_dir(path), 'SIZE_AC.npy')).st_ino
+
+
+def test_cached_tables_match_the_json(tmp_path):
+    import columnar_store
+
+    paths = write_records((str(tmp_path / 'RFWs.json'), str(tmp_path / 'Fires.json')), random_records())
+    for path, schema_name in zip(paths, ('RFW_SCHEMA', 'FIRE_SCHEMA')):
+        expected = columnar_store.load_table(path, getattr(columnar_store, schema_name)).to_records()
+        built = load(path, schema_name)
+        cached = load(path, schema_name)
+        assert built.to_records() == expected and cached.to_records() == expected
+        assert all(isinstance(col.codes if isinstance(col, columnar_store.Categorical) else col, np.memmap)
+                   for col in cached.columns.values())
+
+
+def test_stale_cache_is_rebuilt(tmp_path):
+    fires = random_records()[1]
+    path = write_records([str(tmp_path / 'Fires.json')], [fires])[0]
+    load(path, 'FIRE_SCHEMA')
+    stamp = cache_stamp(path)
+
+    # Same content under a new mtime keeps the cache, new content rebuilds it
+    os.utime(path, ns=(1, 1))
+    assert len(load(path, 'FIRE_SCHEMA')) == len(fires) and cache_stamp(path) == stamp
+    with open(path, 'w') as f:
+        json.dump(fires[:-10], f)
+    assert len(load(path, 'FIRE_SCHEMA')) == len(fires) - 10 and cache_stamp(path) != stamp
+
+
+def test_cached_store_scores_match_the_records(tmp_path):
+    from verification_funcs import VerifySkill
+
+    rfws, fires = random_records()
+    paths = write_records((str(tmp_path / 'RFWs.json'), str(tmp_path / 'Fires.json')), (rfws, fires))
+    with contextlib.redirect_stdout(io.StringIO()):
+        VerifySkill(*paths, score_cache=False)
+        verify = VerifySkill(*paths, score_cache=False)
+        for start, end, kwargs in random_queries(seed=2, n=20):
+            scores = verify.query_params(start, end, **kwargs).forecast_skill_scores()
+            assert (scores['HITS'], scores['MISSES'], scores['FALSE_ALARMS']) == \
+                baseline.forecast_counts(rfws, fires, start, end, **kwargs)
@@ -0,0 +1,74 @@
+import contextlib
+import io
+import operator
+
+import pytest
+
+import baseline
+from conftest import random_records
+
+RECORDS = random_records()
+
+OPERATORS = {'<': operator.lt, '<=': operator.le, '==': operator.eq, '!=': operator.ne, '>=': operator.ge,
+             '>': operator.gt}
+QUERIES = [{}, {'wfo': ['AAA', 'CCC']}, {'zone': 'BBZ002', 'cause': 'human'}]
+
+
+def quiet(fn, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*args, **kwargs)
+
+
+def counts(scores):
+    return scores['HITS'], scores['MISSES'], scores['FALSE_ALARMS']
+
+
+def conditioned_days(conditions, **kwargs):
+    """The RFW and fire days of a query with every [index, operator, threshold] condition checked fire by fire"""
+    rfws, fires = baseline.select(*RECORDS, 20060101, 20151231, **kwargs)
+    fires = [fire for fire in fires
+             if all(OPERATORS[op](fire[index], threshold) for index, op, threshold in conditions)]
+    return baseline.event_days(rfws, fires)
+
+
+@pytest.mark.parametrize('fd_operator', ['<', '==', '>='])
+def test_original_operators_match_the_original_filter(random_verify, fd_operator):
+    for kwargs in QUERIES:
+        for nfdrs_param in ([index, fd_operator, threshold]
+                            for index, threshold in (('ERC_PERC', 50), ('FM100_PERC', 0), ('BI_PERC', 97))):
+            scores = quiet(quiet(random_verify.query_params, 20060101, 20151231, nfdrs_param=nfdrs_param,
+                                 **kwargs).forecast_skill_scores)
+            assert counts(scores) == \
+                baseline.forecast_counts(*RECORDS, 20060101, 20151231, nfdrs_param=nfdrs_param, **kwargs)
+
+
+@pytest.mark.parametrize('fd_operator', list(OPERATORS))
+def test_operators_match_python_comparisons(random_verify, fd_operator):
+    for kwargs in QUERIES:
+        for condition in (['ERC_PERC', fd_operator, 50], ['FM1000_PER', fd_operator, 12.5]):
+            query = quiet(random_verify.query_params, 20060101, 20151231, nfdrs_param=condition, **kwargs)
+            expected = baseline.match(*conditioned_days([condition], **kwargs))
+            assert counts(quiet(query.forecast_skill_scores)) == expected
+
+
+def test_combined_conditions_must_all_hold(random_verify):
+    conditions = [['ERC_PERC', '>=', 30], ['BI_PERC', '<', 80], ['FM100_PERC', '!=', 50]]
+    for kwargs in QUERIES:
+        query = quiet(random_verify.query_params, 20060101, 20151231, nfdrs_param=conditions, **kwargs)
+        assert counts(quiet(query.forecast_skill_scores)) == baseline.match(*conditioned_days(conditions, **kwargs))
+
+
+@pytest.mark.parametrize('fd_operator', ['>=', '>', '<=', '<'])
+def test_sweep_matches_one_query_per_threshold(random_verify, fd_operator):
+    thresholds = [-1, 0, 0.5, 10, 37, 49.5, 50, 75, 99, 100, 101]
+    for kwargs in QUERIES:
+        query = quiet(random_verify.query_params, 20060101, 20151231, **kwargs)
+        table = quiet(query.nfdrs_sweep, 'ERC_PERC', fd_operator, thresholds)
+        assert list(table['THRESHOLD']) == thresholds
+        for row, threshold in zip(table, thresholds):
+            rfw_days, fire_days = conditioned_days([['ERC_PERC', fd_operator, threshold]], **kwargs)
+            assert (row['N_RFW_DAYS'], row['N_FIRE_DAYS']) == (len(rfw_days), len(fire_days))
+            assert (row['HITS'], row['MISSES'], row['FALSE_ALARMS']) == baseline.match(rfw_days, fire_days)
+            single = quiet(random_verify.query_params, 20060101, 20151231,
+                           nfdrs_param=['ERC_PERC', fd_operator, threshold], **kwargs)
+            assert (row['HITS'], row['MISSES'], row['FALSE_ALARMS']) == counts(quiet(single.forecast_skill_scores))
@@ -0,0 +1,111 @@
+import contextlib
+import io
+
+import numpy as np
+import pytest
+
+import baseline
+from conftest import random_queries, random_records
+
+RECORDS = random_records()
+
+
+def counts(scores):
+    return scores['HITS'], scores['MISSES'], scores['FALSE_ALARMS']
+
+
+def quiet(fn, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*args, **kwargs)
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_match_keys_match_the_day_sets(seed):
+    from date_manipulator import ordinal_to_yyyymmdd, yyyymmdd_to_ordinal
+    from verification_funcs import day_zone_keys, match_keys
+
+    # Dense events over a month end, a year end and a leap day, so many fall on or next to each other
+    rng = np.random.default_rng(seed)
+    n_zones = 4
+    days = yyyymmdd_to_ordinal(20111215) + np.arange(80)
+    rfw_days = rng.choice(days, 60), rng.integers(n_zones, size=60)
+    fire_days = rng.choice(days, 60), rng.integers(n_zones, size=60)
+
+    def day_set(days, zones):
+        return {(str(day), 'Z%i' % zone) for day, zone in zip(ordinal_to_yyyymmdd(days), zones)}
+
+    assert match_keys(day_zone_keys(*rfw_days, n_zones), day_zone_keys(*fire_days, n_zones), n_zones) == \
+        baseline.match(day_set(*rfw_days), day_set(*fire_days))
+
+
+def test_query_result_is_immutable(verify):
+    query = quiet(verify.query_params, 20100101, 20111231, zone='AAZ001')
+    with pytest.raises(AttributeError):
+        query.fire_mask = None
+    for array in (query.rfw_mask, query.fire_mask, query.rfw_keys, query.fire_keys):
+        with pytest.raises(ValueError):
+            array[:] = 0
+
+
+def test_interleaved_queries_match_fresh_instances(random_verify):
+    """The original query_params emptied its instance, so every query needed a fresh VerifySkill"""
+    rfws, fires = RECORDS
+    store = random_verify.store
+    columns = {name: np.array(store.fires[name], copy=True) for name in ('SIZE_AC', 'ERC_PERC', 'DISC_DATE')}
+
+    queries = random_queries(seed=1, n=20)
+    results = [quiet(random_verify.query_params, start, end, **kwargs) for start, end, kwargs in queries]
+    for (start, end, kwargs), query in zip(queries[::-1], results[::-1]):
+        expected = baseline.forecast_counts(rfws, fires, start, end, **kwargs)
+        assert counts(quiet(query.forecast_skill_scores)) == expected
+        assert counts(quiet(query.forecast_skill_scores)) == expected
+
+    assert len(store.rfws) == len(rfws) and len(store.fires) == len(fires)
+    for name, column in columns.items():
+        assert np.array_equal(store.fires[name], column, equal_nan=True)
+
+
+def test_scores_of_the_last_query(verify):
+    quiet(verify.query_params, 20100101, 20111231, zone='AAZ002')
+    query = quiet(verify.query_params, 20060101, 20151231)
+    assert verify.query is query
+    assert counts(quiet(verify.forecast_skill_scores)) == (2, 3, 2)
+
+
+SWEEP_GRID = {
+    'wfo': [None, 'AAA', ['BBB', 'CCC']],
+    'zone': [None, 'AAZ001', ['BBZ001', 'CCZ002'], 'DDZ001'],
+    'cause': [None, 'human', 'lightning'],
+    'perc_size': [None, 75],
+    'nfdrs_param': [None, ['ERC_PERC', '>=', 50]],
+    'duration': [None, 12],
+}
+
+
+def test_sweep_matches_query_params(random_verify):
+    from verification_funcs import grid_cells
+
+    rfws, fires = RECORDS
+    table = quiet(random_verify.sweep, 20070601, 20131231, SWEEP_GRID)
+    cells = grid_cells(SWEEP_GRID)
+    assert len(table) == len(cells) == 288
+    for row, cell in zip(table, cells):
+        selected = baseline.select(rfws, fires, 20070601, 20131231, **cell)
+        rfw_days, fire_days = baseline.event_days(*selected)
+        assert (row['N_RFW_DAYS'], row['N_FIRE_DAYS']) == (len(rfw_days), len(fire_days))
+        assert (row['HITS'], row['MISSES'], row['FALSE_ALARMS']) == baseline.match(rfw_days, fire_days)
+        scores = quiet(quiet(random_verify.query_params, 20070601, 20131231, **cell).forecast_skill_scores)
+        assert [row[name] for name in ('BIAS', 'POD', 'FAR', 'CSI')] == \
+            pytest.approx([scores[name] for name in ('BIAS', 'POD', 'FAR', 'CSI')], nan_ok=True)
+
+
+def test_sweep_climatology_matches_query_params(random_verify):
+    cells = [{'wfo': 'AAA'}, {'zone': ['BBZ001', 'BBZ002'], 'perc_size': 50}]
+    table = quiet(random_verify.sweep, 20060101, 20151231, cells, climo=True, n_replicates=50, seed=4)
+    for row, cell in zip(table, cells):
+        query = quiet(random_verify.query_params, 20060101, 20151231, **cell)
+        forecast = quiet(query.forecast_skill_scores)
+        climo = quiet(query.climo_skill_scores, forecast, n_replicates=50, seed=4)
+        assert [row['CLIMO_' + name] for name in ('BIAS', 'POD', 'FAR', 'CSI')] == \
+            pytest.approx([climo[name] for name in ('BIAS', 'POD', 'FAR', 'CSI')])
+        assert row['SIG_TEST'] == climo['SIG_TEST']
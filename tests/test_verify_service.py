@@ -0,0 +1,100 @@
+import asyncio
+import json
+import math
+
+import pytest
+
+from score_cache import jsonable
+from verify_service import VerifyService, parse_params
+
+
+@pytest.fixture
+def service(dataset):
+    service = VerifyService(*dataset, workers=1)
+    yield service
+    service.close()
+
+
+def request(service, method, target, body=None):
+    return asyncio.run(service.respond(method, target, json.dumps(body).encode() if body is not None else b''))
+
+
+def test_parse_params_query_string_takes_last_value():
+    params, n_replicates, seed = parse_params({'start_date': ['20100101'], 'end_date': ['20101231'],
+                                               'seed': ['1', '2'], 'wfo': ['AAA,BBB']}, query_string=True)
+    assert params == {'start_date': 20100101, 'end_date': 20101231, 'wfo': ['AAA', 'BBB']}
+    assert (n_replicates, seed) == (100, 2)
+
+
+@pytest.mark.parametrize('fields, query_string, duration', [
+    ({'duration': ['12']}, True, 12),
+    ({'duration': ['6,12']}, True, [6.0, 12.0]),
+    ({'duration': ['24,']}, True, [24.0, None]),
+    ({'duration': 12}, False, 12),
+    ({'duration': [6, 12]}, False, [6.0, 12.0]),
+    ({'duration': [24, None]}, False, [24.0, None]),
+    ({'duration': '6,12'}, False, [6.0, 12.0]),
+])
+def test_parse_params_duration(fields, query_string, duration):
+    fields = dict(fields, start_date=20100101, end_date=20101231)
+    assert parse_params(fields, query_string)[0]['duration'] == duration
+
+
+@pytest.mark.parametrize('target, body', [
+    ('/forecast?start_date=20060101&end_date=20151231&duration=12,18', None),
+    ('/forecast', {'start_date': 20060101, 'end_date': 20151231, 'duration': [12, 18]}),
+])
+def test_duration_pair(service, verify, target, body):
+    # Three of the four warnings last 13 or 16 hours, the other 8
+    status, payload = request(service, 'POST' if body else 'GET', target, body)
+    assert status == 200
+    assert payload['params']['duration'] == [12.0, 18.0]
+    expected = verify.query_params(20060101, 20151231, duration=(12, 18)).forecast_skill_scores()
+    assert [payload['forecast'][name] for name in ('HITS', 'MISSES', 'FALSE_ALARMS')] == \
+        [expected[name] for name in ('HITS', 'MISSES', 'FALSE_ALARMS')] == [1, 4, 2]
+
+
+@pytest.mark.parametrize('body', [
+    {'start_date': 20100101, 'end_date': 20101231, 'perc_size': [90, 95]},
+    {'start_date': 20100101, 'end_date': 20101231, 'duration': [6, 12, 18]},
+    {'start_date': 20100101, 'end_date': 20101231, 'duration': 'long'},
+    {'start_date': 20100101, 'end_date': [20101231, 20111231]},
+    {'start_date': None, 'end_date': 20101231},
+    {'start_date': 20100101, 'end_date': 20101231, 'seed': {'value': 1}},
+    {'start_date': 20100101, 'end_date': 20101231, 'nfdrs_param': 90},
+    {'start_date': 20100101},
+])
+def test_malformed_arguments_are_bad_requests(service, body):
+    status, payload = request(service, 'POST', '/forecast', body)
+    assert status == 400
+    assert payload['error']
+
+
+def test_empty_window_scores_nan(service):
+    status, payload = request(service, 'GET', '/skill?start_date=20000101&end_date=20001231&seed=1&n_replicates=10')
+    assert status == 200
+    forecast = payload['forecast']
+    assert (forecast['HITS'], forecast['MISSES'], forecast['FALSE_ALARMS']) == (0, 0, 0)
+    assert all(math.isnan(forecast[name]) for name in ('BIAS', 'POD', 'FAR', 'CSI'))
+    assert math.isnan(payload['climo']['POD'])
+    assert all(math.isnan(value) for value in payload['skill'].values())
+
+
+def test_zone_without_warnings(service):
+    status, payload = request(service, 'POST', '/forecast',
+                              {'start_date': 20060101, 'end_date': 20151231, 'zone': 'BBZ001'})
+    assert status == 200
+    assert (payload['forecast']['HITS'], payload['forecast']['MISSES']) == (0, 2)
+    assert payload['forecast']['POD'] == 0
+    assert math.isnan(payload['forecast']['FAR'])
+
+
+def test_zone_without_fires_is_strict_json(service):
+    # AAZ002 has a warning on 2011-08-20 and no fire in the window, so BIAS is infinite
+    status, payload = request(service, 'GET', '/skill?start_date=20110810&end_date=20110831&zone=AAZ002&seed=1'
+                                               '&n_replicates=10')
+    assert status == 200
+    assert (payload['forecast']['HITS'], payload['forecast']['FALSE_ALARMS']) == (0, 1)
+    assert payload['forecast']['BIAS'] == math.inf
+    body = json.loads(json.dumps(jsonable(payload), allow_nan=False))
+    assert body['forecast']['BIAS'] is None
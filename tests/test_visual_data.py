@@ -0,0 +1,37 @@
+import json
+import os
+import subprocess
+import sys
+
+import baseline
+from conftest import ROOT, random_records, write_records
+
+
+def run(code, cwd):
+    """Runs code in a fresh interpreter in cwd, with the repo folders on its path, and returns what it printed"""
+    path = os.pathsep.join(os.path.join(ROOT, folder) for folder in ('visualization', 'analysis', 'utilities'))
+    result = subprocess.run([sys.executable, '-c', code], cwd=str(cwd), env=dict(os.environ, PYTHONPATH=path),
+                            capture_output=True, text=True, check=True)
+    return result.stdout
+
+
+def test_imports_load_no_data_or_plotting(tmp_path):
+    # tmp_path has no data/ folder, so reading the datasets on import would fail
+    loaded = run('import sys\n'
+                 'import FIRES_visuals, LARGE_FIRES_visuals, RFWs_visuals, render_figures\n'
+                 'print(sorted(name for name in ("numpy", "matplotlib") if name in sys.modules))', tmp_path)
+    assert loaded.strip() == '[]'
+    assert not os.path.exists(tmp_path / 'data')
+
+
+def test_module_globals_load_on_first_access(tmp_path):
+    rfws, fires = random_records()
+    os.makedirs(tmp_path / 'data')
+    write_records((str(tmp_path / 'data' / 'RFWs_Northwest.json'), str(tmp_path / 'data' / 'Fires_Northwest.json')),
+                  (rfws, fires))
+    output = run('import json, FIRES_visuals, LARGE_FIRES_visuals, RFWs_visuals\n'
+                 'print(json.dumps([[fire["ID"] for fire in LARGE_FIRES_visuals.large_fires],\n'
+                 '                  len(FIRES_visuals.fires), len(RFWs_visuals.rfws)]))', tmp_path)
+    large_ids, n_fires, n_rfws = json.loads(output.splitlines()[-1])
+    assert large_ids == [fire['ID'] for fire in baseline.large_fires(fires, 90)]
+    assert (n_fires, n_rfws) == (len(fires), len(rfws))
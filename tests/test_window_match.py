@@ -0,0 +1,81 @@
+import contextlib
+import io
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+import baseline
+from conftest import random_records
+
+RECORDS = random_records()
+
+WINDOWS = [(0, 0), (0, 1), (1, 0), (1, 1), (0, 3), (2, 5), (7, 7), (15, 0)]
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_windows_match_the_shifted_day_sets(seed):
+    from date_manipulator import ordinal_to_yyyymmdd, yyyymmdd_to_ordinal
+    from verification_funcs import day_zone_keys
+    from window_match import WindowMatcher
+
+    # Sparse and dense events over a year end and a leap day, in zones some of which have no fires
+    rng = np.random.default_rng(seed)
+    n_zones = 5
+    days = yyyymmdd_to_ordinal(20111201) + np.arange(120)
+    rfw_days = np.unique(day_zone_keys(rng.choice(days, 40), rng.integers(n_zones, size=40), n_zones))
+    fire_days = np.unique(day_zone_keys(rng.choice(days, 25), rng.integers(n_zones - 1, size=25), n_zones))
+
+    def day_set(keys):
+        return {(str(day), zone) for day, zone in zip(ordinal_to_yyyymmdd(keys // n_zones), keys % n_zones)}
+
+    matcher = WindowMatcher(rfw_days, fire_days, n_zones)
+    for before, after in WINDOWS:
+        assert tuple(int(count) for count in matcher.contingency(before, after)) == \
+            baseline.window_match(day_set(rfw_days), day_set(fire_days), before, after)
+    assert baseline.window_match(day_set(rfw_days), day_set(fire_days), 0, 1) == \
+        baseline.match(day_set(rfw_days), day_set(fire_days))
+
+
+def test_window_scores_match_the_shifted_day_sets(random_verify):
+    rfws, fires = RECORDS
+    kwargs = {'wfo': ['AAA', 'BBB'], 'duration': 18}
+    with contextlib.redirect_stdout(io.StringIO()):
+        query = random_verify.query_params(20070101, 20141231, **kwargs)
+        table = query.window_scores(WINDOWS)
+        forecast = query.forecast_skill_scores()
+    rfw_days, fire_days = baseline.event_days(*baseline.select(rfws, fires, 20070101, 20141231, **kwargs))
+    for row, (before, after) in zip(table, WINDOWS):
+        assert (row['WINDOW_BEFORE'], row['WINDOW_AFTER'], row['N_RFW_DAYS'], row['N_FIRE_DAYS']) == \
+            (before, after, len(rfw_days), len(fire_days))
+        assert (row['HITS'], row['MISSES'], row['FALSE_ALARMS']) == \
+            baseline.window_match(rfw_days, fire_days, before, after)
+    row = table[WINDOWS.index((0, 1))]
+    assert (row['HITS'], row['MISSES'], row['FALSE_ALARMS']) == \
+        (forecast['HITS'], forecast['MISSES'], forecast['FALSE_ALARMS'])
+
+
+@pytest.mark.parametrize('reference', ['INIT_ISS', 'ISSUED'])
+def test_lead_buckets_match_the_issue_dates(random_verify, reference):
+    rfws, fires = RECORDS
+    buckets = [0, 1, (1, None), (0, 2)]
+    with contextlib.redirect_stdout(io.StringIO()):
+        query = random_verify.query_params(20060101, 20151231, wfo='CCC')
+        table = query.window_scores([(0, 1), (1, 2)], lead_buckets=buckets, lead_reference=reference)
+    rfws, fires = baseline.select(rfws, fires, 20060101, 20151231, wfo='CCC')
+    fire_days = baseline.event_days(rfws, fires)[1]
+
+    def lead(rfw):
+        return (datetime.strptime(rfw['FLAT_DATE'], '%Y%m%d') - datetime.strptime(rfw[reference][:8], '%Y%m%d')).days
+
+    # The random warnings are issued on their day, their events up to two days ahead
+    assert {lead(rfw) for rfw in rfws} == ({0} if reference == 'ISSUED' else {0, 1, 2})
+    rows = iter(table)
+    for bucket in buckets:
+        low, high = (bucket, bucket) if isinstance(bucket, int) else bucket
+        kept = [rfw for rfw in rfws if low <= lead(rfw) and (high is None or lead(rfw) <= high)]
+        rfw_days = baseline.event_days(kept, [])[0]
+        for before, after in [(0, 1), (1, 2)]:
+            row = next(rows)
+            assert (row['N_RFW_DAYS'], row['HITS'], row['MISSES'], row['FALSE_ALARMS']) == \
+                (len(rfw_days),) + baseline.window_match(rfw_days, fire_days, before, after)
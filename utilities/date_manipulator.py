@@ -1,70 +1,228 @@
+"""
+Shared date helpers for the RFW and fire datasets, plus the pipeline stage that flattens warnings into one record
+per calendar day.
+
+Dates are handled as integer day ordinals (days since 1970-01-01) and timestamps as integer minutes since
+1970-01-01, so filters and day shifts are plain integer arithmetic on NumPy arrays.
+
+The flattener streams the reduced warnings in chunks, expands each chunk into day records in a worker process and
+writes the result as a binary column directory that load_store / VerifySkill read directly (or as JSON with --json).
+
+Usage:
+    python utilities/date_manipulator.py data/RedFlags_Northwest.json data/RFWs_Northwest
+"""
+import argparse
+import collections
 import json
-import datetime
-
-with open('data/Dump/RedFlags_Northwest.json') as e:
-    rfws = json.load(e)
-
-    RFWS_flattened = []
-    for rfw in rfws:
-        iss_date = datetime.datetime.strptime(rfw['ISSUED'], '%Y%m%d%H%M')
-        exp_date = datetime.datetime.strptime(rfw['EXPIRED'], '%Y%m%d%H%M')
-        
-        date_delta = ((exp_date-iss_date).seconds / 60) / 60
-        start_hour = rfw['ISSUED'][8:10]
-        starttime_delta = 24 - int(start_hour)
-
-        # Stays within one day
-        if starttime_delta >= date_delta:
-            print(type(iss_date.strftime('%Y%m%d')))
-            flat_date = iss_date.strftime('%Y%m%d')
-            record = {
-                      "OBJECTID": 0,
-                      "WFO": rfw['WFO'],
-                      "ISSUED": rfw['ISSUED'] ,
-                      "EXPIRED": rfw['EXPIRED'],
-                      "INIT_ISS": rfw['INIT_ISS'],
-                      "INIT_EXP": rfw['INIT_EXP'],
-                      "STATUS": rfw['STATUS'],
-                      "NWS_UGC": rfw['NWS_UGC'],
-                      "STATE": rfw['STATE'],
-                      "FLAT_DATE": flat_date,
-                      "RFW_DAYS": "1 day",
-            }
-
-            RFWS_flattened.append(record)
-
-        # Two days
-        else:
-            iss_date = datetime.datetime.strptime(rfw['ISSUED'][:8], '%Y%m%d')
-            exp_date = datetime.datetime.strptime(rfw['EXPIRED'][:8], '%Y%m%d')
-            print(iss_date, exp_date)
-            while iss_date <= exp_date:
-                flat_date = iss_date.strftime('%Y%m%d')
-                iss_date += datetime.timedelta(days=1)
-
-                record = {
-                    "OBJECTID": 0,
-                    "WFO": rfw['WFO'],
-                    "ISSUED": rfw['ISSUED'],
-                    "EXPIRED": rfw['EXPIRED'],
-                    "INIT_ISS": rfw['INIT_ISS'],
-                    "INIT_EXP": rfw['INIT_EXP'],
-                    "STATUS": rfw['STATUS'],
-                    "NWS_UGC": rfw['NWS_UGC'],
-                    "STATE": rfw['STATE'],
-                    "FLAT_DATE": flat_date,
-                    "RFW_DAYS": "2 days",
-                }
-
-                RFWS_flattened.append(record)
-
-id = 0
-for rfw in RFWS_flattened:
-    # rfw['LEAD_TIME'] = (datetime.datetime.strptime(rfw['ISSUED'], '%Y%m%d%H%M') - datetime.datetime.strptime(rfw['INIT_ISS'], '%Y%m%d%H%M')).seconds / 3600.0
-    rfw['OBJECTID'] = id
-    id += 1
-
-with open('RFWs_Northwest.json', 'w') as outfile:
-    json.dump(RFWS_flattened, outfile, indent=4, sort_keys=True, default=str)
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+from rfw_reducer import JSONStream
+
+# Warnings handed to a worker at a time
+CHUNK_RECORDS = 50000
+# Chunks read ahead of the one being gathered, per worker
+CHUNKS_PER_WORKER = 2
+
+# Fields copied unchanged onto every day of a warning
+STAMP_FIELDS = ('ISSUED', 'EXPIRED', 'INIT_ISS', 'INIT_EXP')
+TEXT_FIELDS = ('WFO', 'NWS_UGC', 'STATE', 'STATUS')
+
+
+def yyyymmdd_to_ordinal(dates):
+    """Converts YYYYMMDD integers (or an array of them) to day ordinals"""
+    dates = np.asarray(dates, dtype=np.int64)
+    return ymd_to_ordinal(dates // 10000, dates // 100 % 100, dates % 100)
+
+
+def ymd_to_ordinal(years, months, days):
+    """Converts year, month and day arrays to day ordinals"""
+    years = np.asarray(years, dtype=np.int64)
+    first_of_month = (years - 1970).astype('datetime64[Y]').astype('datetime64[M]') + (np.asarray(months) - 1)
+    return (first_of_month.astype('datetime64[D]').astype(np.int64) + np.asarray(days) - 1).astype(np.int32)
+
+
+def ordinal_to_ymd(ordinals):
+    """Splits day ordinals into (years, months, days) arrays"""
+    days = np.asarray(ordinals, dtype=np.int64).astype('datetime64[D]')
+    months = days.astype('datetime64[M]')
+    years = months.astype('datetime64[Y]')
+    return (years.astype(np.int64) + 1970,
+            (months - years.astype('datetime64[M]')).astype(np.int64) + 1,
+            (days - months.astype('datetime64[D]')).astype(np.int64) + 1)
+
+
+def ordinal_to_yyyymmdd(ordinals):
+    """Converts day ordinals back to YYYYMMDD integers"""
+    years, months, days = ordinal_to_ymd(ordinals)
+    return (years * 10000 + months * 100 + days).astype(np.int32)
+
+
+def stamps_to_minutes(stamps):
+    """Converts YYYYMMDDHHMM integers (or an array of them) to minutes since 1970-01-01"""
+    stamps = np.asarray(stamps, dtype=np.int64)
+    days = yyyymmdd_to_ordinal(stamps // 10000).astype(np.int64)
+    return days * 1440 + (stamps // 100 % 100) * 60 + stamps % 100
+
+
+def duration_minutes(issued, expired):
+    """
+    Minutes from ISSUED to EXPIRED (YYYYMMDDHHMM integers or arrays of them), whatever the span, as int16. Spans
+    beyond the int16 range (about 22 days either way) are clipped to it.
+    """
+    minutes = stamps_to_minutes(expired) - stamps_to_minutes(issued)
+    bounds = np.iinfo(np.int16)
+    return np.clip(minutes, bounds.min, bounds.max).astype(np.int16)
+
+
+def iter_rfw_chunks(in_path, chunk_records=CHUNK_RECORDS):
+    """Streams the warnings of a reduced RFW JSON list, chunk_records at a time"""
+    with open(in_path) as f:
+        chunk = []
+        for rfw in JSONStream(f).array_items():
+            chunk.append(rfw)
+            if len(chunk) == chunk_records:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+def flatten_chunk(rfws):
+    """
+    Expands a list of warnings into one row per calendar day each covers
+
+    A warning stays on its issue day when it expires within (24 - issue hour) hours of being issued, otherwise it
+    covers every day from its issue date to its expiry date, however many that is.
+
+    Parameters:
+        rfws (list of dicts): Reduced RFW records.
+
+    Returns: dict of field -> np.ndarray, the rows in input order with each warning's days in date order, plus
+             N_DAYS (the number of days of the warning each row came from) and DURATION_MIN (its length in minutes). The string fields come back as
+             (codes, categories) pairs against the chunk's own sorted categories.
+    """
+    stamps = {name: np.array([int(rfw[name]) for rfw in rfws], dtype=np.int64) for name in STAMP_FIELDS}
+    issued = stamps_to_minutes(stamps['ISSUED'])
+    expired = stamps_to_minutes(stamps['EXPIRED'])
+
+    start_hour = stamps['ISSUED'] // 100 % 100
+    one_day = expired - issued <= (24 - start_hour) * 60
+    first_day = issued // 1440
+    n_days = np.where(one_day, 1, np.maximum(expired // 1440 - first_day + 1, 1))
+
+    source = np.repeat(np.arange(len(rfws)), n_days)
+    day_offset = np.arange(len(source)) - np.repeat(np.cumsum(n_days) - n_days, n_days)
+
+    columns = {name: values[source] for name, values in stamps.items()}
+    for name in TEXT_FIELDS:
+        categories, codes = np.unique(np.array([rfw[name] for rfw in rfws], dtype=str), return_inverse=True)
+        columns[name] = (codes.astype(np.int32)[source], categories)
+    columns['FLAT_DATE'] = ordinal_to_yyyymmdd(first_day[source] + day_offset)
+    columns['N_DAYS'] = n_days[source]
+    columns['DURATION_MIN'] = duration_minutes(stamps['ISSUED'], stamps['EXPIRED'])[source]
+    return columns
+
+
+def _rfw_days_labels(n_days):
+    """(codes, categories) of the '1 day', '2 days', ... labels, formatting each distinct length once"""
+    lengths, inverse = np.unique(n_days, return_inverse=True)
+    labels = ['1 day' if n == 1 else '%i days' % n for n in lengths.tolist()]
+    categories, label_codes = np.unique(np.array(labels, dtype=str), return_inverse=True)
+    return label_codes.astype(np.int32)[inverse], categories
+
+
+def ordered_map(pool, fn, items, window):
+    """
+    fn over items in a pool, yielding the results in input order. Unlike Executor.map, which submits every item
+    up front, at most window items are read from items and submitted ahead of the result being yielded.
+    """
+    pending = collections.deque()
+    for item in items:
+        if len(pending) >= window:
+            yield pending.popleft().result()
+        pending.append(pool.submit(fn, item))
+    while pending:
+        yield pending.popleft().result()
+
+
+def flatten_table(chunks, workers=None):
+    """
+    Flattens chunks of warnings into one Table of day records (RFW_SCHEMA)
+
+    Chunks are flattened in parallel but gathered in input order, so OBJECTIDs (the row numbers of the output) are
+    the same whatever the number of workers. Only a few chunks per worker are read ahead of the one being gathered,
+    so the input is never held in memory whole.
+
+    Parameters:
+        chunks (iterable of lists of dicts): Reduced RFW records, e.g. from iter_rfw_chunks.
+        workers (int) (optional): Worker processes. 1 flattens in this process, None uses every core.
+
+    Returns: Table
+    """
+    # columnar_store imports this module, so it can only be imported once both are loaded
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'analysis'))
+    from columnar_store import Categorical, Table, concat_tables
+
+    def part_table(part):
+        columns = {'OBJECTID': np.zeros(len(part['FLAT_DATE']), dtype=np.int32)}
+        for name in TEXT_FIELDS:
+            columns[name] = Categorical(*part[name])
+        columns['RFW_DAYS'] = Categorical(*_rfw_days_labels(part['N_DAYS']))
+        columns['FLAT_DATE'] = part['FLAT_DATE']
+        for name in STAMP_FIELDS:
+            columns[name] = part[name]
+        columns['DURATION_MIN'] = part['DURATION_MIN']
+        return Table(columns, ('FLAT_DATE',) + STAMP_FIELDS)
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        tables = [part_table(flatten_chunk(chunk)) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            tables = [part_table(part)
+                      for part in ordered_map(pool, flatten_chunk, chunks, CHUNKS_PER_WORKER * workers)]
+    if not tables:
+        tables = [part_table(flatten_chunk([]))]
+
+    table = concat_tables(tables)
+    table.columns['OBJECTID'] = np.arange(len(table), dtype=np.int32)
+    return table
+
+
+def flatten_rfws(in_path, out_path, workers=None, chunk_records=CHUNK_RECORDS, as_json=False):
+    """
+    Flattens every warning in in_path into one record per calendar day it covers and writes them to out_path
+
+    Parameters:
+        in_path (str): Reduced RFW JSON, as written by rfw_reducer.py.
+        out_path (str): Output column directory (read by store_cache.load_store), or JSON file when as_json is True.
+        workers (int) (optional): Worker processes. 1 flattens in this process, None uses every core.
+        chunk_records (int): Warnings per chunk.
+        as_json (bool): Write the old indented JSON list instead of binary columns.
+
+    Returns: The number of day records written.
+    """
+    table = flatten_table(iter_rfw_chunks(in_path, chunk_records), workers)
+    if as_json:
+        with open(out_path, 'w') as outfile:
+            json.dump(table.to_records(), outfile, indent=4, sort_keys=True, default=str)
+    else:
+        from store_cache import file_fingerprint, write_table
+        write_table(table, out_path, file_fingerprint(in_path))
+    return len(table)
+
 
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Flatten reduced RFWs into one record per calendar day')
+    parser.add_argument('in_path', nargs='?', default='data/RedFlags_Northwest.json')
+    parser.add_argument('out_path', nargs='?', default='data/RFWs_Northwest')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: every core)')
+    parser.add_argument('--chunk-records', type=int, default=CHUNK_RECORDS, help='Warnings per worker task')
+    parser.add_argument('--json', action='store_true', help='Write an indented JSON list instead of binary columns')
+    args = parser.parse_args()
 
+    count = flatten_rfws(args.in_path, args.out_path, args.workers, args.chunk_records, args.json)
+    print("done writing %i day records to %s" % (count, args.out_path))
@@ -1,28 +1,162 @@
+"""
+Reduces the raw lower-48 RFW archive (an ArcGIS feature collection) to the warnings of the offices, phenomenon and
+significance requested.
+
+The archive is streamed: features are decoded one at a time from a fixed-size read buffer and the kept records are
+written out as they are found, so memory use doesn't grow with the size of the archive.
+
+Usage:
+    python utilities/rfw_reducer.py data/2006_2015_lower48_allRFWs_allActions.json data/RedFlags_Northwest.json
+"""
+import argparse
 import json
-import datetime
+import re
+
+NORTHWEST_WFOS = ['MSO', "PIH", "BOI", "SEW", "MFR", "PQR", "PDT", "OTX"]
+
+CHUNK_SIZE = 1 << 20
+
+WHITESPACE = re.compile(r'[ \t\r\n]*')
+
+
+class JSONStream:
+    """
+    A forward-only JSON reader over a file, holding at most one read chunk plus one decoded value in memory
+
+    Parameters:
+        f (file): Text file positioned at the start of a JSON document.
+        chunk_size (int): Characters to read at a time.
+    """
+
+    def __init__(self, f, chunk_size=CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ''
+        self.pos = 0
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        """Reads another chunk, dropping what has already been consumed. Returns False at end of file."""
+        chunk = self.f.read(self.chunk_size)
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return bool(chunk)
+
+    def peek(self):
+        """Skips whitespace and returns the next character without consuming it ('' at end of file)"""
+        while True:
+            self.pos = WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf) or not self._fill():
+                return self.buf[self.pos:self.pos + 1]
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError('Expected %r at offset %i of the buffer, found %r' % (char, self.pos, self.peek()))
+        self.pos += 1
 
-with open('data/2006_2015_lower48_allRFWs_allActions.json') as e:
-    rfws = json.load(e)
-    rfws_reduced = []
+    def value(self):
+        """Decodes the next complete JSON value, reading more of the file until it is all buffered"""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # A number can end exactly at the buffer edge and still continue in the next chunk
+            if end == len(self.buf) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def array_items(self):
+        """Yields the items of the array starting at the current position"""
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.peek() == ',':
+                self.pos += 1
+                continue
+            self.expect(']')
+            return
+
+
+def iter_features(f, chunk_size=CHUNK_SIZE):
+    """Yields the features of a feature collection one at a time, skipping its other top-level keys"""
+    stream = JSONStream(f, chunk_size)
+    stream.expect('{')
+    while stream.peek() != '}':
+        key = stream.value()
+        stream.expect(':')
+        if key == 'features':
+            for feature in stream.array_items():
+                yield feature
+        else:
+            stream.value()
+        if stream.peek() == ',':
+            stream.pos += 1
+
+
+def reduce_rfws(in_path, out_path, wfos=NORTHWEST_WFOS, phenom='FW', sig='W', progress_every=1000):
+    """
+    Streams the features of in_path and writes the matching warnings to out_path as a JSON list
+
+    Parameters:
+        in_path (str): The raw archive, a feature collection with an 'attributes' dict per feature.
+        out_path (str): Where to write the reduced records.
+        wfos (list of strs or None): Offices to keep. None keeps every office.
+        phenom (str or None): PHENOM code to keep ('FW' is fire weather). None keeps all.
+        sig (str or None): SIG code to keep ('W' is warning). None keeps all.
+        progress_every (int): Print a running count every this many kept records.
+
+    Returns: The number of records written.
+    """
+    wfos = set(wfos) if wfos is not None else None
     counter = 0
-    for rfw in rfws['features']:
-        if rfw['attributes']["WFO"] in ['MSO', "PIH", "BOI", "SEW", "MFR", "PQR", "PDT", "OTX"]:
-            if rfw['attributes']["PHENOM"] == 'FW':
-                if rfw['attributes']["SIG"] == 'W':
-                    record = {
-                        "WFO": rfw['attributes']["WFO"],
-                        "ISSUED": rfw['attributes']["ISSUED"],
-                        "EXPIRED": rfw['attributes']["EXPIRED"],
-                        "INIT_ISS": rfw['attributes']["INIT_ISS"],
-                        "INIT_EXP": rfw['attributes']["INIT_EXP"],
-                        "STATUS": rfw['attributes']["STATUS"],
-                        "NWS_UGC": rfw['attributes']["NWS_UGC"],
-                        "STATE": rfw['attributes']["calc_state"],
-                    }
-                    rfws_reduced.append(record)
-                    counter += 1
-                    print(str(counter) + " fires counted!")
-
-with open('data/RedFlags_Northwest.json', 'w') as outfile:
-    json.dump(rfws_reduced, outfile, indent=4, sort_keys=True, default=str)
-    print("done writing")
\ No newline at end of file
+    with open(in_path) as e, open(out_path, 'w') as outfile:
+        outfile.write('[')
+        for rfw in iter_features(e):
+            attributes = rfw['attributes']
+            if wfos is not None and attributes["WFO"] not in wfos:
+                continue
+            if phenom is not None and attributes["PHENOM"] != phenom:
+                continue
+            if sig is not None and attributes["SIG"] != sig:
+                continue
+
+            record = {
+                "WFO": attributes["WFO"],
+                "ISSUED": attributes["ISSUED"],
+                "EXPIRED": attributes["EXPIRED"],
+                "INIT_ISS": attributes["INIT_ISS"],
+                "INIT_EXP": attributes["INIT_EXP"],
+                "STATUS": attributes["STATUS"],
+                "NWS_UGC": attributes["NWS_UGC"],
+                "STATE": attributes["calc_state"],
+            }
+            # Same layout json.dump(..., indent=4) gives a whole list
+            text = json.dumps(record, indent=4, sort_keys=True, default=str).replace('\n', '\n    ')
+            outfile.write((',\n    ' if counter else '\n    ') + text)
+            counter += 1
+            if progress_every and counter % progress_every == 0:
+                print(str(counter) + " RFWs kept so far")
+        outfile.write('\n]' if counter else ']')
+    return counter
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Reduce the raw RFW archive to selected offices and products')
+    parser.add_argument('in_path', nargs='?', default='data/2006_2015_lower48_allRFWs_allActions.json')
+    parser.add_argument('out_path', nargs='?', default='data/RedFlags_Northwest.json')
+    parser.add_argument('--wfo', nargs='+', default=NORTHWEST_WFOS, help='Offices to keep (default: the 8 Northwest WFOs)')
+    parser.add_argument('--all-wfos', action='store_true', help='Keep every office')
+    parser.add_argument('--phenom', default='FW', help="PHENOM code to keep (default 'FW')")
+    parser.add_argument('--sig', default='W', help="SIG code to keep (default 'W')")
+    args = parser.parse_args()
+
+    count = reduce_rfws(args.in_path, args.out_path, None if args.all_wfos else args.wfo, args.phenom, args.sig)
+    print("done writing %i records" % count)
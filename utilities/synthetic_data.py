@@ -0,0 +1,267 @@
+"""
+Synthetic RFW and fire datasets, at the Northwest set's size or any multiple of it, for benchmarks and load tests.
+
+Scale 1 has the Northwest's 8 offices, 120 zones, about 10,000 flattened RFW records and NORTHWEST_FIRES fires over
+2006 - 2015. Scale n has n times the offices (and so zones) at the same density per zone, so the records grow n-fold
+the way a national dataset would rather than piling up in the same zones.
+
+Warnings are generated as reduced RFW products (rfw_reducer.py output: one record per zone and product, a NEW
+product followed by CON/EXT/CAN updates) and flattened to RFW days by date_manipulator.flatten_table, so the RFW
+records have exactly the fields VerifySkill and the visual modules read. Fires get the FIRE_SCHEMA fields, with
+DISC_DATE carrying a discovery time (YYYYMMDDHHMM) for most of them. Both peak in the summer fire season, and a share
+of the fires falls on or the day after a warning in its zone, so the scores come out in a realistic range.
+
+Usage:
+    python utilities/synthetic_data.py data/synthetic_10x --scale 10
+    python utilities/synthetic_data.py data/synthetic_100x --scale 100 --format columns
+"""
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+from date_manipulator import flatten_table, ordinal_to_yyyymmdd, ymd_to_ordinal
+from rfw_reducer import NORTHWEST_WFOS
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'analysis'))
+from columnar_store import Categorical, Table
+
+FIRST_YEAR, LAST_YEAR = 2006, 2015
+ZONES_PER_WFO = 15
+# Warning events (each one NEW product and its updates over a few zones) and fires per office at scale 1
+EVENTS_PER_WFO = 170
+NORTHWEST_FIRES = 23000
+
+# Fires placed on, or the day after, a warning day of their zone
+FIRE_HIT_SHARE = 0.15
+# Fires recorded with a time of day
+TIMED_SHARE = 0.7
+# Fires missing their NFDRS percentiles
+NFDRS_MISSING_SHARE = 0.02
+
+# STAT_CAUSE draws: 1 is lightning, 2 - 12 human, 13 missing
+CAUSE_SHARES = [0.35] + [0.55 / 11] * 11 + [0.10]
+
+
+def _letters(index, width):
+    letters = []
+    for _ in range(width):
+        index, letter = divmod(index, 26)
+        letters.append(chr(ord('A') + letter))
+    return ''.join(reversed(letters))
+
+
+def offices(scale):
+    """
+    (wfos, states, zones, zone_wfo) of a synthetic network: the Northwest offices first, then made-up 3-letter ones.
+    Four offices share each 2-letter state, each with its own run of zone numbers.
+    """
+    n_wfos = len(NORTHWEST_WFOS) * scale
+    wfos = list(NORTHWEST_WFOS)
+    index = 0
+    while len(wfos) < n_wfos:
+        name = _letters(index, 3)
+        index += 1
+        if name not in wfos:
+            wfos.append(name)
+
+    zones, zone_wfo = [], []
+    states = [_letters(i // 4, 2) for i in range(n_wfos)]
+    for i, state in enumerate(states):
+        first = i % 4 * 200 + 1
+        zones.extend('%sZ%03i' % (state, first + k) for k in range(ZONES_PER_WFO))
+        zone_wfo.extend([i] * ZONES_PER_WFO)
+    return np.array(wfos), np.array(states), np.array(zones), np.array(zone_wfo)
+
+
+def season_days(rng, n):
+    """Day ordinals over FIRST_YEAR - LAST_YEAR, mostly in a late-July-centred fire season"""
+    years = rng.integers(FIRST_YEAR, LAST_YEAR + 1, n)
+    in_season = rng.random(n) < 0.8
+    day_of_year = np.where(in_season, rng.normal(210, 30, n), rng.uniform(1, 365, n))
+    day_of_year = np.clip(np.round(day_of_year), 1, 365).astype(np.int64)
+    return ymd_to_ordinal(years, 1, 1).astype(np.int64) + day_of_year - 1
+
+
+def _stamps(minutes):
+    """Minutes since 1970 as YYYYMMDDHHMM integers"""
+    minutes = np.asarray(minutes, dtype=np.int64)
+    days, minute_of_day = np.divmod(minutes, 1440)
+    return ordinal_to_yyyymmdd(days).astype(np.int64) * 10000 + minute_of_day // 60 * 100 + minute_of_day % 60
+
+
+def warning_products(rng, scale):
+    """
+    Reduced RFW products, one record per zone and product
+
+    Returns: list of dicts with WFO, NWS_UGC, STATE, STATUS and the ISSUED, EXPIRED, INIT_ISS, INIT_EXP stamps as
+             YYYYMMDDHHMM strings
+    """
+    wfos, states, zones, zone_wfo = offices(scale)
+    n_events = EVENTS_PER_WFO * len(wfos)
+
+    event_wfo = rng.integers(0, len(wfos), n_events)
+    issued = season_days(rng, n_events) * 1440 + rng.integers(8 * 60, 20 * 60, n_events)
+    # Mostly an afternoon and evening, sometimes a few days
+    hours = np.where(rng.random(n_events) < 0.75, rng.uniform(4, 20, n_events), rng.uniform(20, 96, n_events))
+    expired = issued + np.round(hours * 60).astype(np.int64)
+    n_zones = np.minimum(rng.geometric(0.35, n_events), ZONES_PER_WFO)
+    first_zone = rng.integers(0, ZONES_PER_WFO, n_events)
+    n_products = rng.choice([1, 2, 3], n_events, p=[0.75, 0.2, 0.05])
+
+    # Every update's status and time shifts, drawn up front: (events, updates after the NEW product)
+    updates = n_products.max() - 1
+    statuses = rng.choice(np.array(['CON', 'EXT', 'CAN']), (n_events, updates), p=[0.6, 0.25, 0.15]).tolist()
+    delays = rng.integers(60, 6 * 60, (n_events, updates)).tolist()
+    extensions = rng.integers(2 * 60, 12 * 60, (n_events, updates)).tolist()
+    init_stamps = np.stack([_stamps(issued), _stamps(expired)], axis=1).astype(str).tolist()
+    wfo_names, state_names, zone_names = wfos.tolist(), states.tolist(), zones.tolist()
+
+    records = []
+    for event in range(n_events):
+        wfo = int(event_wfo[event])
+        codes = wfo * ZONES_PER_WFO + (first_zone[event] + np.arange(n_zones[event])) % ZONES_PER_WFO
+        init_iss, init_exp = init_stamps[event]
+        product_issued, product_expired = int(issued[event]), int(expired[event])
+        for product in range(n_products[event]):
+            status = 'NEW'
+            if product:
+                status = statuses[event][product - 1]
+                product_issued = min(product_issued + delays[event][product - 1], product_expired - 30)
+                if status == 'EXT':
+                    product_expired += extensions[event][product - 1]
+                elif status == 'CAN':
+                    product_expired = product_issued + 1
+            stamps = _stamps([product_issued, product_expired]).astype(str).tolist()
+            for code in codes.tolist():
+                records.append({
+                    'WFO': wfo_names[wfo],
+                    'NWS_UGC': zone_names[code],
+                    'STATE': state_names[wfo],
+                    'STATUS': status,
+                    'ISSUED': stamps[0],
+                    'EXPIRED': stamps[1],
+                    'INIT_ISS': init_iss,
+                    'INIT_EXP': init_exp,
+                })
+    return records
+
+
+def fire_table(rng, scale, rfws):
+    """
+    Fire records against the network of scale and the flattened RFW table rfws
+
+    Returns: Table with the FIRE_SCHEMA columns (DISC_TIME -1 for untimed fires)
+    """
+    wfos, _, zones, zone_wfo = offices(scale)
+    n_fires = NORTHWEST_FIRES * scale
+
+    zone = rng.integers(0, len(zones), n_fires)
+    day = season_days(rng, n_fires)
+    # Some fires on, or the day after, a warning day of their zone
+    on_warning = np.flatnonzero(rng.random(n_fires) < FIRE_HIT_SHARE)
+    rfw_rows = rng.integers(0, len(rfws), len(on_warning))
+    zone[on_warning] = np.searchsorted(zones, rfws['NWS_UGC'].values()[rfw_rows])
+    rfw_dates = np.asarray(rfws['FLAT_DATE'])[rfw_rows]
+    day[on_warning] = (ymd_to_ordinal(rfw_dates // 10000, rfw_dates // 100 % 100, rfw_dates % 100) +
+                       rng.integers(0, 2, len(on_warning)))
+
+    timed = rng.random(n_fires) < TIMED_SHARE
+    times = np.where(timed, rng.integers(0, 24, n_fires) * 100 + rng.integers(0, 60, n_fires), -1)
+
+    # NFDRS percentiles run high in the fire season: ERC and BI with the season, the fuel moistures against it
+    dryness = np.clip(1 - np.abs((day - ymd_to_ordinal(FIRST_YEAR, 1, 1)) % 365.25 - 210) / 120, 0, 1)
+    nfdrs = {}
+    for name, sign in (('BI_PERC', 1), ('ERC_PERC', 1), ('FM100_PERC', -1), ('FM1000_PER', -1)):
+        centre = 50 + sign * (dryness - 0.5) * 60
+        values = np.clip(np.round(rng.normal(centre, 20)), 0, 100)
+        values[rng.random(n_fires) < NFDRS_MISSING_SHARE] = np.nan
+        nfdrs[name] = values
+
+    # Categorical needs its categories sorted, the zones already are
+    wfo_order = np.argsort(wfos)
+    wfo_rank = np.argsort(wfo_order).astype(np.int32)
+    columns = {
+        'ID': np.arange(n_fires, dtype=np.int64),
+        'WFO': Categorical(wfo_rank[zone_wfo[zone]], wfos[wfo_order]),
+        'UGC_ZONE': Categorical(zone.astype(np.int32), zones),
+        'FORESTED': Categorical((rng.random(n_fires) < 0.55).astype(np.int32), np.array(['no', 'yes'])),
+        'DISC_DATE': ordinal_to_yyyymmdd(day),
+        'DISC_TIME': times.astype(np.int16),
+        'STAT_CAUSE': (rng.choice(len(CAUSE_SHARES), n_fires, p=CAUSE_SHARES) + 1).astype(np.int16),
+        'SIZE_AC': np.round(rng.lognormal(0, 2, n_fires), 2),
+    }
+    columns.update(nfdrs)
+    return Table(columns)
+
+
+def fire_records(fires):
+    """Fire JSON records: DISC_DATE is a YYYYMMDDHHMM string for timed fires, a YYYYMMDD int otherwise"""
+    dates = np.asarray(fires['DISC_DATE']).astype(np.int64)
+    times = np.asarray(fires['DISC_TIME']).astype(np.int64)
+    disc_dates = [str(date * 10000 + time) if time >= 0 else date
+                  for date, time in zip(dates.tolist(), times.tolist())]
+    records = fires.to_records()
+    for record, disc_date in zip(records, disc_dates):
+        del record['DISC_TIME']
+        record['DISC_DATE'] = disc_date
+        for name in ('BI_PERC', 'ERC_PERC', 'FM100_PERC', 'FM1000_PER'):
+            if record[name] != record[name]:
+                record[name] = None
+    return records
+
+
+def generate(scale=1, seed=0, workers=1):
+    """
+    Returns: (rfws, fires), the flattened RFW days (RFW_SCHEMA) and fires (FIRE_SCHEMA) as Tables
+    """
+    rng = np.random.default_rng(seed)
+    products = warning_products(rng, scale)
+    chunks = [products[start:start + 50000] for start in range(0, len(products), 50000)]
+    rfws = flatten_table(chunks, workers)
+    return rfws, fire_table(rng, scale, rfws)
+
+
+def write_dataset(out_dir, scale=1, seed=0, fmt='json', workers=1):
+    """
+    Writes a synthetic dataset to out_dir as RFWs.json and Fires.json, or (fmt='columns') as the RFWs and Fires
+    column directories load_store reads directly
+
+    Returns: (rfw_path, fires_path)
+    """
+    rfws, fires = generate(scale, seed, workers)
+    os.makedirs(out_dir, exist_ok=True)
+    if fmt == 'columns':
+        from store_cache import write_table
+        paths = os.path.join(out_dir, 'RFWs'), os.path.join(out_dir, 'Fires')
+        source = {'size': None, 'sha1': 'synthetic scale=%i seed=%i' % (scale, seed)}
+        write_table(rfws, paths[0], source)
+        write_table(fires, paths[1], source)
+        return paths
+
+    paths = os.path.join(out_dir, 'RFWs.json'), os.path.join(out_dir, 'Fires.json')
+    rfw_records = rfws.to_records()
+    for record in rfw_records:
+        # Derived at ingest, so not part of the flattened JSON
+        del record['DURATION_MIN']
+    with open(paths[0], 'w') as f:
+        json.dump(rfw_records, f)
+    with open(paths[1], 'w') as f:
+        json.dump(fire_records(fires), f)
+    return paths
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Write a synthetic RFW and fire dataset')
+    parser.add_argument('out_dir')
+    parser.add_argument('--scale', type=int, default=1, help='Multiple of the Northwest set (default 1)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--format', choices=['json', 'columns'], default='json',
+                        help='JSON files, or binary column directories (default json)')
+    parser.add_argument('--workers', type=int, default=1, help='Processes flattening the warnings (default 1)')
+    args = parser.parse_args()
+
+    rfw_path, fires_path = write_dataset(args.out_dir, args.scale, args.seed, args.format, args.workers)
+    print('Wrote %s and %s' % (rfw_path, fires_path))
@@ -1,46 +1,48 @@
-from LARGE_FIRES_visuals import large_fires
 from collections import Counter
 import datetime
-import json
-import matplotlib.pyplot as plt
-import numpy as np
-
-
-plt.style.use('seaborn')
-
-# Global JSON data files
-with open('data/Fires_Northwest.json') as e:
-    fires = json.load(e)
-
-human_count = 0
-ltng_count = 0
-human_acres = 0
-ltng_acres =0
-
-for fire in fires:
-    #human
-    if fire['STAT_CAUSE'] in (2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12):
-        human_count += 1
-        human_acres += fire['SIZE_AC']
-    # lightning
-    if fire['STAT_CAUSE'] == 1:
-        ltng_count += 1
-        ltng_acres += fire['SIZE_AC']
-
-human_perc_occ = human_count / (human_count + ltng_count)
-human_perc_burned = human_acres / (human_acres + ltng_acres)
-ltng_perc_occ = ltng_count / (human_count + ltng_count)
-ltng_perc_burned = ltng_acres / (human_acres + ltng_acres)
-print(human_perc_occ, human_perc_burned,  ltng_perc_occ, ltng_perc_burned)
+import visual_data
+from visual_data import FIRES_PATH, fire_aggregate, pyplot
+
+WFOS = ['SEW', 'PQR', 'MFR', 'PDT', 'BOI', 'OTX', 'PIH', 'MSO']
+
+# Every panel of the fires mega plot is a marginal of this one aggregate
+MEGA_PLOT_KEYS = ('year', 'month', 'cause', 'forest')
+
+
+def by_wfo(sizes_dict):
+    """The per-WFO values in the order of WFOS, NaN for offices without fires"""
+    return {wfo: sizes_dict.get(wfo, float('nan')) for wfo in WFOS}
+
+
+def listed_causes(cause_count):
+    """The cause counts without the group of fires whose STAT_CAUSE is none of the listed codes"""
+    visual_data.add_analysis_path()
+    from group_aggregates import UNLISTED_CAUSE
+    return {cause: count for cause, count in cause_count.items() if cause != UNLISTED_CAUSE}
+
+
+def cause_shares(path=FIRES_PATH):
+    """Shares of the human and lightning fires in the fire count and in the acres burned"""
+    causes = fire_aggregate(MEGA_PLOT_KEYS, path=path).marginal('cause')
+    counts = causes.to_dict('count')
+    acres = causes.to_dict('sum')
+    human_count = counts.get('Human', 0)
+    ltng_count = counts.get('Lightning', 0)
+    human_acres = acres.get('Human', 0)
+    ltng_acres = acres.get('Lightning', 0)
+
+    human_perc_occ = human_count / (human_count + ltng_count)
+    human_perc_burned = human_acres / (human_acres + ltng_acres)
+    ltng_perc_occ = ltng_count / (human_count + ltng_count)
+    ltng_perc_burned = ltng_acres / (human_acres + ltng_acres)
+    print(human_perc_occ, human_perc_burned,  ltng_perc_occ, ltng_perc_burned)
+    return human_perc_occ, human_perc_burned, ltng_perc_occ, ltng_perc_burned
 
 ########################################################################################################################
 # YEAR FREQUENCY OF FIRES                                                                                              #
 ########################################################################################################################
-def fires_by_year(fires):
-    years = []
-    for fire in fires:
-        years.append(str(fire['DISC_DATE'])[:4])
-    year_count = Counter(years)
+def fires_by_year(path=FIRES_PATH):
+    year_count = Counter(fire_aggregate(MEGA_PLOT_KEYS, path=path).marginal('year').to_dict())
     print(year_count)
     # plt.scatter(year_count.keys(), year_count.values(), edgecolor='black', linewidth=1.0)
     # plt.title("Frequency of Fires by Year")
@@ -50,72 +52,32 @@ def fires_by_year(fires):
     # plt.show()
     return year_count
 
-# years = fires_by_year(fires)
+# years = fires_by_year()
 
 ########################################################################################################################
 # MONTH FREQUENCY OF FIRES                                                                                             #
 ########################################################################################################################
-def fires_by_month(fires, years, largefires):
-    months = []
-    lf_months = []
-    lf_years = []
-    acres_in = 0
-    acres_out = 0
-    for fire in fires:
-        months.append(str(fire['DISC_DATE'])[4:6])
-        if str(fire['DISC_DATE'])[4:6] in ['06', '07', '08', '09', '10']:
-            acres_in += fire['SIZE_AC']
-        else:
-            acres_out += fire['SIZE_AC']
-
-    for lf in largefires:
-        lf_months.append(str(lf['DISC_DATE'])[4:6])
-
-    for lf in largefires:
-        lf_years.append(str(lf['DISC_DATE'])[:4])
-
-    month_count = Counter(sorted(months))
-    lf_count = Counter(sorted(lf_months))
-    lf_year_count = Counter(lf_years)
-
-    causes = []
-    for fire in fires:
-        if fire['STAT_CAUSE'] in (2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12):
-            causes.append('Human')
-        elif fire['STAT_CAUSE'] == 1:
-            causes.append('Lightning')
-        elif fire['STAT_CAUSE'] == 13:
-            causes.append('Missing')
-
-    cause_count = Counter(sorted(causes))
-
-
-    lf_causes = []
-    for lf in largefires:
-        if lf['STAT_CAUSE'] in (2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12):
-            lf_causes.append('Human')
-        elif lf['STAT_CAUSE'] == 1:
-            lf_causes.append('Lightning')
-        elif lf['STAT_CAUSE'] == 13:
-            lf_causes.append('Missing')
-
-    lf_cause_count = Counter(sorted(lf_causes))
-
-    forest = []
-    for fire in fires:
-        if fire['FORESTED'] == 'yes':
-            forest.append('Forested')
-        else:
-            forest.append('Non-Forested')
-    forest_count = Counter(forest)
-
-    lf_forest = []
-    for lf in largefires:
-        if lf['FORESTED'] == 'yes':
-            lf_forest.append('Forested')
-        else:
-            lf_forest.append('Non-Forested')
-    lf_forest_count = Counter(lf_forest)
+def fires_mega_plot_data(path=FIRES_PATH):
+    """Year, month, cause and forest cover counts of all fires and of the large fires"""
+    fires = fire_aggregate(MEGA_PLOT_KEYS, path=path)
+    large_fires = fire_aggregate(MEGA_PLOT_KEYS, 'large', path=path)
+    fire_counts = {key: fires.marginal(key).to_dict() for key in MEGA_PLOT_KEYS}
+    large_fire_counts = {key: large_fires.marginal(key).to_dict() for key in MEGA_PLOT_KEYS}
+    for counts in (fire_counts, large_fire_counts):
+        counts['cause'] = listed_causes(counts['cause'])
+    return {'fire_counts': fire_counts, 'large_fire_counts': large_fire_counts}
+
+
+def fires_mega_plot_figure(fire_counts, large_fire_counts):
+    plt = pyplot()
+    years = fire_counts['year']
+    month_count = fire_counts['month']
+    cause_count = fire_counts['cause']
+    forest_count = fire_counts['forest']
+    lf_year_count = large_fire_counts['year']
+    lf_count = large_fire_counts['month']
+    lf_cause_count = large_fire_counts['cause']
+    lf_forest_count = large_fire_counts['forest']
 
     fig = plt.figure(figsize=(8.5, 10))
 
@@ -178,160 +140,221 @@ def fires_by_month(fires, years, largefires):
     fig.text(0.03, 0.75, 'Number of Fires\nLg(x)', ha='center', va='center', rotation='vertical')
     fig.text(0.03, 0.30, 'Number of Fires\nLg(x)', ha='center', va='center', rotation='vertical')
     fig.text(0.1, 0.96, 'Characteristics of Fires in the Northwestern U.S.\n(2006 - 2015) n = 64,122', ha='left', va='center', fontsize=16)
-    plt.savefig('graphics/fires_mega_plot.png', dpi=600)
     # plt.tight_layout()
+    return fig
+
+
+def fires_by_month(path=FIRES_PATH):
+    plt = pyplot()
+    fires_mega_plot_figure(**fires_mega_plot_data(path))
+    plt.savefig('graphics/fires_mega_plot.png', dpi=600)
     plt.show()
  
-# fires_by_month(fires, years, large_fires)
+# fires_by_month()
 
 ########################################################################################################################
 # FIRE FREQUENCY BY CAUSE                                                                                              #
 ########################################################################################################################
-def fires_by_cause(fires):
-    causes = []
-    for fire in fires:
-        if fire['STAT_CAUSE'] in (2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12):
-            causes.append('Human')
-        elif fire['STAT_CAUSE'] == 1:
-            causes.append('Lightning')
-        elif fire['STAT_CAUSE'] == 13:
-            causes.append('Missing/Undefined')
-
-    month_count = Counter(sorted(causes))
-    print(month_count)
-    plt.bar(month_count.keys(), month_count.values(), edgecolor='black', linewidth=1.0, width=1)
+def fires_by_cause_data(path=FIRES_PATH):
+    cause_count = listed_causes(fire_aggregate(MEGA_PLOT_KEYS, path=path).marginal('cause').to_dict())
+    return {'cause_count': {'Missing/Undefined' if cause == 'Missing' else cause: count
+                            for cause, count in cause_count.items()}}
+
+
+def fires_by_cause_figure(cause_count):
+    plt = pyplot()
+    fig = plt.figure()
+    plt.bar(cause_count.keys(), cause_count.values(), edgecolor='black', linewidth=1.0, width=1)
     # plt.title("Frequency of Fires by Month")
     plt.ylabel("Number of Fires")
     plt.xlabel("Cause Type", fontsize=14)
+    return fig
+
+
+def fires_by_cause(path=FIRES_PATH):
+    plt = pyplot()
+    data = fires_by_cause_data(path)
+    print(data['cause_count'])
+    fires_by_cause_figure(**data)
     plt.savefig('graphics/fires_by_cause.png', dpi=600)
     plt.show()
 
-fires_by_cause(fires)
+# fires_by_cause()
 
 ########################################################################################################################
 # FIRE FREQUENCY BY WFO                                                                                                #
 ########################################################################################################################
-def fires_by_wfo(fires):
-    office = []
-    for fire in fires:
-        office.append(fire['WFO'])
-    office_count = Counter(office)
-    print(office_count)
+def fires_by_wfo_data(path=FIRES_PATH):
+    return {'office_count': fire_aggregate('wfo', path=path).to_dict()}
+
+
+def fires_by_wfo_figure(office_count):
+    plt = pyplot()
+    fig = plt.figure()
     plt.bar(office_count.keys(), office_count.values(), edgecolor='black', linewidth=1.0, width=1)
     plt.title("Frequency of Fires by Office")
     plt.ylabel("Number of Fires")
     plt.xlabel("Office")
+    return fig
+
+
+def fires_by_wfo(path=FIRES_PATH):
+    plt = pyplot()
+    data = fires_by_wfo_data(path)
+    print(data['office_count'])
+    fires_by_wfo_figure(**data)
     plt.savefig('graphics/fires_by_wfo.png', dpi=600)
     plt.show()
 
-# fires_by_wfo(fires)
+# fires_by_wfo()
 
 ########################################################################################################################
 # FIRE FREQUENCY BY ZONE                                                                                               #
 ########################################################################################################################
-def fires_by_zone(fires):
-    zones = []
-    for fire in fires:
-        zones.append(fire['UGC_ZONE'])
-    zone_count = Counter(zones)
-    print(zone_count)
+def fires_by_zone_data(path=FIRES_PATH):
+    return {'zone_count': fire_aggregate('zone', path=path).to_dict()}
+
+
+def fires_by_zone_figure(zone_count):
+    plt = pyplot()
+    fig = plt.figure()
     plt.bar(zone_count.keys(), zone_count.values(), edgecolor='black', linewidth=1.0, width=1)
     plt.title("Frequency of Fires by Zone")
     plt.ylabel("Number of Fires")
     plt.xlabel("Zone")
+    return fig
+
+
+def fires_by_zone(path=FIRES_PATH):
+    plt = pyplot()
+    data = fires_by_zone_data(path)
+    print(data['zone_count'])
+    fires_by_zone_figure(**data)
     plt.show()
 
-# fires_by_zone(fires)
+# fires_by_zone()
 
 ########################################################################################################################
 # FIRE FREQUENCY BY FOREST COVER                                                                                       #
 ########################################################################################################################
-def fires_by_forest(fires):
-    forest = []
-    for fire in fires:
-        if fire['FORESTED'] == 'yes':
-            forest.append(fire['WFO'])
-    forest_count = Counter(forest)
-    print(forest_count)
+def fires_by_forest_data(path=FIRES_PATH):
+    return {'forest_count': fire_aggregate(('forest', 'wfo'), path=path).select(forest='Forested').to_dict()}
+
+
+def fires_by_forest_figure(forest_count):
+    plt = pyplot()
+    fig = plt.figure()
     plt.bar(forest_count.keys(), forest_count.values(), edgecolor='black', linewidth=1.0, width=1)
     plt.title("Frequency of Fires Classified as Forested")
     plt.ylabel("Number of Fires")
     plt.xlabel("Office")
+    return fig
+
+
+def fires_by_forest(path=FIRES_PATH):
+    plt = pyplot()
+    data = fires_by_forest_data(path)
+    print(data['forest_count'])
+    fires_by_forest_figure(**data)
     plt.savefig('graphics/fires_by_forest.png', dpi=600)
     plt.show()
 
-# fires_by_forest(fires)
+# fires_by_forest()
 
 ########################################################################################################################
 # AVG SIZES FOR FIRES IN WFO                                                                                           #
 ########################################################################################################################
-def fires_avg_size(fires):
-    sizes_dict ={}
-    wfos = ['SEW', 'PQR', 'MFR', 'PDT', 'BOI', 'OTX', 'PIH', 'MSO']
-    for wfo in wfos:
-        avg_sizes = []
-        for fire in fires:
-            if fire['WFO'] == wfo:
-                avg_sizes.append(fire['SIZE_AC'])
-        sizes_dict[wfo] = sum(avg_sizes)/len(avg_sizes)
-    print(sizes_dict)
+def fires_avg_size_data(path=FIRES_PATH):
+    return {'sizes_dict': by_wfo(fire_aggregate('wfo', percentiles=(90,), path=path).to_dict('mean'))}
 
+
+def fires_avg_size_figure(sizes_dict):
+    plt = pyplot()
+    fig = plt.figure()
     plt.bar(sizes_dict.keys(), sizes_dict.values(), edgecolor='black', linewidth=1.0, width=1)
     plt.title("Average Fire Size by WFO")
     plt.ylabel("Average Size of Fires")
     plt.xlabel("Office")
+    return fig
+
+
+def fires_avg_size(path=FIRES_PATH):
+    plt = pyplot()
+    data = fires_avg_size_data(path)
+    print(data['sizes_dict'])
+    fires_avg_size_figure(**data)
     plt.savefig('graphics/fires_by_avg_size.png', dpi=600)
     plt.show()
 
-# fires_avg_size(fires)
+# fires_avg_size()
 
 ########################################################################################################################
 # 90th PERCENTILE SIZES FOR FIRES IN WFO                                                                               #
 ########################################################################################################################
-def fires_90_size(fires):
-    sizes_dict ={}
-    wfos = ['SEW', 'PQR', 'MFR', 'PDT', 'BOI', 'OTX', 'PIH', 'MSO']
-    for wfo in wfos:
-        avg_sizes = []
-        for fire in fires:
-            if fire['WFO'] == wfo:
-                avg_sizes.append(fire['SIZE_AC'])
-        sizes_dict[wfo] = np.percentile(avg_sizes, 90)
-    print(sizes_dict)
+def fires_90_size_data(path=FIRES_PATH):
+    return {'sizes_dict': by_wfo(fire_aggregate('wfo', percentiles=(90,), path=path).to_dict(90))}
+
 
+def fires_90_size_figure(sizes_dict):
+    plt = pyplot()
+    fig = plt.figure()
     plt.bar(sizes_dict.keys(), sizes_dict.values(), edgecolor='black', linewidth=1.0, width=1)
     plt.title("90th Percentile Fire Sizes by WFO")
     plt.ylabel("90th Percentile Size of Fires")
     plt.xlabel("Office")
+    return fig
+
+
+def fires_90_size(path=FIRES_PATH):
+    plt = pyplot()
+    data = fires_90_size_data(path)
+    print(data['sizes_dict'])
+    fires_90_size_figure(**data)
     plt.savefig('graphics/fires_by_90thsize.png', dpi=600)
     plt.show()
 
-# fires_90_size(fires)
+# fires_90_size()
 
 ########################################################################################################################
 # AVG SIZE WHEN ERC ABOVE 90TH PERCENTILE                                                                              #
 ########################################################################################################################
-def fires_size_erc_perc(fires):
-    sizes_dict ={}
-    wfos = ['SEW', 'PQR', 'MFR', 'PDT', 'BOI', 'OTX', 'PIH', 'MSO']
-    for wfo in wfos:
-        avg_sizes = []
-        for fire in fires:
-            if fire['WFO'] == wfo:
-                if fire['ERC_PERC'] >= 85:
-                    avg_sizes.append(fire['SIZE_AC'])
-        sizes_dict[wfo] = sum(avg_sizes)/len(avg_sizes)
-    print(sizes_dict)
+def fires_size_erc_perc_data(path=FIRES_PATH):
+    return {'sizes_dict': by_wfo(fire_aggregate('wfo', 'erc85', path=path).to_dict('mean'))}
 
+
+def fires_size_erc_perc_figure(sizes_dict):
+    plt = pyplot()
+    fig = plt.figure()
     plt.bar(sizes_dict.keys(), sizes_dict.values(), edgecolor='black', linewidth=1.0, width=1)
     plt.title("Average Size when ERC >= 90th Percentile by WFO")
     plt.ylabel("Average Size")
     plt.xlabel("Office")
+    return fig
+
+
+def fires_size_erc_perc(path=FIRES_PATH):
+    plt = pyplot()
+    data = fires_size_erc_perc_data(path)
+    print(data['sizes_dict'])
+    fires_size_erc_perc_figure(**data)
     plt.savefig('graphics/fires_by_size_90th_erc.png', dpi=600)
 
     plt.show()
 
-# fires_size_erc_perc(fires)
+# fires_size_erc_perc()
+
+
+# Output file name -> (data function of the fire data path, figure function of its result), for render_figures.py
+FIGURES = {
+    'fires_mega_plot.png': (fires_mega_plot_data, fires_mega_plot_figure),
+    'fires_by_cause.png': (fires_by_cause_data, fires_by_cause_figure),
+    'fires_by_wfo.png': (fires_by_wfo_data, fires_by_wfo_figure),
+    'fires_by_zone.png': (fires_by_zone_data, fires_by_zone_figure),
+    'fires_by_forest.png': (fires_by_forest_data, fires_by_forest_figure),
+    'fires_by_avg_size.png': (fires_avg_size_data, fires_avg_size_figure),
+    'fires_by_90thsize.png': (fires_90_size_data, fires_90_size_figure),
+    'fires_by_size_90th_erc.png': (fires_size_erc_perc_data, fires_size_erc_perc_figure),
+}
 
 # what is probability a fire in August with an ERC above 85th percentile will exceed 10 ac size in WAZ687
 
@@ -351,3 +374,18 @@ def waz687_prob(fires):
     print(len(fire_hits) / (len(fire_hits) + len(fire_nums)))
 
 # waz687_prob(fires)
+
+
+def __getattr__(name):
+    # The globals this module used to load on import, now loaded on first access
+    if name == 'fires':
+        return visual_data.fire_records()
+    if name == 'large_fires':
+        from LARGE_FIRES_visuals import default_large_fires
+        return default_large_fires()
+    raise AttributeError('module %r has no attribute %r' % (__name__, name))
+
+
+if __name__ == '__main__':
+    cause_shares()
+    fires_by_cause()
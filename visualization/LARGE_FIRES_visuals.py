@@ -1,43 +1,51 @@
 from collections import Counter
 import datetime
-import json
-import matplotlib.pyplot as plt
-import numpy as np
+import functools
+import visual_data
 
-# Global JSON data files
-with open('data/Fires_Northwest.json') as e:
-    fires = json.load(e)
 
+def large_fires_sizer(fire_table, perc_input, size_index=None):
+    """Returns the perc_input-th percentile fire size of every zone, indexed by the table's UGC_ZONE codes"""
+    import numpy as np
+    visual_data.add_analysis_path()
+    from percentile_index import ZoneSizeIndex
 
-def large_fires_sizer(fires, perc_input):
-    zone_sizes = {}
-    for fire in fires:
-        if fire['UGC_ZONE'] in zone_sizes:
-            zone_sizes[fire['UGC_ZONE']].append(fire['SIZE_AC'])
-        else:
-            zone_sizes[fire['UGC_ZONE']] = [fire['SIZE_AC']]
-
-    perc_list = []
-    for k, v in zone_sizes.items():
-        m = np.array(v)
-        p = round(np.percentile(m, perc_input), 2)
-        perc_list.append({k: p})
+    zones = fire_table['UGC_ZONE']
+    if size_index is None:
+        size_index = ZoneSizeIndex.build(np.asarray(zones.codes), np.asarray(fire_table['SIZE_AC']), len(zones.categories))
+    fire_sizes = np.round(size_index.thresholds(perc_input), 2)
 
+    perc_list = [{zone: p} for zone, p in zip(zones.categories.tolist(), fire_sizes.tolist()) if not np.isnan(p)]
     print(str(perc_input) + 'th percentile fire sizes for the zones requested are:', perc_list)
-    return perc_list
+    return fire_sizes
 
-# Pass in fires JSON and a percentile size and watch your large fires come to life!
-fire_sizes = large_fires_sizer(fires, 90)
 
-def large_fires_counter(fires, fire_sizes):
-    large_fires = []
-    for fire in fires:
-        for size in fire_sizes:
-            if fire['UGC_ZONE'] in size:
-                if fire['SIZE_AC'] >= size[fire['UGC_ZONE']]:
-                    large_fires.append(fire)
+def large_fires_counter(fire_table, fire_sizes):
+    """Returns the fire records at or above their zone's size from large_fires_sizer"""
+    large = fire_table['SIZE_AC'] >= fire_sizes[fire_table['UGC_ZONE'].codes]
+    large_fires = fire_table.to_records(large)
 
     print(len(large_fires))
     return large_fires
 
-large_fires = large_fires_counter(fires, fire_sizes)
\ No newline at end of file
+
+@functools.lru_cache(maxsize=None)
+def default_large_fires(perc_input=90):
+    """The large fires of the global fire data, computed once. Pass in a percentile size and watch them come to life!"""
+    fire_sizes = large_fires_sizer(visual_data.fire_table(), perc_input, visual_data.fire_size_index())
+    return large_fires_counter(visual_data.fire_table(), fire_sizes)
+
+
+def __getattr__(name):
+    # The globals this module used to compute on import, now loaded on first access
+    if name == 'fire_table':
+        return visual_data.fire_table()
+    if name == 'size_index':
+        return visual_data.fire_size_index()
+    if name == 'large_fires':
+        return default_large_fires()
+    raise AttributeError('module %r has no attribute %r' % (__name__, name))
+
+
+if __name__ == '__main__':
+    default_large_fires()
@@ -1,105 +1,179 @@
-from collections import Counter
-import datetime
-import json
-import matplotlib.pyplot as plt
+import visual_data
+from visual_data import RFWS_PATH, pyplot, rfw_aggregate
 
-plt.style.use('seaborn')
-
-# Global JSON data files
-with open('data/RFWs_Northwest.json') as e:
-    rfws = json.load(e)
+# Warning length bars in hours, the bins of np.histogram (the last one closed at 24 h), plus a bar for longer warnings
+RFW_LENGTH_EDGES = [0, 3, 6, 12, 18, 24]
 
 
 ########################################################################################################################
 # YEAR FREQUENCY OF RFWS                                                                                               #
 ########################################################################################################################
-def rfws_by_year(rfws):
-    years = []
-    for rfw in rfws:
-        years.append(rfw['ISSUED'][:4])
-    year_count = Counter(years)
-    print(year_count)
+def rfws_by_year_data(path=RFWS_PATH):
+    return {'year_count': rfw_aggregate('year', path=path).to_dict()}
+
+
+def rfws_by_year_figure(year_count):
+    plt = pyplot()
+    fig = plt.figure()
     plt.bar(year_count.keys(), year_count.values())
     plt.title("Frequency of RFW Days by Year")
     plt.ylabel("Number of Forecast Days")
     plt.xlabel("Year")
+    return fig
+
+
+def rfws_by_year(path=RFWS_PATH):
+    plt = pyplot()
+    data = rfws_by_year_data(path)
+    print(data['year_count'])
+    rfws_by_year_figure(**data)
     plt.savefig('graphics/rfws_by_year.png', dpi=600)
     plt.show()
 
-rfws_by_year(rfws)
+# rfws_by_year()
 
 ########################################################################################################################
 # MONTH FREQUENCY OF RFWS                                                                                              #
 ########################################################################################################################
-def rfws_by_month(rfws):
-    months = []
-    for rfw in rfws:
-        months.append(rfw['ISSUED'][4:6])
-    month_count = Counter(months)
-    print(month_count)
+def rfws_by_month_data(path=RFWS_PATH):
+    return {'month_count': rfw_aggregate('month', path=path).to_dict()}
+
+
+def rfws_by_month_figure(month_count):
+    plt = pyplot()
+    fig = plt.figure()
     plt.bar(month_count.keys(), month_count.values())
     plt.title("Frequency of RFW Days by Month")
     plt.ylabel("Number of Forecast Days")
     plt.xlabel("Month")
+    return fig
+
+
+def rfws_by_month(path=RFWS_PATH):
+    plt = pyplot()
+    data = rfws_by_month_data(path)
+    print(data['month_count'])
+    rfws_by_month_figure(**data)
     plt.savefig('graphics/rfws_by_month.png', dpi=600)
     plt.show()
 
-rfws_by_month(rfws)
+# rfws_by_month()
 
 ########################################################################################################################
 # RFW FREQUENCY BY WFO                                                                                                 #
 ########################################################################################################################
-def rfws_by_wfo(rfws):
-    office = []
-    for rfw in rfws:
-        office.append(rfw['WFO'])
-    office_count = Counter(office)
-    print(office_count)
+def rfws_by_wfo_data(path=RFWS_PATH):
+    return {'office_count': rfw_aggregate('wfo', path=path).to_dict()}
+
+
+def rfws_by_wfo_figure(office_count):
+    plt = pyplot()
+    fig = plt.figure()
     plt.bar(office_count.keys(), office_count.values())
     plt.title("Frequency of RFW Days by Office")
     plt.ylabel("Number of Forecast Days")
     plt.xlabel("Office")
+    return fig
+
+
+def rfws_by_wfo(path=RFWS_PATH):
+    plt = pyplot()
+    data = rfws_by_wfo_data(path)
+    print(data['office_count'])
+    rfws_by_wfo_figure(**data)
     plt.savefig('graphics/rfws_by_wfo.png', dpi=600)
     plt.show()
 
-rfws_by_wfo(rfws)
+# rfws_by_wfo()
 
 ########################################################################################################################
 # RFW FREQUENCY BY ZONE                                                                                                #
 ########################################################################################################################
-def rfws_by_zone(rfws):
-    zones = []
-    for rfw in rfws:
-        zones.append(rfw['NWS_UGC'])
-    zone_count = Counter(zones)
-    print(zone_count)
+def rfws_by_zone_data(path=RFWS_PATH):
+    return {'zone_count': rfw_aggregate('zone', path=path).to_dict()}
+
+
+def rfws_by_zone_figure(zone_count):
+    plt = pyplot()
+    fig = plt.figure()
     plt.bar(zone_count.keys(), zone_count.values())
     plt.title("Frequency of RFW Days by Zone")
     plt.ylabel("Number of Forecast Days")
     plt.xlabel("Zone")
+    return fig
+
+
+def rfws_by_zone(path=RFWS_PATH):
+    plt = pyplot()
+    data = rfws_by_zone_data(path)
+    print(data['zone_count'])
+    rfws_by_zone_figure(**data)
     plt.savefig('graphics/rfws_by_zone.png', dpi=600)
     plt.show()
 
-rfws_by_zone(rfws)
+# rfws_by_zone()
 
 ########################################################################################################################
 # RFW LENGTH                                                                                                           #
 ########################################################################################################################
-def rfws_length(rfws):
-    date_diffs = []
-    for rfw in rfws:
-        start = rfw['ISSUED']
-        end = rfw['EXPIRED']
-        start_datetime = datetime.datetime.strptime(start, "%Y%m%d%H%M")
-        end_datetime = datetime.datetime.strptime(end, "%Y%m%d%H%M")
-        hours = (end_datetime - start_datetime).seconds / 3600
-        date_diffs.append(hours)
-    plt.hist(date_diffs, bins=[0, 3, 6, 12, 18, 24])
+def rfws_length_data(path=RFWS_PATH):
+    import numpy as np
+    rfws = visual_data.rfw_table(path)
+    # The full length worked out at ingest, or here for column directories written without it
+    if 'DURATION_MIN' in rfws:
+        minutes = np.asarray(rfws['DURATION_MIN'])
+    else:
+        from date_manipulator import duration_minutes
+        minutes = duration_minutes(rfws['ISSUED'], rfws['EXPIRED'])
+    hours = minutes / 60
+    counts, _ = np.histogram(hours, RFW_LENGTH_EDGES)
+    labels = ['%i-%i' % edges for edges in zip(RFW_LENGTH_EDGES[:-1], RFW_LENGTH_EDGES[1:])]
+    length_count = dict(zip(labels, counts.tolist()))
+    length_count['>%i' % RFW_LENGTH_EDGES[-1]] = int((hours > RFW_LENGTH_EDGES[-1]).sum())
+    return {'length_count': length_count}
+
+
+def rfws_length_figure(length_count):
+    plt = pyplot()
+    fig = plt.figure()
+    plt.bar(length_count.keys(), length_count.values())
     plt.title('Red Flag Warning Duration (Hours)')
     plt.ylabel('Frequency')
     plt.xlabel('Duration of Red Flag Event (Hours)')
-    plt.xticks([0, 3, 6, 12, 18, 24])
+    return fig
+
+
+def rfws_length(path=RFWS_PATH):
+    plt = pyplot()
+    data = rfws_length_data(path)
+    print(data['length_count'])
+    rfws_length_figure(**data)
     plt.savefig('graphics/rfws_by_duration.png', dpi=600)
     plt.show()
 
-rfws_length(rfws)
\ No newline at end of file
+# rfws_length()
+
+
+# Output file name -> (data function of the RFW data path, figure function of its result), for render_figures.py
+FIGURES = {
+    'rfws_by_year.png': (rfws_by_year_data, rfws_by_year_figure),
+    'rfws_by_month.png': (rfws_by_month_data, rfws_by_month_figure),
+    'rfws_by_wfo.png': (rfws_by_wfo_data, rfws_by_wfo_figure),
+    'rfws_by_zone.png': (rfws_by_zone_data, rfws_by_zone_figure),
+    'rfws_by_duration.png': (rfws_length_data, rfws_length_figure),
+}
+
+
+def __getattr__(name):
+    # The RFW records this module used to load on import, now loaded on first access
+    if name == 'rfws':
+        return visual_data.rfw_records()
+    raise AttributeError('module %r has no attribute %r' % (__name__, name))
+
+
+if __name__ == '__main__':
+    rfws_by_year()
+    rfws_by_month()
+    rfws_by_wfo()
+    rfws_by_zone()
+    rfws_length()
@@ -0,0 +1,245 @@
+"""
+Headless batch renderer for the fire and RFW figures.
+
+The main process loads the data once and builds three aggregate cubes (visual_data.fire_aggregate and
+rfw_aggregate): fires and large fires by (wfo, zone, year, month, cause), and RFW days by (wfo, zone, year, month).
+The global figures are the FIRES_visuals and RFWs_visuals plots themselves: each module's FIGURES table pairs
+a data function, run here, with the figure function the plot scripts draw with. The wfo and zone summaries are
+drawn from slices and marginals of the cubes. Each figure is reduced to a small spec (the figure function and
+the data passed to it). The sha1 of that spec is its content hash, and figures whose hash matches the manifest
+left in the output directory by the last run are skipped. Only the changed figures go to a pool of Agg-backend
+processes, which draw them and save them in parallel.
+
+Figure sets: 'global' (the FIRES_visuals/RFWs_visuals figures), 'wfo' (one summary per office) and 'zone' (one
+summary per fire weather zone).
+
+Usage:
+    python visualization/render_figures.py --out graphics --workers 8
+    python visualization/render_figures.py --only zone --dpi 150
+"""
+import argparse
+import hashlib
+import importlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import visual_data
+from visual_data import FIRES_PATH, RFWS_PATH, fire_aggregate, rfw_aggregate
+
+# Bump when the drawing code changes, so every figure is redrawn
+RENDER_VERSION = 2
+MANIFEST = '.render_manifest.json'
+FIGURE_SETS = ('global', 'wfo', 'zone')
+
+FIRE_CUBE = ('wfo', 'zone', 'year', 'month', 'cause')
+RFW_CUBE = ('wfo', 'zone', 'year', 'month')
+
+
+def bar_panel(title, xlabel, ylabel, *series, log=False, ylim=None):
+    """
+    One axes of bars
+
+    Parameters:
+        series (tuples): (legend label, dict of bar label -> height) per set of bars, drawn over each other.
+    """
+    return {'title': title, 'xlabel': xlabel, 'ylabel': ylabel, 'log': log, 'ylim': ylim,
+            'series': [{'label': label, 'x': list(bars), 'y': list(bars.values())} for label, bars in series]}
+
+
+def figure(*panels, grid=(1, 1), size=(6.4, 4.8), title=None):
+    return figure_spec('render_figures.summary_figure',
+                       {'grid': list(grid), 'size': list(size), 'title': title, 'panels': list(panels)})
+
+
+def figure_spec(draw, data):
+    """
+    Figure spec: the figure function, as 'module.function', and the keyword arguments it is called with
+    """
+    return {'draw': draw, 'data': data}
+
+
+def content_hash(spec, dpi):
+    text = json.dumps([RENDER_VERSION, visual_data.STYLE, dpi, spec], sort_keys=True)
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+def _within(cube, key, label, *keys):
+    """Counts of the cube at one wfo or zone, by the given keys. Empty when the cube has no records there."""
+    if label not in cube.labels[cube.by.index(key)]:
+        return {}
+    return cube.select(**{key: label}).marginal(*keys).to_dict()
+
+
+def global_figures(fires_path, rfws_path):
+    import FIRES_visuals
+    import RFWs_visuals
+
+    specs = {}
+    for module, path in ((FIRES_visuals, fires_path), (RFWs_visuals, rfws_path)):
+        for name, (data, draw) in module.FIGURES.items():
+            specs[name] = figure_spec('%s.%s' % (module.__name__, draw.__name__), data(path))
+    return specs
+
+
+def summary_figures(key, fires_path, rfws_path):
+    """One four-panel summary per wfo or zone (key): fires by year, month and cause, and RFW days by month"""
+    from FIRES_visuals import listed_causes
+
+    fires = fire_aggregate(FIRE_CUBE, path=fires_path)
+    large_fires = fire_aggregate(FIRE_CUBE, 'large', path=fires_path)
+    rfws = rfw_aggregate(RFW_CUBE, path=rfws_path)
+
+    labels = sorted(set(fires.labels[fires.by.index(key)].tolist()) | set(rfws.labels[rfws.by.index(key)].tolist()))
+    figures = {}
+    for label in labels:
+        def panel(title, xlabel, by):
+            counts = [_within(cube, key, label, by) for cube in (fires, large_fires)]
+            if by == 'cause':
+                counts = [listed_causes(cause_count) for cause_count in counts]
+            return bar_panel(title, xlabel, 'Number of Fires', ('All Fires', counts[0]),
+                             ('90th Percentile Fires', counts[1]))
+
+        figures['%s/%s.png' % (key, label)] = figure(
+            panel('(a) Occurrence Year', 'Year', 'year'),
+            panel('(b) Occurrence Month', 'Month', 'month'),
+            panel('(c) Ignition Cause', 'Cause', 'cause'),
+            bar_panel('(d) RFW Days by Month', 'Month', 'Number of Forecast Days',
+                      (None, _within(rfws, key, label, 'month'))),
+            grid=(2, 2), size=(8.5, 10), title='Fires and Red Flag Warnings: %s' % label)
+    return figures
+
+
+def figure_specs(fires_path=FIRES_PATH, rfws_path=RFWS_PATH, sets=FIGURE_SETS):
+    """
+    Returns: dict of output file name (relative to the output directory) -> figure spec, for the sets asked for
+    """
+    specs = {}
+    if 'global' in sets:
+        specs.update(global_figures(fires_path, rfws_path))
+    for key in ('wfo', 'zone'):
+        if key in sets:
+            specs.update(summary_figures(key, fires_path, rfws_path))
+    return specs
+
+
+def _init_worker():
+    import matplotlib
+    matplotlib.use('Agg')
+
+
+def summary_figure(grid, size, title, panels):
+    """Draws a grid of bar panels (figure spec data from figure) and returns the figure"""
+    plt = visual_data.pyplot()
+    fig = plt.figure(figsize=size)
+    rows, cols = grid
+    for i, panel in enumerate(panels):
+        ax = fig.add_subplot(rows, cols, i + 1)
+        for series in panel['series']:
+            ax.bar(series['x'], series['y'], label=series['label'], edgecolor='black', linewidth=1.0)
+        if panel['log']:
+            ax.set_yscale('log')
+        if panel['ylim']:
+            ax.set_ylim(*panel['ylim'])
+        if panel['title']:
+            ax.title.set_text(panel['title'])
+        ax.set_xlabel(panel['xlabel'])
+        ax.set_ylabel(panel['ylabel'])
+        for tick in ax.get_xticklabels() + ax.get_yticklabels():
+            tick.set_fontsize(8)
+        if len(ax.get_xticklabels()) > 20:
+            plt.setp(ax.get_xticklabels(), rotation=90)
+
+    legend = {}
+    for ax in fig.axes:
+        for handle, label in zip(*ax.get_legend_handles_labels()):
+            legend.setdefault(label, handle)
+    if legend:
+        fig.legend(list(legend.values()), list(legend), loc='lower center')
+    if title:
+        fig.suptitle(title, fontsize=16)
+    return fig
+
+
+def _render(spec, path, dpi):
+    """Draws one figure spec with its figure function and saves it to path"""
+    module, draw = spec['draw'].rsplit('.', 1)
+    fig = getattr(importlib.import_module(module), draw)(**spec['data'])
+
+    # Written next to the target and moved over it, so an interrupted run never leaves a half-written figure
+    temp_path = path + '.tmp'
+    fig.savefig(temp_path, dpi=dpi, format='png')
+    visual_data.pyplot().close(fig)
+    os.replace(temp_path, path)
+    return path
+
+
+def render_figures(out_dir, specs, workers=None, dpi=600, force=False):
+    """
+    Renders the figures whose content changed since the last run into out_dir
+
+    Parameters:
+        out_dir (str): Output directory. Its manifest of content hashes decides what is up to date.
+        specs (dict): File name -> figure spec, from figure_specs.
+        workers (int) (optional): Rendering processes. Defaults to every core, 1 renders in this process.
+        dpi (int): Resolution of the saved figures.
+        force (bool): Redraw every figure, changed or not.
+
+    Returns: (number of figures rendered, number skipped as unchanged)
+    """
+    manifest_path = os.path.join(out_dir, MANIFEST)
+    manifest = {}
+    if os.path.exists(manifest_path) and not force:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+
+    todo = {}
+    for name, spec in specs.items():
+        digest = content_hash(spec, dpi)
+        if manifest.get(name) == digest and os.path.exists(os.path.join(out_dir, name)):
+            continue
+        todo[name] = digest
+        os.makedirs(os.path.dirname(os.path.join(out_dir, name)), exist_ok=True)
+
+    def done(name):
+        manifest[name] = todo[name]
+
+    try:
+        if todo and workers == 1:
+            _init_worker()
+            for name in todo:
+                _render(specs[name], os.path.join(out_dir, name), dpi)
+                done(name)
+        elif todo:
+            with ProcessPoolExecutor(workers, initializer=_init_worker) as pool:
+                futures = {pool.submit(_render, specs[name], os.path.join(out_dir, name), dpi): name for name in todo}
+                for future in as_completed(futures):
+                    future.result()
+                    done(futures[future])
+    finally:
+        # Saved even when a figure fails, so the ones already drawn aren't redrawn next time
+        os.makedirs(out_dir, exist_ok=True)
+        with open(manifest_path + '.tmp', 'w') as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+        os.replace(manifest_path + '.tmp', manifest_path)
+
+    return len(todo), len(specs) - len(todo)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Render the fire and RFW figures headlessly, in parallel')
+    parser.add_argument('--out', default='graphics', help='Output directory (default graphics)')
+    parser.add_argument('--fires', default=FIRES_PATH, help='Fire JSON or column directory')
+    parser.add_argument('--rfws', default=RFWS_PATH, help='Flattened RFW JSON or column directory')
+    parser.add_argument('--only', action='append', choices=FIGURE_SETS, help='Figure set to render (repeatable)')
+    parser.add_argument('--workers', type=int, default=None, help='Rendering processes (default: every core)')
+    parser.add_argument('--dpi', type=int, default=600)
+    parser.add_argument('--force', action='store_true', help='Redraw figures even if their data is unchanged')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    specs = figure_specs(args.fires, args.rfws, args.only or FIGURE_SETS)
+    print('%i figure specs built in %.2f s' % (len(specs), time.perf_counter() - started))
+    rendered, skipped = render_figures(args.out, specs, args.workers, args.dpi, args.force)
+    print('%i figures rendered, %i unchanged, in %.2f s' % (rendered, skipped, time.perf_counter() - started))
@@ -0,0 +1,120 @@
+"""
+Lazily loaded data and matplotlib for the visualization modules.
+
+Nothing is read or imported until a plot first asks for it, and each dataset is loaded once per process and shared by
+every module that plots it.
+"""
+import functools
+import os
+import sys
+
+ANALYSIS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'analysis')
+
+# Global data files, read through the binary column cache
+FIRES_PATH = 'data/Fires_Northwest.json'
+RFWS_PATH = 'data/RFWs_Northwest.json'
+
+# The seaborn style, renamed seaborn-v0_8 in matplotlib 3.6, with its old name for earlier versions (3.8 dropped it)
+STYLE = 'seaborn-v0_8'
+OLD_STYLE = 'seaborn'
+
+# Zone size percentile at or above which a fire counts as large, as in LARGE_FIRES_visuals
+LARGE_PERC = 90
+
+
+def add_analysis_path():
+    if ANALYSIS_DIR not in sys.path:
+        sys.path.append(ANALYSIS_DIR)
+
+
+@functools.lru_cache(maxsize=None)
+def pyplot():
+    """matplotlib.pyplot with the figure style applied"""
+    import matplotlib.pyplot as plt
+    plt.style.use(STYLE if STYLE in plt.style.available else OLD_STYLE)
+    return plt
+
+
+@functools.lru_cache(maxsize=None)
+def fire_table(path=FIRES_PATH):
+    add_analysis_path()
+    from columnar_store import FIRE_SCHEMA
+    from store_cache import load_cached_table
+    return load_cached_table(path, FIRE_SCHEMA)
+
+
+@functools.lru_cache(maxsize=None)
+def fire_size_index(path=FIRES_PATH):
+    add_analysis_path()
+    from store_cache import load_size_index
+    return load_size_index(path, fire_table(path))
+
+
+@functools.lru_cache(maxsize=None)
+def fire_records(path=FIRES_PATH):
+    """The fires as a list of dicts, shared between callers, so not to be modified"""
+    return fire_table(path).to_records()
+
+
+@functools.lru_cache(maxsize=None)
+def rfw_table(path=RFWS_PATH):
+    add_analysis_path()
+    from columnar_store import RFW_SCHEMA
+    from store_cache import load_cached_table
+    return load_cached_table(path, RFW_SCHEMA)
+
+
+@functools.lru_cache(maxsize=None)
+def rfw_records(path=RFWS_PATH):
+    """The RFW days as a list of dicts, shared between callers, so not to be modified"""
+    return rfw_table(path).to_records()
+
+
+def _large_fires(table, path):
+    import numpy as np
+    # Rounded as large_fires_sizer reports them, so the same fires are picked
+    thresholds = np.round(fire_size_index(path).thresholds(LARGE_PERC), 2)
+    with np.errstate(invalid='ignore'):
+        return table['SIZE_AC'] >= thresholds[table['UGC_ZONE'].codes]
+
+
+def _high_erc(table, path):
+    import numpy as np
+    with np.errstate(invalid='ignore'):
+        return table['ERC_PERC'] >= 85
+
+
+# Named fire subsets for fire_aggregate: name -> function of (table, path) returning a mask
+FIRE_SUBSETS = {
+    'large': _large_fires,
+    'erc85': _high_erc,
+}
+
+
+@functools.lru_cache(maxsize=None)
+def fire_aggregate(by, subset=None, percentiles=(), path=FIRES_PATH):
+    """
+    Counts, sums, means and percentiles of fire size grouped by any of year, month, cause, forest, wfo and zone
+    (see analysis/group_aggregates.py), computed once per set of arguments
+
+    Parameters:
+        by (str or tuple of str): Grouping keys.
+        subset (str) (optional): Name in FIRE_SUBSETS to aggregate only those fires. Every fire when omitted.
+        percentiles (tuple of numbers) (optional): Size percentiles to compute per group.
+        path (str): Fire data file.
+
+    Returns: GroupAggregate
+    """
+    add_analysis_path()
+    from group_aggregates import aggregate
+    table = fire_table(path)
+    mask = None if subset is None else FIRE_SUBSETS[subset](table, path)
+    return aggregate(table, by, mask=mask, percentiles=percentiles)
+
+
+@functools.lru_cache(maxsize=None)
+def rfw_aggregate(by, path=RFWS_PATH):
+    """RFW day counts grouped by any of year, month, wfo, zone and days, computed once per set of arguments"""
+    add_analysis_path()
+    from group_aggregates import RFW_GROUP_KEYS, aggregate
+    return aggregate(rfw_table(path), by, value=None, group_keys=RFW_GROUP_KEYS)